@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ProjectTrackingAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'project_tracking_app'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks, signals  # noqa: F401 (register system checks, connect signal receivers)
+        from .replicas import record_replica_file
+        from .timing import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
+        connection_created.connect(record_replica_file)
@@ -0,0 +1,175 @@
+"""Async read path of the API for the ASGI application (see softdesk_project/async_urls.py and asgi.py).
+
+Under ASGI, Django runs a sync view with sync_to_async in the single thread of the sync code (thread_sensitive), so
+the requests of the viewsets are served one at a time, however many clients are connected. With the async URLconf,
+the list and retrieve endpoints of projects, issues and comments are served by async views:
+- the check that the user is a contributor of the project of the endpoint (as get_queryset and
+  IssuePermission/CommentPermission do for GET requests) runs in the event loop when the role of the user is read
+  from the token claims or the roles cache. A non-contributor gets 404 without running the view.
+- the calls which may query the database or block, decided up front whatever the caches hold (the authentication,
+  which reads the state of the user from the cache or the database, the role read from the database, then the
+  view), run with sync_to_async in the threads of the executor of the event loop (thread_sensitive=False), so that
+  several reads run at once. Django 3.2 has no async ORM, and these threads are reused by other requests: as the
+  handler does at the end of a request, their database connections are closed after each call (see run_in_worker).
+  The view (queries, ETag and response cache, serialization, rendering) is the one of the viewset, so the responses
+  are the same as the sync path.
+This isn't an ASGI-native read path: apart from the denied requests, every read still holds a worker thread while
+it authenticates and while its view runs, so the concurrency of the reads is bounded by the threads of the executor
+(and by the connections of the database), as with a threaded WSGI server. It only lifts the one-at-a-time limit of
+the sync views under ASGI.
+The authenticated user is passed to the view in the credentials of the request (see ClaimsJWTAuthentication).
+The other methods, and the profiled requests (whose profiler runs in the thread of the sync code, see
+RequestProfilingMiddleware), are dispatched to the sync views as usual. Under WSGI, async views would run in an
+event loop per request: keep the default URLconf.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.urls import URLPattern, URLResolver
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+from users.authentication import CREDENTIALS_ATTRIBUTE
+
+from .metrics import registry
+from .profiling import is_profiled
+from .roles import MISSING, get_claims_role, load_role, role_cache
+from .timing import measure
+
+READ_METHODS = ('GET', 'HEAD')
+
+# URL name: keyword argument of the project of the endpoint (None: the endpoint has no project).
+ASYNC_READ_ENDPOINTS = {
+    'projects-list': None,
+    'projects-detail': 'pk',
+    'issues-list': 'project_pk',
+    'issues-detail': 'project_pk',
+    'comments-list': 'project_pk',
+    'comments-detail': 'project_pk',
+}
+
+
+def call_closing_connections(function, *args, **kwargs):
+    try:
+        return function(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_worker(function, *args, **kwargs):
+    """Run a function which may query the database in a thread of the executor of the event loop, and close the
+    database connection of the thread after it (according to CONN_MAX_AGE setting, as at the end of a request).
+    """
+
+    return await sync_to_async(call_closing_connections, thread_sensitive=False)(function, *args, **kwargs)
+
+
+def get_cached_role(token, user_pk, project_pk):
+    """Return the role of a user in a project read from his token or from the roles cache (without query), MISSING
+    if it is unknown.
+    """
+
+    role = get_claims_role(token, user_pk, project_pk)
+    if role is MISSING:
+        role = role_cache.get(user_pk, project_pk)
+    return role
+
+
+async def authenticate(request, authentication_classes):
+    """Authenticate the request as the view would. Return (user, token), or None if the request has no credentials
+    or if they are invalid (the view then answers, and counts the failure).
+    """
+
+    for authentication_class in authentication_classes:
+        try:
+            result = await run_in_worker(authentication_class().authenticate, request)
+        except APIException:
+            return None
+        if result is not None:
+            return result
+    return None
+
+
+def not_found(request):
+    """Response of the viewsets to a user who isn't a contributor of the project (see TimingMixin)."""
+
+    registry.inc('softdesk_permission_failures_total', route=request.resolver_match.view_name, check='view',
+                 reason='Http404')
+    return HttpResponse(JSONRenderer().render({'detail': 'Not found.'}), status=404, content_type='application/json')
+
+
+async def check_read_access(request, view, project_kwarg, kwargs):
+    """Authenticate the request (in a worker thread) and check that the user is a contributor of the project of the
+    endpoint. Return the response of a denied request, None otherwise: the credentials are then kept in the request,
+    whose authentication by the view returns them.
+    """
+
+    credentials = await authenticate(request, view.cls.authentication_classes)
+    if credentials is None:
+        return None
+    user, token = credentials
+    setattr(request, CREDENTIALS_ATTRIBUTE, credentials)
+    if project_kwarg is None:
+        return None
+
+    try:
+        project_pk = int(kwargs[project_kwarg])
+    except ValueError:
+        return not_found(request)
+    role = get_cached_role(token, user.pk, project_pk)
+    if role is MISSING:
+        role = await run_in_worker(load_role, user.pk, project_pk)
+    if role is None:
+        return not_found(request)
+    return None
+
+
+def render_view(view, request, *args, **kwargs):
+    """Run the view and render its response (in a thread of the executor)."""
+
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        with measure('render'):
+            response.render()
+    return response
+
+
+def async_read_view(view, project_kwarg):
+    """Return an async view serving the GET and HEAD requests of a list or detail view of a viewset
+    (project_kwarg: see ASYNC_READ_ENDPOINTS), and dispatching the other requests to the view.
+    The served requests run the view in a worker thread (see run_in_worker): only the access check may not.
+    """
+
+    sync_view = sync_to_async(view)
+
+    @wraps(view)  # Also copies the attributes of the view, e.g. csrf_exempt.
+    async def async_view(request, *args, **kwargs):
+        if request.method not in READ_METHODS or is_profiled(request):
+            return await sync_view(request, *args, **kwargs)
+        with measure('permissions'):
+            response = await check_read_access(request, view, project_kwarg, kwargs)
+        if response is not None:
+            return response
+        return await run_in_worker(render_view, view, request, *args, **kwargs)
+
+    return async_view
+
+
+def with_async_reads(urlpatterns):
+    """Return urlpatterns whose list and retrieve endpoints (see ASYNC_READ_ENDPOINTS) are served by async views,
+    including the patterns of the included URLconfs without namespace.
+    """
+
+    async_urlpatterns = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name in ASYNC_READ_ENDPOINTS:
+            view = async_read_view(pattern.callback, ASYNC_READ_ENDPOINTS[pattern.name])
+            pattern = URLPattern(pattern.pattern, view, pattern.default_args, pattern.name)
+        elif isinstance(pattern, URLResolver) and pattern.namespace is None:
+            pattern = URLResolver(pattern.pattern, with_async_reads(pattern.url_patterns), pattern.default_kwargs,
+                                  pattern.app_name, pattern.namespace)
+        async_urlpatterns.append(pattern)
+    return async_urlpatterns
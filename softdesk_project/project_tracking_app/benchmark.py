@@ -0,0 +1,268 @@
+"""Benchmark of the API endpoints (see benchmark_api command).
+
+Every route of users/urls.py and project_tracking_app/urls.py is requested several times through the test client,
+on a seeded dataset (see seeding module), as a contributor of the biggest project (and as a staff user for the
+cache statistics). For each endpoint, the latency percentiles, the number of SQL queries and the size of the
+responses are recorded, and written to a JSON file: the baseline which later runs are compared with.
+
+The objects which an endpoint modifies or deletes are created before each request (untimed). The response cache
+is cleared before each request, so that the cost of the serializers is measured (unless it is kept).
+"""
+
+import json
+import statistics
+import subprocess
+import time
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Project, Contributor, Issue, Comment, User
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of sorted values."""
+
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
+
+
+def get_git_commit():
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR)
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+
+class Endpoint:
+    """A request of the benchmark. setup creates its objects (untimed) and returns the arguments of url and data."""
+
+    def __init__(self, name, method, url, data=None, setup=None, client='contributor'):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.data = data
+        self.setup = setup
+        self.client = client
+
+    def prepare(self):
+        """Return the url and the data of a request (after the setup of its objects)."""
+
+        kwargs = self.setup() if self.setup else {}
+        data = self.data(**kwargs) if callable(self.data) else self.data
+        return self.url.format(**kwargs), data
+
+
+class APIBenchmark:
+    """Benchmark of the endpoints on the data of the database (see module docstring)."""
+
+    def __init__(self, password, repeat=20, keep_response_cache=False, log=print):
+        self.password = password
+        self.repeat = repeat
+        self.keep_response_cache = keep_response_cache
+        self.log = log
+        self.sequence = count()
+
+    def login(self, user):
+        client = APIClient()
+        response = client.post('/login/', {'email': user.email, 'password': self.password}, format='json')
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        client.refresh_token = response.data['refresh']
+        return client
+
+    def prepare(self):
+        """Choose the objects of the benchmark: the biggest project, its author, its issue with most comments."""
+
+        self.project = Project.objects.annotate(issues_count=Count('issues')).order_by('-issues_count', 'pk').first()
+        if self.project is None:
+            raise ValueError("The database has no project: seed it first.")
+        self.author = Contributor.objects.select_related('user').get(project=self.project, permission='AUTHOR').user
+        issues = Issue.objects.filter(project=self.project).annotate(comments_count=Count('comments'))
+        self.issue = issues.order_by('-comments_count', 'pk').first()
+        self.comment = Comment.objects.filter(issue=self.issue).order_by('pk').first()
+
+        self.password_hash = make_password(self.password)
+        self.author.is_staff = True  # For the cache statistics
+        self.author.save()
+        self.clients = {'contributor': self.login(self.author), 'anonymous': APIClient()}
+
+    def new_email(self):
+        return f'benchmark{next(self.sequence)}-{timezone.now().timestamp()}@bench.example'
+
+    def new_issue(self):
+        return Issue.objects.create(
+            project=self.project, title='Benchmark issue', description='Benchmark', status='TODO',
+            author=self.author, assignee_user=self.author,
+        )
+
+    def new_comment(self):
+        return Comment.objects.create(issue=self.issue, author=self.author, description='Benchmark')
+
+    def new_project(self):
+        project = Project.objects.create(title='Benchmark project', type='back-end')
+        Contributor.objects.create(project=project, user=self.author, permission='AUTHOR')
+        return project
+
+    def new_outsider(self):
+        return User.objects.create(email=self.new_email(), first_name='Bench', last_name='User',
+                                   password=self.password_hash)
+
+    def get_endpoints(self):
+        project, issue, comment = self.project.pk, self.issue.pk, self.comment.pk if self.comment else 0
+        project_url = f'/projects/{project}'
+        issue_url = f'{project_url}/issues/{issue}'
+        issue_data = {
+            'title': 'Benchmark issue', 'description': 'Benchmark', 'status': 'TODO', 'priority': 'LOW', 'tag': 'BUG',
+            'assignee_user': {'email': self.author.email, 'first_name': self.author.first_name,
+                              'last_name': self.author.last_name},
+        }
+
+        def user_data(user):
+            return {'user': {'email': user.email, 'first_name': user.first_name, 'last_name': user.last_name},
+                    'permission': 'MANAGER'}
+
+        return [
+            # users/urls.py
+            Endpoint('signup', 'post', '/signup/', lambda: {
+                'email': self.new_email(), 'first_name': 'Bench', 'last_name': 'User', 'password': self.password,
+            }, client='anonymous'),
+            Endpoint('login', 'post', '/login/', {'email': self.author.email, 'password': self.password},
+                     client='anonymous'),
+            Endpoint('token_obtain', 'post', '/token/obtain/', {'email': self.author.email, 'password': self.password},
+                     client='anonymous'),
+            Endpoint('token_refresh', 'post', '/token/refresh/',
+                     {'refresh': self.clients['contributor'].refresh_token}, client='anonymous'),
+            # projects
+            Endpoint('projects_list', 'get', '/projects/'),
+            Endpoint('projects_create', 'post', '/projects/', {'title': 'Benchmark project', 'type': 'back-end'}),
+            Endpoint('projects_retrieve', 'get', f'{project_url}/'),
+            Endpoint('projects_update', 'put', '/projects/{pk}/', {'title': 'Benchmark project', 'type': 'iOS'},
+                     setup=lambda: {'pk': self.new_project().pk}),
+            Endpoint('projects_destroy', 'delete', '/projects/{pk}/', setup=lambda: {'pk': self.new_project().pk}),
+            Endpoint('projects_search', 'get', f'{project_url}/search/?q=login'),
+            Endpoint('projects_stats', 'get', f'{project_url}/stats/'),
+            Endpoint('projects_throughput', 'get', f'{project_url}/throughput/'),
+            Endpoint('projects_export', 'get', f'{project_url}/export/'),
+            # contributors
+            Endpoint('users_list', 'get', f'{project_url}/users/'),
+            Endpoint('users_retrieve', 'get', f'{project_url}/users/{self.author.pk}/'),
+            Endpoint('users_create', 'post', f'{project_url}/users/', lambda user: user_data(user),
+                     setup=lambda: {'user': self.new_outsider()}),
+            Endpoint('users_bulk', 'post', f'{project_url}/users/bulk/',
+                     lambda users: [{'email': user.email, 'permission': 'CREATOR'} for user in users],
+                     setup=lambda: {'users': [self.new_outsider() for _ in range(10)]}),
+            Endpoint('users_destroy', 'delete', f'{project_url}/users/{{pk}}/', setup=lambda: {
+                'pk': Contributor.objects.create(project=self.project, user=self.new_outsider(),
+                                                 permission='CREATOR').user_id,
+            }),
+            # issues
+            Endpoint('issues_list', 'get', f'{project_url}/issues/'),
+            Endpoint('issues_list_filtered', 'get', f'{project_url}/issues/?status=TODO,IN_PR&ordering=-created_time'),
+            Endpoint('issues_create', 'post', f'{project_url}/issues/', issue_data),
+            Endpoint('issues_retrieve', 'get', f'{issue_url}/'),
+            Endpoint('issues_update', 'put', f'{project_url}/issues/{{pk}}/', issue_data,
+                     setup=lambda: {'pk': self.new_issue().pk}),
+            Endpoint('issues_destroy', 'delete', f'{project_url}/issues/{{pk}}/',
+                     setup=lambda: {'pk': self.new_issue().pk}),
+            Endpoint('issues_bulk_create', 'post', f'{project_url}/issues/bulk/', [issue_data] * 20),
+            Endpoint('issues_bulk_update', 'patch', f'{project_url}/issues/bulk/',
+                     lambda pks: [{'id': pk, 'status': 'IN_PR'} for pk in pks],
+                     setup=lambda: {'pks': [self.new_issue().pk for _ in range(20)]}),
+            # comments
+            Endpoint('comments_list', 'get', f'{issue_url}/comments/'),
+            Endpoint('comments_create', 'post', f'{issue_url}/comments/', {'description': 'Benchmark'}),
+            Endpoint('comments_retrieve', 'get', f'{issue_url}/comments/{comment}/'),
+            Endpoint('comments_update', 'put', f'{issue_url}/comments/{{pk}}/', {'description': 'Benchmark'},
+                     setup=lambda: {'pk': self.new_comment().pk}),
+            Endpoint('comments_destroy', 'delete', f'{issue_url}/comments/{{pk}}/',
+                     setup=lambda: {'pk': self.new_comment().pk}),
+            # cache statistics (staff)
+            Endpoint('cache_stats', 'get', '/cache-stats/'),
+        ]
+
+    def measure(self, endpoint):
+        client = self.clients[endpoint.client]
+        latencies, queries, sizes, statuses = [], [], [], set()
+        for _ in range(self.repeat):
+            if not self.keep_response_cache:
+                caches[settings.RESPONSE_CACHE_ALIAS].clear()
+            url, data = endpoint.prepare()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method)(url, data, format='json')
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            sizes.append(len(content))
+            statuses.add(response.status_code)
+
+        latencies.sort()
+        result = {f'p{percent}_ms': round(percentile(latencies, percent), 3) for percent in PERCENTILES}
+        result.update({
+            'max_ms': round(latencies[-1], 3),
+            'queries': statistics.median_low(queries),
+            'max_queries': max(queries),
+            'bytes': statistics.median_low(sizes),
+            'statuses': sorted(statuses),
+        })
+        return result
+
+    def run(self):
+        """Measure all the endpoints. Return the results by endpoint name."""
+
+        self.prepare()
+        results = {}
+        for endpoint in self.get_endpoints():
+            results[endpoint.name] = self.measure(endpoint)
+            result = results[endpoint.name]
+            self.log(
+                f"{endpoint.name:24} p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                f"{result['queries']:3} queries  {result['bytes']:8} bytes  {result['statuses']}"
+            )
+        return results
+
+
+def make_baseline(results, dataset, repeat):
+    return {
+        'created': timezone.now().isoformat(),
+        'git_commit': get_git_commit(),
+        'dataset': dataset,
+        'repeat': repeat,
+        'endpoints': results,
+    }
+
+
+def compare(baseline, results, log=print):
+    """Log the changes of p50 latency, queries and bytes of the endpoints compared with a baseline."""
+
+    for name, result in results.items():
+        old = baseline['endpoints'].get(name)
+        if old is None:
+            log(f"{name:24} new endpoint")
+            continue
+        change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+        log(
+            f"{name:24} p50 {old['p50_ms']:8.2f} -> {result['p50_ms']:8.2f} ms ({change:+6.1f}%)  "
+            f"queries {old['queries']:3} -> {result['queries']:3}  bytes {old['bytes']:8} -> {result['bytes']:8}"
+        )
+
+
+def load_baseline(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+        file.write('\n')
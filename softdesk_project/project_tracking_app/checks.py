@@ -0,0 +1,30 @@
+"""System checks of project tracking app (run by manage.py commands, e.g. runserver, and by the test runner)."""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends which keep a cache per process: the entries written by a worker are unknown to the other ones.
+PER_PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PER_PROCESS_CACHE_BACKENDS
+
+
+@register()
+def check_roles_in_token(app_configs, **kwargs):
+    """The roles of access tokens are trusted while their version is the one of the "roles" cache (see roles
+    module): with a cache per process, the other workers would trust the roles of tokens after a change.
+    """
+
+    if not settings.PROJECT_ROLES_IN_TOKEN or is_shared_cache(settings.ROLE_CACHE_ALIAS):
+        return []
+    return [Error(
+        "PROJECT_ROLES_IN_TOKEN requires a shared cache for the roles.",
+        hint=f"Set a file-based or database backend for the '{settings.ROLE_CACHE_ALIAS}' cache "
+             f"(ROLE_CACHE_ALIAS), or set PROJECT_ROLES_IN_TOKEN to False.",
+        id='project_tracking_app.E001',
+    )]
@@ -0,0 +1,101 @@
+"""Request-scoped context of the nested endpoints: /projects/{project_pk}/... and
+/projects/{project_pk}/issues/{issue_pk}/...
+
+The project (and the issue) determined from an endpoint, and the role (Contributor.permission) of the
+authenticated user in this project, are resolved by a single query and kept on the request.
+Permission classes and viewsets share this context instead of fetching the same objects several times.
+"""
+
+from django.db.models import CharField, Subquery, Value
+from django.http import Http404
+
+from .models import Project, Contributor, Issue
+from .roles import role_cache
+
+
+class ProjectContext:
+    """Project, issue and role of the authenticated user determined via an endpoint.
+
+    Attributes:
+    - project: the project of the endpoint.
+    - issue: the issue of the endpoint (None for the endpoints without issue_pk, or if the issue doesn't belong
+    to the project).
+    - role: the permission of the user in the project ('AUTHOR', 'MANAGER', 'CREATOR'), None if the user isn't a
+    contributor of the project.
+    - issue_in_project: False if the endpoint contains an issue which doesn't belong to the project.
+
+    Raise Http404 if the project or the issue doesn't exist.
+    """
+
+    def __init__(self, user, project_pk, issue_pk=None):
+        self.user = user
+        self.project = None
+        self.issue = None
+        self.role = None
+        self.issue_in_project = True
+
+        try:
+            if issue_pk is None:
+                self._resolve_project(project_pk)
+            else:
+                self._resolve_issue(project_pk, issue_pk)
+        except (ValueError, TypeError):  # pk which isn't a number
+            raise Http404
+
+        if user.is_authenticated:
+            role_cache.set(user.pk, self.project.pk, self.role)
+
+    @property
+    def is_contributor(self):
+        return self.role is not None
+
+    @property
+    def is_author(self):
+        return self.role == "AUTHOR"
+
+    def _role_subquery(self, project_pk):
+        """Subquery to get the role of the user in a project (an indexed lookup on Contributor(user, project))."""
+
+        if not self.user.is_authenticated:
+            return Value(None, output_field=CharField())
+        contributors = Contributor.objects.filter(user=self.user, project=project_pk)
+        return Subquery(contributors.values('permission')[:1])
+
+    def _resolve_project(self, project_pk):
+        """Fetch the project with the role of the user (one query)."""
+
+        project = Project.objects.annotate(role=self._role_subquery(project_pk)).filter(pk=project_pk).first()
+        if project is None:
+            raise Http404
+        self.project = project
+        self.role = project.role
+
+    def _resolve_issue(self, project_pk, issue_pk):
+        """Fetch the issue, its project (and the users shown with the issue) with the role of the user (one query)."""
+
+        issues = Issue.objects.select_related('project', 'author', 'assignee_user')
+        issue = issues.annotate(role=self._role_subquery(project_pk)).filter(pk=issue_pk).first()
+        if issue is None:
+            raise Http404
+        self.role = issue.role
+        if str(issue.project_id) == str(project_pk):
+            self.issue = issue
+            self.project = issue.project
+        else:
+            # Nested relationship in the endpoint is not correct: only the project is needed (error path).
+            self.issue_in_project = False
+            self._resolve_project(project_pk)
+
+
+def get_project_context(request, view):
+    """Return the context of the endpoint of a nested view, it is resolved once per request."""
+
+    project_pk = view.kwargs['project_pk']
+    issue_pk = view.kwargs.get('issue_pk')
+    contexts = getattr(request, '_project_contexts', None)
+    if contexts is None:
+        contexts = request._project_contexts = {}
+    key = (project_pk, issue_pk)
+    if key not in contexts:
+        contexts[key] = ProjectContext(request.user, project_pk, issue_pk)
+    return contexts[key]
@@ -0,0 +1,179 @@
+"""Per-project counters of issues (by status, priority, tag and assignee) and comments, for the stats endpoint.
+
+Counting the issues of a big project on each request costs a scan of its issues. Instead, ProjectCounter rows hold
+the counts, and they are updated with UPDATE ... SET count = count + delta (F expressions) by the signals of
+Issue and Comment models (see signals module), in the transaction of the write of the issue or comment:
+- the values of the counted fields of an issue are recorded when it is loaded or created (post_init), then, before
+  it is updated or deleted, they are read again from its row, which is locked until the end of the transaction
+  (see lock_issues): the transition of each write (e.g. status TODO -> COMPLETED) is the one it makes in the
+  database, so two requests which complete the same issue concurrently count it once. Issue.save runs in a
+  transaction for that.
+- bulk writes send bulk_saved signals with their instances, and their deltas are summed before being applied
+  (bulk_update locks the issues first).
+SQLite ignores select_for_update: its writes are serialized by the lock of the database, and a concurrent write
+fails ("database is locked") instead of being counted twice. Writes which bypass the signals (e.g. QuerySet.update)
+make the counters drift: rebuild_project_counters command recomputes them from the issues and comments.
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Issue, Comment, ProjectCounter
+
+ISSUES = 'issues'
+COMMENTS = 'comments'
+# Counted fields of an issue, by dimension.
+ISSUE_DIMENSIONS = {
+    'status': 'status',
+    'priority': 'priority',
+    'tag': 'tag',
+    'assignee': 'assignee_user_id',
+}
+TRACKED_ATTRIBUTE = '_counted_values'
+
+
+def get_counted_values(issue):
+    """Return the counted values of an issue as a tuple of (dimension, value), the first one being its project."""
+
+    return counted_values(issue.project_id, [getattr(issue, attr) for attr in ISSUE_DIMENSIONS.values()])
+
+
+def counted_values(project_pk, field_values):
+    values = [(ISSUES, '')]
+    values += [(dimension, str(value or '')) for dimension, value in zip(ISSUE_DIMENSIONS, field_values)]
+    return project_pk, values
+
+
+def track_issue(issue):
+    """Record the counted values of an issue (unless some of them aren't loaded, e.g. with QuerySet.only)."""
+
+    if all(attr in issue.__dict__ for attr in ('project_id', *ISSUE_DIMENSIONS.values())):
+        setattr(issue, TRACKED_ATTRIBUTE, get_counted_values(issue))
+
+
+def lock_issues(issues):
+    """Record the counted values of the rows of issues about to be updated or deleted, instead of the values they
+    were loaded with, and lock the rows until the end of the transaction. An issue whose row doesn't exist (anymore)
+    has no recorded values.
+    """
+
+    pks = [issue.pk for issue in issues if issue.pk is not None]
+    rows = Issue.objects.select_for_update().filter(pk__in=pks)
+    rows = rows.values_list('pk', 'project', *ISSUE_DIMENSIONS.values())
+    stored = {pk: counted_values(project_pk, field_values) for pk, project_pk, *field_values in rows}
+    for issue in issues:
+        setattr(issue, TRACKED_ATTRIBUTE, stored.get(issue.pk))
+
+
+def get_tracked_values(issue):
+    """Return the counted values of an issue recorded by track_issue as a dict (dimension: value), or None."""
+
+    tracked = getattr(issue, TRACKED_ATTRIBUTE, None)
+    return None if tracked is None else dict(tracked[1])
+
+
+def get_issue_deltas(issue, created=False, deleted=False):
+    """Return a Counter of the changes of counts, keyed by (project_id, dimension, value), due to a saved
+    (created or updated) or deleted issue.
+    """
+
+    deltas = Counter()
+    tracked = getattr(issue, TRACKED_ATTRIBUTE, None)
+    if not created and tracked is not None:
+        project_pk, values = tracked
+        deltas.subtract({(project_pk, dimension, value): 1 for dimension, value in values})
+    if not deleted and (created or tracked is not None):
+        project_pk, values = get_counted_values(issue)
+        deltas.update({(project_pk, dimension, value): 1 for dimension, value in values})
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add the deltas, keyed by (project_id, dimension, value), to the counters (created when needed)."""
+
+    for (project_pk, dimension, value), delta in deltas.items():
+        if delta:
+            add_to_counter(project_pk, dimension, value, delta)
+
+
+def add_to_counter(project_pk, dimension, value, delta):
+    counters = ProjectCounter.objects.filter(project=project_pk, dimension=dimension, value=value)
+    if counters.update(count=F('count') + delta) or delta < 0:
+        return  # A missing counter isn't decremented (e.g. the counters of a deleted project are deleted first).
+    try:
+        with transaction.atomic():
+            ProjectCounter.objects.create(project_id=project_pk, dimension=dimension, value=value, count=delta)
+    except IntegrityError:  # Created meanwhile by a concurrent request
+        counters.update(count=F('count') + delta)
+
+
+def issues_saved(issues, created=False, deleted=False):
+    """Update the counters after issues were saved or deleted, and record their new values."""
+
+    deltas = Counter()
+    for issue in issues:
+        deltas.update(get_issue_deltas(issue, created=created, deleted=deleted))
+        if not deleted:
+            track_issue(issue)
+    apply_deltas(deltas)
+
+
+def comment_added(comment):
+    add_to_counter(comment.issue.project_id, COMMENTS, '', 1)
+
+
+def comment_deleted(comment):
+    # Filtered through the issue, so that the issue isn't loaded (e.g. when the comments of a deleted issue
+    # are deleted by cascade).
+    ProjectCounter.objects.filter(project__issues=comment.issue_id, dimension=COMMENTS).update(count=F('count') - 1)
+
+
+def get_project_stats(project_pk):
+    """Return the counts of a project: total issues and comments, and issues by status, priority, tag, assignee."""
+
+    stats = {
+        ISSUES: 0,
+        COMMENTS: 0,
+        'status': {status: 0 for status, _ in Issue.STATUS_CHOICES},
+        'priority': {priority: 0 for priority, _ in Issue.PRIORITY_CHOICES},
+        'tag': {tag: 0 for tag, _ in Issue.TAG_CHOICES},
+        'assignee': {},
+    }
+    counters = ProjectCounter.objects.filter(project=project_pk).values_list('dimension', 'value', 'count')
+    for dimension, value, count in counters:
+        if dimension in (ISSUES, COMMENTS):
+            stats[dimension] = count
+        elif count:
+            stats[dimension][value] = count
+    return stats
+
+
+def rebuild_counters(project_pks):
+    """Recompute the counters of projects from their issues and comments, in a transaction.
+    Return the number of counters.
+    """
+
+    issues = Issue.objects.filter(project__in=project_pks)
+    rows = [
+        (project_pk, ISSUES, '', count)
+        for project_pk, count in issues.values_list('project').annotate(count=Count('pk')).order_by()
+    ]
+    for dimension, attr in ISSUE_DIMENSIONS.items():
+        counts = issues.values_list('project', attr).annotate(count=Count('pk')).order_by()
+        rows += [(project_pk, dimension, str(value or ''), count) for project_pk, value, count in counts]
+    comments = Comment.objects.filter(issue__project__in=project_pks)
+    rows += [
+        (project_pk, COMMENTS, '', count)
+        for project_pk, count in comments.values_list('issue__project').annotate(count=Count('pk')).order_by()
+    ]
+
+    counters = [
+        ProjectCounter(project_id=project_pk, dimension=dimension, value=value, count=count)
+        for project_pk, dimension, value, count in rows
+    ]
+    with transaction.atomic():
+        ProjectCounter.objects.filter(project__in=project_pks).delete()
+        ProjectCounter.objects.bulk_create(counters)
+    return len(counters)
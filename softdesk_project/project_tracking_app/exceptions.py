@@ -9,3 +9,11 @@ class UniqueConstraint(APIException):
     status_code = 403
     default_detail = ""
     default_code = "unique_constraint"
+
+
+class SearchUnavailable(APIException):
+    """Class to generate exceptions when the full-text search isn't supported by the database."""
+
+    status_code = 503
+    default_detail = "The search isn't available."
+    default_code = "search_unavailable"
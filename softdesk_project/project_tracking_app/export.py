@@ -0,0 +1,123 @@
+"""Streaming export of a whole project (project, contributors, issues and comments) as NDJSON.
+
+Each line is a JSON object with a "record" key (project, contributor, issue or comment) and the fields of a row,
+users being given by their email. Rows are read with .values() and server-side iterators (QuerySet.iterator),
+and lines are sent by chunks of about CHUNK_BYTES as soon as they are built: the memory used doesn't depend
+on the size of the project, and the first bytes are sent before the issues are read.
+The export isn't a snapshot: rows written during the export may or may not be included.
+"""
+
+import datetime
+import json
+import zlib
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+from .models import Project, Contributor, Issue, Comment
+
+CHUNK_BYTES = 64 * 1024
+ROWS_PER_QUERY = 2000
+
+PROJECT_FIELDS = ('id', 'title', 'type', 'description')
+CONTRIBUTOR_FIELDS = ('user__email', 'permission')
+ISSUE_FIELDS = (
+    'id', 'title', 'description', 'tag', 'priority', 'status', 'author__email', 'assignee_user__email',
+    'created_time', 'updated_time',
+)
+COMMENT_FIELDS = ('id', 'issue_id', 'description', 'author__email', 'created_time', 'updated_time')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renderer of the export endpoint: it only renders its errors (the export itself is streamed)."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=DjangoJSONEncoder).encode() + b'\n'
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """JSON encoder of the lines: datetimes keep their microseconds (DjangoJSONEncoder truncates them to
+    milliseconds), so that the rows imported from an export have the timestamps of the exported ones.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            value = o.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return super().default(o)
+
+
+class NDJSONContentNegotiation(BaseContentNegotiation):
+    """Content negotiation of the export endpoint: the export is NDJSON whatever the Accept header of the client
+    (e.g. "application/json" of a generic client would get 406 Not Acceptable otherwise).
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def to_line(record_type, row):
+    """Return a NDJSON line of a row (a dict of .values()); the "__email" suffixes of user fields are removed."""
+
+    record = {'record': record_type}
+    record.update((field.replace('__email', ''), value) for field, value in row.items())
+    return json.dumps(record, cls=ExportJSONEncoder).encode() + b'\n'
+
+
+def export_lines(project_pk):
+    """Generate the lines of the export of a project."""
+
+    yield to_line('project', Project.objects.filter(pk=project_pk).values(*PROJECT_FIELDS).get())
+    querysets = (
+        ('contributor', Contributor.objects.filter(project=project_pk).values(*CONTRIBUTOR_FIELDS)),
+        ('issue', Issue.objects.filter(project=project_pk).values(*ISSUE_FIELDS)),
+        ('comment', Comment.objects.filter(issue__project=project_pk).values(*COMMENT_FIELDS)),
+    )
+    for record_type, rows in querysets:
+        for row in rows.order_by('pk').iterator(chunk_size=ROWS_PER_QUERY):
+            yield to_line(record_type, row)
+
+
+def to_chunks(lines):
+    """Group lines into chunks of about CHUNK_BYTES."""
+
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def gzip_chunks(chunks):
+    """Compress chunks as a gzip stream, each chunk being flushed (so it can be decompressed on arrival)."""
+
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_project(project_pk, compress=False):
+    """Return an iterator of the (optionally gzip compressed) chunks of the export of a project.
+    The project line is built at once and sent as the first chunk.
+    """
+
+    lines = export_lines(project_pk)
+    chunks = chain([next(lines)], to_chunks(lines))
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,123 @@
+"""Filter backends for the list endpoints of project tracking app.
+
+Query parameters are validated (and rejected with a 400 response) before the list query runs,
+then they are pushed into a single SQL query which uses the indexes of the issues (see Issue.Meta).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.settings import api_settings
+
+from .models import Issue
+
+
+class IssueFilterSerializer(serializers.Serializer):
+    """Serializer is used to validate the query parameters of the list of issues.
+    A parameter with several values is given several times (?status=TODO&status=IN_PR) or separated by commas
+    (?status=TODO,IN_PR).
+    """
+
+    MULTIPLE_FIELDS = ('status', 'priority', 'tag', 'assignee_user', 'author')
+
+    status = serializers.MultipleChoiceField(choices=Issue.STATUS_CHOICES, required=False)
+    priority = serializers.MultipleChoiceField(choices=Issue.PRIORITY_CHOICES, required=False)
+    tag = serializers.MultipleChoiceField(choices=Issue.TAG_CHOICES, required=False)
+    assignee_user = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=100)
+    author = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=100)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if 'created_after' in attrs and 'created_before' in attrs and attrs['created_after'] > attrs['created_before']:
+            raise serializers.ValidationError("created_after must be before created_before.")
+        return attrs
+
+
+class ThroughputQuerySerializer(serializers.Serializer):
+    """Serializer is used to validate the query parameters of the throughput of a project: a range of days
+    (the last DEFAULT_DAYS days by default, MAX_DAYS days at most) and optionally a priority.
+    """
+
+    DEFAULT_DAYS = 30
+    MAX_DAYS = 366
+
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    priority = serializers.ChoiceField(choices=Issue.PRIORITY_CHOICES, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        attrs.setdefault('until', timezone.localdate())
+        attrs.setdefault('since', attrs['until'] - timedelta(days=self.DEFAULT_DAYS - 1))
+        if attrs['since'] > attrs['until']:
+            raise serializers.ValidationError("since must be before until.")
+        if (attrs['until'] - attrs['since']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"The range can't be longer than {self.MAX_DAYS} days.")
+        return attrs
+
+
+class IssueFilterBackend(BaseFilterBackend):
+    """Filter the list of issues of a project by status, priority, tag, assignee user, author and creation time.
+    Unknown query parameters are rejected too (e.g. a typo would silently return the whole list otherwise).
+    """
+
+    # Query parameters of the other components of the list (ordering, cursor pagination, format suffix, profiling).
+    other_params = ('ordering', 'cursor', 'page_size', api_settings.URL_FORMAT_OVERRIDE, settings.PROFILE_QUERY_PARAM)
+
+    def get_filter_params(self, request):
+        """Return the validated query parameters (raise ValidationError if a parameter is invalid)."""
+
+        unknown_params = set(request.query_params) - set(IssueFilterSerializer().fields) - set(self.other_params)
+        if unknown_params:
+            raise ValidationError({param: ["Unknown query parameter."] for param in sorted(unknown_params)})
+
+        data = {}
+        for param in request.query_params:
+            if param in IssueFilterSerializer.MULTIPLE_FIELDS:
+                values = request.query_params.getlist(param)
+                data[param] = [value for values_list in values for value in values_list.split(',') if value]
+            else:
+                data[param] = request.query_params[param]
+
+        serializer = IssueFilterSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) != 'list':
+            return queryset
+
+        params = self.get_filter_params(request)
+        lookups = {}
+        for field in IssueFilterSerializer.MULTIPLE_FIELDS:
+            if params.get(field):
+                lookups[f'{field}__in'] = params[field]
+        if 'created_after' in params:
+            lookups['created_time__gte'] = params['created_after']
+        if 'created_before' in params:
+            lookups['created_time__lt'] = params['created_before']
+        return queryset.filter(**lookups)
+
+
+class StrictOrderingFilter(OrderingFilter):
+    """Ordering filter which rejects the fields which aren't in the ordering_fields of the view
+    (OrderingFilter ignores them silently).
+    The primary key is added as the last ordering field, so the order is always deterministic.
+    """
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid_fields = super().remove_invalid_fields(queryset, fields, view, request)
+        invalid_fields = [field for field in fields if field not in valid_fields]
+        if invalid_fields:
+            raise ValidationError({self.ordering_param: [f"Invalid ordering field: {', '.join(invalid_fields)}."]})
+        return valid_fields
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if ordering and ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,212 @@
+"""Bulk import of projects, contributors, issues and comments (see import_tracker command).
+
+The input is read as a stream of records, in the format of the export (see export module): a NDJSON file, or a CSV
+file whose columns are the keys of the records ("record", "id", "title"...), optionally gzip compressed.
+A project record is followed by its contributors and issues, and a comment follows its issue.
+
+- Users are given by their email, which is mapped to their id with an in-memory index of all users. A first pass
+  over the input lists the unknown emails: the import stops, unless the missing users are created (inactive).
+- Ids are allocated explicitly: the new id of a row is its id in the input plus an offset per model (the greatest
+  id of the table when the import starts), so that comments reference their issues without reading back the
+  inserted rows. The sequences of the ids are reset at the end (e.g. for PostgreSQL). The rows created meanwhile
+  by the API could take the same ids: the import is meant to run while the API doesn't write.
+- Rows are inserted with bulk_create by batches. Each batch is inserted in a transaction which also saves the
+  checkpoint of the import (ImportCheckpoint model): an interrupted import restarts after its last batch.
+  bulk_saved signals keep the derived data (search index, counters, versions, status events) up to date.
+- The issues and comments are inserted with the timestamps of the input, instead of now for their
+  auto_now/auto_now_add fields (see TimestampField).
+"""
+
+import csv
+import gzip
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import EXPLICIT_TIMESTAMPS_ATTRIBUTE, Project, Contributor, Issue, Comment, ImportCheckpoint
+from .signals import bulk_saved
+
+User = get_user_model()
+
+IMPORTED_MODELS = (Project, Contributor, Issue, Comment)  # In the order of their insertion
+USER_FIELDS = {
+    'contributor': ('user',),
+    'issue': ('author', 'assignee_user'),
+    'comment': ('author',),
+}
+
+
+class TrackerImportError(Exception):
+    """Error of the input of an import (the message gives the number of the record)."""
+
+
+def read_records(path):
+    """Generate the records of a NDJSON or CSV file (.csv extension), optionally gzip compressed (.gz extension)."""
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if path.endswith(('.csv', '.csv.gz')):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class TrackerImporter:
+    """Import of a file, resumed from its checkpoint (keyed by source)."""
+
+    def __init__(self, path, source=None, batch_size=5000, create_users=False, log=print):
+        self.path = path
+        self.source = source or path
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.log = log
+        self.users = {}
+        self.pending = {model: [] for model in IMPORTED_MODELS}
+        self.pending_count = 0
+        self.checkpoint = None
+
+    def load_users(self):
+        """Build the index of users by email, create the missing users or raise TrackerImportError."""
+
+        self.users = dict(User.objects.values_list('email', 'pk'))
+        missing = set()
+        for record in read_records(self.path):
+            for field in USER_FIELDS.get(record.get('record'), ()):
+                email = record.get(field)
+                if email and email not in self.users:
+                    missing.add(email)
+        if missing and not self.create_users:
+            raise TrackerImportError(f"{len(missing)} unknown users, e.g. {', '.join(sorted(missing)[:5])}.")
+        if missing:
+            users = [User(email=email, first_name='', last_name='', is_active=False) for email in sorted(missing)]
+            for user in users:
+                user.set_unusable_password()
+            User.objects.bulk_create(users)
+            self.users = dict(User.objects.values_list('email', 'pk'))
+            self.log(f"Created {len(users)} inactive users.")
+
+    def load_checkpoint(self):
+        self.checkpoint, created = ImportCheckpoint.objects.get_or_create(source=self.source)
+        if created or 'offsets' not in self.checkpoint.state:
+            self.checkpoint.state = {
+                'offsets': {
+                    model.__name__: model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+                    for model in (Project, Issue, Comment)
+                },
+                'project': None,
+            }
+            self.checkpoint.save()
+
+    def new_id(self, model, record):
+        return int(record['id']) + self.checkpoint.state['offsets'][model.__name__]
+
+    def user_id(self, record, field):
+        return self.users[record[field]]
+
+    def timestamp(self, record, field):
+        value = record.get(field)
+        return (parse_datetime(value) if value else None) or timezone.now()
+
+    def build(self, record):
+        """Return the instance of a record."""
+
+        record_type = record.get('record')
+        state = self.checkpoint.state
+        if record_type == 'project':
+            project = Project(
+                id=self.new_id(Project, record), title=record['title'], type=record['type'],
+                description=record.get('description') or '',
+            )
+            state['project'] = project.pk
+            return project
+        if state['project'] is None:
+            raise TrackerImportError(f"Record {self.checkpoint.records + 1}: a project record must come first.")
+        if record_type == 'contributor':
+            return Contributor(
+                project_id=state['project'], user_id=self.user_id(record, 'user'), permission=record['permission'],
+            )
+        if record_type == 'issue':
+            issue = Issue(
+                id=self.new_id(Issue, record), project_id=state['project'],
+                title=record['title'], description=record.get('description') or '',
+                tag=record.get('tag') or '', priority=record.get('priority') or '', status=record.get('status') or '',
+                author_id=self.user_id(record, 'author'),
+                assignee_user_id=self.user_id(record, 'assignee_user' if record.get('assignee_user') else 'author'),
+                created_time=self.timestamp(record, 'created_time'),
+                updated_time=self.timestamp(record, 'updated_time'),
+            )
+            setattr(issue, EXPLICIT_TIMESTAMPS_ATTRIBUTE, True)
+            return issue
+        if record_type == 'comment':
+            comment = Comment(
+                id=self.new_id(Comment, record), issue_id=int(record['issue_id']) + state['offsets']['Issue'],
+                description=record.get('description') or '', author_id=self.user_id(record, 'author'),
+                created_time=self.timestamp(record, 'created_time'),
+                updated_time=self.timestamp(record, 'updated_time'),
+            )
+            setattr(comment, EXPLICIT_TIMESTAMPS_ATTRIBUTE, True)
+            return comment
+        raise TrackerImportError(f"Record {self.checkpoint.records + 1}: unknown record type {record_type!r}.")
+
+    def flush(self):
+        """Insert the pending rows and save the checkpoint in a transaction."""
+
+        with transaction.atomic():
+            for model, instances in self.pending.items():
+                if not instances:
+                    continue
+                model.objects.bulk_create(instances, ignore_conflicts=model is Contributor)
+                bulk_saved.send(sender=model, instances=instances, created=True)
+            self.checkpoint.save()
+        self.pending = {model: [] for model in IMPORTED_MODELS}
+        self.pending_count = 0
+
+    def reset_sequences(self):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), IMPORTED_MODELS):
+                cursor.execute(sql)
+
+    def run(self):
+        """Import the records which aren't imported yet. Return the number of records imported by this run."""
+
+        self.load_checkpoint()
+        if self.checkpoint.done:
+            self.log(f"{self.source} is already imported.")
+            return 0
+        self.load_users()
+
+        skipped = self.checkpoint.records
+        imported = 0
+        started = time.monotonic()
+        for number, record in enumerate(read_records(self.path), start=1):
+            if number <= skipped:
+                continue
+            try:
+                instance = self.build(record)
+            except (KeyError, TypeError, ValueError) as error:
+                raise TrackerImportError(f"Record {number}: invalid or missing value ({error!r}).")
+            self.pending[type(instance)].append(instance)
+            self.pending_count += 1
+            self.checkpoint.records = number
+            if self.pending_count >= self.batch_size:
+                imported += self.pending_count
+                self.flush()
+                rate = imported / (time.monotonic() - started)
+                self.log(f"{number} records imported ({rate:.0f} records/s).")
+
+        imported += self.pending_count
+        self.checkpoint.done = True
+        self.flush()
+        self.reset_sequences()
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.log(f"{imported} records imported in {elapsed:.1f}s ({rate:.0f} records/s).")
+        return imported
@@ -0,0 +1,274 @@
+"""In-process load test of the ASGI (or WSGI) application (see loadtest_asgi command).
+
+Virtual users call the ASGI application directly, concurrently in an asyncio event loop, without network: each
+request is an ASGI HTTP scope whose events are exchanged with the application in memory. To compare with the WSGI
+path, the WSGI application is called instead by a pool of threads, one per virtual user, as a threaded WSGI server
+would. A virtual user runs journeys, as a client of the API would:
+- login: POST /login/ (once per virtual user),
+- projects: GET /projects/, then the user picks one of his projects,
+- issues: GET /projects/{id}/issues/,
+- issue: POST /projects/{id}/issues/,
+- comment: POST /projects/{id}/issues/{id}/comments/,
+- comments: GET /projects/{id}/issues/{id}/comments/.
+
+For each concurrency level (number of virtual users at once), the results give the throughput (requests per
+second), the latency percentiles, the error rate, and the database contention: the SQLite "database is locked"
+errors, and the mean database time per request (from the Server-Timing header, see timing module), which grows
+when the queries wait for locks. The knee of the sweep is the level which maximizes the power (throughput divided
+by p95 latency): beyond it, latency grows faster than throughput.
+"""
+
+import asyncio
+import io
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.signals import got_request_exception
+
+from .benchmark import percentile
+
+STEPS = ('login', 'projects', 'issues', 'issue', 'comment', 'comments')
+PERCENTILES = (50, 95, 99)
+DB_TIMING = re.compile(r'\bdb;dur=([0-9.]+)')
+
+
+class ASGIClient:
+    """Client sending HTTP requests to an ASGI application in memory."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def request(self, method, path, data=None, token=None):
+        """Return the status, headers (dict) and decoded JSON content (or None) of the response."""
+
+        body = json.dumps(data).encode() if data is not None else b''
+        headers = [(b'host', b'testserver'), (b'content-type', b'application/json'),
+                   (b'content-length', str(len(body)).encode())]
+        if token:
+            headers.append((b'authorization', f'Bearer {token}'.encode()))
+        path, _, query_string = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': query_string.encode(), 'root_path': '',
+            'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+        events = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        response = {'status': None, 'headers': {}, 'body': []}
+
+        async def receive():
+            if events:
+                return events.pop()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {name.decode().lower(): value.decode() for name, value in message['headers']}
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.application(scope, receive, send)
+        return decode_response(response['status'], response['headers'], b''.join(response['body']))
+
+
+class WSGIClient:
+    """Client sending HTTP requests to a WSGI application in memory, from a pool of threads (one per concurrent
+    request, as a threaded WSGI server), so that it can be used in an asyncio event loop as ASGIClient.
+    """
+
+    def __init__(self, application, threads):
+        self.application = application
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def call(self, method, path, body, token):
+        path, _, query_string = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method, 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': query_string,
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'testserver', 'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = {name.lower(): value for name, value in headers}
+
+        result = self.application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()  # Sends request_finished signal (closes the database connection).
+        return decode_response(response['status'], response['headers'], content)
+
+    async def request(self, method, path, data=None, token=None):
+        """Return the status, headers (dict) and decoded JSON content (or None) of the response."""
+
+        body = json.dumps(data).encode() if data is not None else b''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.call, method, path, body, token)
+
+
+def decode_response(status, headers, content):
+    is_json = headers.get('content-type', '').startswith('application/json')
+    return status, headers, json.loads(content) if is_json and content else None
+
+
+class LoadTestResults:
+    """Results of the requests of a concurrency level."""
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.latencies = defaultdict(list)  # By step, in milliseconds
+        self.errors = Counter()  # By step
+        self.db_durations = []
+        self.exceptions = Counter()  # By exception type (server errors)
+        self.locked = 0
+        self.elapsed = 0
+
+    def add(self, step, latency, status, headers):
+        self.latencies[step].append(latency * 1000)
+        if status is None or status >= 400:
+            self.errors[step] += 1
+        match = DB_TIMING.search(headers.get('server-timing', ''))
+        if match:
+            self.db_durations.append(float(match.group(1)))
+
+    def add_exception(self, exception):
+        self.exceptions[type(exception).__name__] += 1
+        if 'database is locked' in str(exception) or 'database table is locked' in str(exception):
+            self.locked += 1
+
+    def summary(self):
+        latencies = sorted(latency for step in self.latencies.values() for latency in step)
+        requests = len(latencies)
+        summary = {
+            'concurrency': self.concurrency,
+            'requests': requests,
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput_rps': round(requests / self.elapsed, 1) if self.elapsed else 0,
+            **{f'p{percent}_ms': round(percentile(latencies, percent), 1) if latencies else None
+               for percent in PERCENTILES},
+            'error_rate': round(sum(self.errors.values()) / requests, 4) if requests else 0,
+            'locked_errors': self.locked,
+            'exceptions': dict(self.exceptions),
+            'mean_db_ms': round(statistics.mean(self.db_durations), 2) if self.db_durations else None,
+            'steps': {},
+        }
+        for step in STEPS:
+            step_latencies = sorted(self.latencies.get(step, ()))
+            if step_latencies:
+                summary['steps'][step] = {
+                    'requests': len(step_latencies),
+                    'errors': self.errors[step],
+                    **{f'p{percent}_ms': round(percentile(step_latencies, percent), 1) for percent in PERCENTILES},
+                }
+        return summary
+
+
+class LoadTest:
+    """Load test of an application by virtual users (see module docstring).
+
+    client is an ASGIClient or a WSGIClient of the application. users is the list of the emails of the users
+    (contributors of projects) which the virtual users log in as.
+    """
+
+    def __init__(self, client, users, password, journeys=5, seed=0, log=print):
+        self.client = client
+        self.users = users
+        self.password = password
+        self.journeys = journeys
+        self.seed = seed
+        self.log = log
+        self.results = None
+
+    async def timed_request(self, step, method, path, data=None, token=None):
+        started = time.perf_counter()
+        status, headers, content = await self.client.request(method, path, data, token)
+        self.results.add(step, time.perf_counter() - started, status, headers)
+        return status, content
+
+    async def virtual_user(self, number):
+        """Log in as a user, then run the journeys."""
+
+        email = self.users[number % len(self.users)]
+        randomizer = random.Random(self.seed * 100003 + number)
+        status, content = await self.timed_request('login', 'POST', '/login/',
+                                                   {'email': email, 'password': self.password})
+        if status != 200:
+            return
+        token = content['access']
+        for journey in range(self.journeys):
+            status, content = await self.timed_request('projects', 'GET', '/projects/', token=token)
+            projects = content.get('results', []) if isinstance(content, dict) else content or []
+            if status != 200 or not projects:
+                return
+            project = randomizer.choice(projects)
+            await self.timed_request('issues', 'GET', f"/projects/{project['id']}/issues/", token=token)
+            assignee = next((user for user in project['users'] if user['email'] == email), project['users'][0])
+            issue_data = {
+                'title': f'Load test issue {number}.{journey}', 'description': 'Load test', 'tag': 'BUG',
+                'priority': randomizer.choice(('LOW', 'MEDIUM', 'HIGH')), 'status': 'TODO',
+                'assignee_user': {key: assignee[key] for key in ('email', 'first_name', 'last_name')},
+            }
+            status, issue = await self.timed_request('issue', 'POST', f"/projects/{project['id']}/issues/",
+                                                     issue_data, token)
+            if status not in (200, 201):
+                continue
+            comments_path = f"/projects/{project['id']}/issues/{issue['id']}/comments/"
+            await self.timed_request('comment', 'POST', comments_path, {'description': 'Load test comment'}, token)
+            await self.timed_request('comments', 'GET', comments_path, token=token)
+
+    async def run_level(self, concurrency):
+        """Run concurrency virtual users at once. Return the summary of their requests."""
+
+        self.results = LoadTestResults(concurrency)
+
+        def record_exception(sender, **kwargs):
+            exception = sys.exc_info()[1]  # The signal is sent while the exception is handled.
+            if exception is not None:
+                self.results.add_exception(exception)
+
+        got_request_exception.connect(record_exception, weak=False)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(self.virtual_user(number) for number in range(concurrency)))
+        finally:
+            self.results.elapsed = time.perf_counter() - started
+            got_request_exception.disconnect(record_exception)
+        return self.results.summary()
+
+    def sweep(self, levels):
+        """Run the concurrency levels one after the other. Return their summaries and the knee level."""
+
+        summaries = []
+        for concurrency in levels:
+            summary = asyncio.run(self.run_level(concurrency))
+            summaries.append(summary)
+            self.log(
+                f"{concurrency:5} users  {summary['requests']:6} requests  {summary['throughput_rps']:8.1f} req/s  "
+                f"p50 {summary['p50_ms']:8.1f}  p95 {summary['p95_ms']:8.1f}  p99 {summary['p99_ms']:8.1f} ms  "
+                f"errors {summary['error_rate']:6.1%}  locked {summary['locked_errors']:4}  "
+                f"db {summary['mean_db_ms'] or 0:6.2f} ms/request"
+            )
+        return summaries, find_knee(summaries)
+
+
+def find_knee(summaries):
+    """Return the concurrency level with the greatest power (throughput / p95 latency), or None."""
+
+    powered = [summary for summary in summaries if summary['requests'] and summary['p95_ms']]
+    if not powered:
+        return None
+    return max(powered, key=lambda summary: summary['throughput_rps'] / summary['p95_ms'])['concurrency']
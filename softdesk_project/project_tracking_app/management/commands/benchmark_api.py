@@ -0,0 +1,57 @@
+"""Command to benchmark the API endpoints on a seeded test database (see benchmark and seeding modules)."""
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from project_tracking_app.benchmark import APIBenchmark, compare, load_baseline, make_baseline, save_baseline
+from project_tracking_app.seeding import DatasetSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a test database, request every endpoint several times, and write the latency percentiles, "
+        "numbers of queries and response sizes into a JSON baseline (optionally compared with a previous one)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark.json', help="Path of the JSON baseline to write.")
+        parser.add_argument('--compare', help="Path of a previous baseline to compare with.")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of requests per endpoint.")
+        parser.add_argument('--keep-response-cache', action='store_true',
+                            help="Don't clear the response cache before each request.")
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--contributors', type=int, default=8, help="Number of contributors per project.")
+        parser.add_argument('--issues', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--skew', type=float, default=1.1, help="Exponent of the Zipf-like distributions.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator.")
+
+    def handle(self, *args, **options):
+        dataset = {
+            name: options[name] for name in ('users', 'projects', 'contributors', 'issues', 'comments', 'skew', 'seed')
+        }
+        password = 'benchmark-password'
+        baseline = load_baseline(options['compare']) if options['compare'] else None
+
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            DatasetSeeder(password=password, log=self.stdout.write, **dataset).run()
+            results = APIBenchmark(
+                password, repeat=options['repeat'], keep_response_cache=options['keep_response_cache'],
+                log=self.stdout.write,
+            ).run()
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        save_baseline(options['output'], make_baseline(results, dataset, options['repeat']))
+        self.stdout.write(f"Baseline written to {options['output']}.")
+        if baseline is not None:
+            compare(baseline, results, log=self.stdout.write)
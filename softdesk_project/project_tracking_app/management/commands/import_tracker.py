@@ -0,0 +1,29 @@
+"""Command to import projects, contributors, issues and comments from a NDJSON or CSV file (see importer module)."""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from project_tracking_app.importer import TrackerImporter, TrackerImportError
+
+
+class Command(BaseCommand):
+    help = (
+        "Import projects with their contributors, issues and comments from a file in the format of the export "
+        "(NDJSON, or CSV with a .csv extension, optionally gzip compressed). An interrupted import is resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the file.")
+        parser.add_argument('--source', help="Name of the checkpoint of the import (the path by default).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Number of records per transaction.")
+        parser.add_argument('--create-users', action='store_true', help="Create the unknown users (inactive).")
+
+    def handle(self, *args, **options):
+        importer = TrackerImporter(
+            options['path'], source=options['source'], batch_size=options['batch_size'],
+            create_users=options['create_users'], log=self.stdout.write,
+        )
+        try:
+            importer.run()
+        except (TrackerImportError, IntegrityError, OSError) as error:
+            raise CommandError(str(error))
@@ -0,0 +1,107 @@
+"""Command to load test the ASGI application in process, at several concurrency levels (see loadtest module)."""
+
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from project_tracking_app.loadtest import ASGIClient, LoadTest, WSGIClient
+from project_tracking_app.models import Contributor
+from project_tracking_app.seeding import DatasetSeeder
+
+ASYNC_URLCONF = 'softdesk_project.async_urls'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a test database, then run journeys of virtual users (login, list projects and issues, create an "
+        "issue, comment, list comments) against the ASGI (or WSGI) application at each concurrency level, and "
+        "report throughput, latency percentiles, errors and database lock contention."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,5,10,25,50,100,200',
+                            help="Comma-separated numbers of concurrent virtual users.")
+        parser.add_argument('--journeys', type=int, default=3, help="Number of journeys per virtual user.")
+        parser.add_argument('--output', help="Path of a JSON file to write the results to.")
+        parser.add_argument('--mode', choices=('asgi', 'wsgi'), default='asgi',
+                            help="Application to load: ASGI (event loop), or WSGI (a thread per virtual user).")
+        parser.add_argument('--async-reads', action='store_true',
+                            help=f"Serve the list and retrieve endpoints by async views ({ASYNC_URLCONF} URLconf), "
+                                 "which still run in worker threads.")
+        parser.add_argument('--database', help="Path of the SQLite test database file (default: a temporary file).")
+        parser.add_argument('--users', type=int, default=300)
+        parser.add_argument('--projects', type=int, default=30)
+        parser.add_argument('--contributors', type=int, default=10, help="Number of contributors per project.")
+        parser.add_argument('--issues', type=int, default=3000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generators.")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of numbers.")
+        if connection.vendor != 'sqlite':
+            raise CommandError("The load test measures the SQLite database: the default database must be SQLite.")
+
+        password = 'loadtest-password'
+        database = options['database'] or os.path.join(tempfile.mkdtemp(), 'loadtest.sqlite3')
+        # A database file (instead of the in-memory test database), so that the locks of SQLite are exercised.
+        connection.settings_dict['TEST']['NAME'] = database
+
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            DatasetSeeder(
+                users=options['users'], projects=options['projects'], contributors=options['contributors'],
+                issues=options['issues'], comments=options['comments'], seed=options['seed'], password=password,
+                log=self.stdout.write,
+            ).run()
+            users = list(Contributor.objects.order_by('user_id').values_list('user__email', flat=True).distinct())
+            connection.close()  # The requests are processed by the threads of the application.
+
+            if options['mode'] == 'asgi':
+                from softdesk_project.asgi import application
+                client = ASGIClient(application)
+            else:
+                from softdesk_project.wsgi import application
+                client = WSGIClient(application, threads=max(levels))
+            if options['async_reads']:
+                # Not ASGI-native: each read holds a worker thread while it authenticates and runs its view.
+                reads = "async views, in sync_to_async worker threads (thread_sensitive=False)"
+            elif options['mode'] == 'asgi':
+                reads = "sync views, in the thread of the sync code"
+            else:
+                reads = "sync views"
+            self.stdout.write(f"{options['mode'].upper()} application, list and retrieve requests: {reads}.")
+
+            # Overriding ROOT_URLCONF clears the caches of the URL resolvers, and restores them afterwards.
+            # The ASGI application resolves its requests with ASGI_URLCONF (see asgi.py).
+            urlconf = ASYNC_URLCONF if options['async_reads'] else settings.ROOT_URLCONF
+            with override_settings(ROOT_URLCONF=urlconf, ASGI_URLCONF=urlconf):
+                summaries, knee = LoadTest(
+                    client, users, password, journeys=options['journeys'], seed=options['seed'],
+                    log=self.stdout.write,
+                ).sweep(levels)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"Knee of the curve: {knee} concurrent users (greatest throughput / p95 latency).")
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'mode': options['mode'], 'async_reads': options['async_reads'], 'reads': reads,
+                           'levels': summaries, 'knee': knee}, file, indent=2)
+                file.write('\n')
+            self.stdout.write(f"Results written to {options['output']}.")
@@ -0,0 +1,22 @@
+"""Command to recompute the counters of the stats endpoint (see counters module), e.g. to repair a drift."""
+
+from django.core.management.base import BaseCommand
+
+from project_tracking_app.counters import rebuild_counters
+from project_tracking_app.models import Project
+
+
+class Command(BaseCommand):
+    help = "Recompute the issue and comment counters of the given projects (all projects by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="Ids of the projects.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Number of projects rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        project_pks = options['project_ids'] or list(Project.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        counters_count = 0
+        for start in range(0, len(project_pks), batch_size):
+            counters_count += rebuild_counters(project_pks[start:start + batch_size])
+        self.stdout.write(f"Rebuilt {counters_count} counters of {len(project_pks)} projects.")
@@ -0,0 +1,41 @@
+"""Command to rebuild or update the full-text search index of issues and comments (see search module)."""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from project_tracking_app import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Index the issues and comments updated since the last run (or since --since). "
+        "With --full, empty the index and index all of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild the whole index.")
+        parser.add_argument('--since', help="Index the rows updated since this ISO 8601 date or datetime.")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Number of rows written per transaction.")
+
+    def handle(self, *args, **options):
+        if not search.is_search_available():
+            raise CommandError("The full-text search isn't supported by the database.")
+
+        since = None
+        if not options['full']:
+            value = options['since'] or search.get_last_reindex_time()
+            if value is None:
+                raise CommandError("No previous run: use --full or --since.")
+            since = parse_datetime(value)
+            if since is None and parse_date(value) is not None:
+                since = parse_datetime(f'{value}T00:00')
+            if since is None:
+                raise CommandError(f"Invalid datetime: {value}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        started = timezone.now()  # Rows updated during the run are indexed again by the next one.
+        issues_count, comments_count = search.reindex(since=since, batch_size=options['batch_size'])
+        search.set_last_reindex_time(started.isoformat())
+        self.stdout.write(f"Indexed {issues_count} issues and {comments_count} comments.")
@@ -0,0 +1,16 @@
+"""Command to aggregate the new issue status events into the daily throughput of projects (see throughput module)."""
+
+from django.core.management.base import BaseCommand
+
+from project_tracking_app.throughput import rollup_events
+
+
+class Command(BaseCommand):
+    help = "Aggregate the issue status events recorded since the last run into the daily throughput of projects."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help="Number of events per transaction.")
+
+    def handle(self, *args, **options):
+        count = rollup_events(batch_size=options['batch_size'])
+        self.stdout.write(f"Aggregated {count} events.")
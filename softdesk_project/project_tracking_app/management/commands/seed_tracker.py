@@ -0,0 +1,27 @@
+"""Command to insert a synthetic dataset of users, projects, contributors, issues and comments (see seeding module)."""
+
+from django.core.management.base import BaseCommand
+
+from project_tracking_app.seeding import DatasetSeeder
+
+
+class Command(BaseCommand):
+    help = "Insert a synthetic dataset with skewed distributions (all users have the same password)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=100)
+        parser.add_argument('--contributors', type=int, default=10, help="Number of contributors per project.")
+        parser.add_argument('--issues', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--skew', type=float, default=1.1, help="Exponent of the Zipf-like distributions.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator.")
+        parser.add_argument('--password', default='seed-password', help="Password of the users.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Number of rows per transaction.")
+
+    def handle(self, *args, **options):
+        DatasetSeeder(
+            users=options['users'], projects=options['projects'], contributors=options['contributors'],
+            issues=options['issues'], comments=options['comments'], skew=options['skew'], seed=options['seed'],
+            password=options['password'], batch_size=options['batch_size'], log=self.stdout.write,
+        ).run()
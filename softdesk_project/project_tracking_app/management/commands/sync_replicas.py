@@ -0,0 +1,44 @@
+"""Command to copy the primary SQLite database to its SQLite replicas (see replicas module)."""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from project_tracking_app.replicas import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database to the SQLite replicas of DATABASE_REPLICAS setting, once, or every "
+        "--interval seconds until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('replicas', nargs='*', help="Aliases of the replicas (default: DATABASE_REPLICAS).")
+        parser.add_argument('--interval', type=float, nargs='?', const=settings.REPLICA_SYNC_SECONDS,
+                            help="Sync the replicas again every INTERVAL seconds "
+                                 f"(default: REPLICA_SYNC_SECONDS, {settings.REPLICA_SYNC_SECONDS}).")
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or settings.DATABASE_REPLICAS
+        if not replicas:
+            raise CommandError("No replicas: set DATABASE_REPLICAS setting.")
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if alias not in connections.databases:
+                raise CommandError(f"Unknown database: {alias}.")
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"The database {alias} isn't a SQLite database: replicate it with the server.")
+        if DEFAULT_DB_ALIAS in replicas:
+            raise CommandError("The primary database can't be a replica.")
+
+        interval = options['interval']
+        while True:
+            started = time.monotonic()
+            for alias in replicas:
+                duration = sync_replica(alias)
+                self.stdout.write(f"{alias} synced in {duration * 1000:.1f} ms.")
+            if interval is None:
+                return
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,180 @@
+"""Operational metrics, exposed in the Prometheus text format by the /metrics endpoint (see MetricsView).
+
+Each process records its metrics in memory (see registry): the counts and latency of the requests by route (the
+URL name given by the routers, e.g. "comments-list"), method and status, the number and time of their SQL queries
+(see timing module), the authentication and permission failures of the permission checks (see TimingMixin), and
+the hits and misses of the roles and responses caches. Recording a request costs a few dictionary updates.
+
+Several worker processes don't share memory: each process writes its metrics to its own file in METRICS_DIR
+(replaced atomically, at most every METRICS_FLUSH_SECONDS seconds), and the endpoint sums the files of all the
+processes. The files of stopped processes are kept, so that the counters don't decrease: empty METRICS_DIR when
+the server (re)starts, as the counters of a new server start from zero.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+from .responses import response_cache
+from .roles import role_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+QUERY_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Name: (type, help, buckets of histograms)
+METRICS = {
+    'softdesk_http_requests_total': ('counter', "Requests by route, method and status code.", None),
+    'softdesk_http_request_duration_seconds': ('histogram', "Latency of the requests by route.", LATENCY_BUCKETS),
+    'softdesk_db_queries_per_request': ('histogram', "SQL queries per request by route.", QUERY_COUNT_BUCKETS),
+    'softdesk_db_duration_seconds': ('histogram', "Time of the SQL queries per request by route.",
+                                     QUERY_TIME_BUCKETS),
+    'softdesk_permission_failures_total': (
+        'counter', "Authentication and permission failures of the permission checks by route.", None,
+    ),
+    'softdesk_cache_hits_total': ('counter', "Hits of the caches.", None),
+    'softdesk_cache_misses_total': ('counter', "Misses of the caches.", None),
+}
+COUNTED_CACHES = (('roles', role_cache), ('responses', response_cache))
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}' if labels else ''
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Renderer of the metrics endpoint (text format of Prometheus); the errors are rendered as JSON."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode()
+        return json.dumps(data).encode()
+
+
+class MetricsRegistry:
+    """Metrics of the current process, written to its file of METRICS_DIR."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}  # (name, labels): value
+        self.histograms = {}  # (name, labels): [counts by bucket (+Inf last), sum]
+        self.last_flush = time.monotonic()
+
+    def check_process(self):
+        """Forget the metrics inherited from the parent process by a forked worker."""
+
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.check_process()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.check_process()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(buckets) + 1), 0]
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+
+    def record_request(self, request, response, timings, duration):
+        """Record a request and its queries (see RequestTimingMiddleware)."""
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.view_name if resolver_match else 'unmatched'
+        self.inc('softdesk_http_requests_total', route=route, method=request.method, status=response.status_code)
+        self.observe('softdesk_http_request_duration_seconds', duration, route=route)
+        self.observe('softdesk_db_queries_per_request', timings.queries, route=route)
+        self.observe('softdesk_db_duration_seconds', timings.durations['db'], route=route)
+        if time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Write the metrics of the process to its file (replaced atomically)."""
+
+        with self.lock:
+            self.check_process()
+            # The caches count their hits and misses since the process started.
+            for cache_name, cache in COUNTED_CACHES:
+                self.counters[('softdesk_cache_hits_total', (('cache', cache_name),))] = cache.hits
+                self.counters[('softdesk_cache_misses_total', (('cache', cache_name),))] = cache.misses
+            data = {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, counts, total] for (name, labels), (counts, total)
+                               in self.histograms.items()],
+            }
+            self.last_flush = time.monotonic()
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self.pid}.json')
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """Return the metrics of all the processes in the Prometheus text format."""
+
+        self.flush()
+        counters, histograms = {}, {}
+        directory = settings.METRICS_DIR
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):  # Removed meanwhile
+                continue
+            for name, labels, value in data['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in data['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0])
+                merged[0] = [merged_count + count for merged_count, count in zip(merged[0], counts)]
+                merged[1] += total
+
+        lines = []
+        for name, (metric_type, help_text, buckets) in METRICS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+            if metric_type == 'counter':
+                for (sample_name, labels), value in sorted(counters.items()):
+                    if sample_name == name:
+                        lines.append(f'{name}{format_labels(labels)} {value}')
+                continue
+            for (sample_name, labels), (counts, total) in sorted(histograms.items()):
+                if sample_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip((*buckets, '+Inf'), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels((*labels, ("le", bound)))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
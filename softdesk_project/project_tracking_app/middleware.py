@@ -0,0 +1,177 @@
+"""Middleware of project tracking app.
+
+They support both modes of Django handlers: sync (WSGI) and async (ASGI), so that the async views (see async_views
+module) aren't run in the thread of the sync code because of a sync-only middleware. A middleware class holds the
+code of both modes, and MIDDLEWARE setting lists its factory (see SyncAndAsyncMiddleware.as_middleware).
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+from .async_views import run_in_worker
+from .metrics import registry
+from .profiling import ProfileCapture, is_profile_requested, is_sampled, is_staff_request
+from .replicas import choose_read_database, current_routing, get_token_user_pk, pin_to_primary
+from .timing import RequestTimings, current_timings
+
+MIDDLEWARE_HOOKS = ('process_view', 'process_template_response', 'process_exception')
+
+
+class SyncAndAsyncMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @classmethod
+    def as_middleware(cls):
+        """Return the factory of the middleware (sync_and_async_middleware): it returns a function, which is a
+        coroutine function when the next handler is async, so that Django runs it in the event loop. The hooks of
+        the instance (MIDDLEWARE_HOOKS) are set on the function.
+        """
+
+        @sync_and_async_middleware
+        def middleware_factory(get_response):
+            instance = cls(get_response)
+            if asyncio.iscoroutinefunction(get_response):
+                async def middleware(request):
+                    return await instance.__acall__(request)
+            else:
+                def middleware(request):
+                    return instance.process(request)
+            for hook in MIDDLEWARE_HOOKS:
+                if hasattr(instance, hook):
+                    setattr(middleware, hook, getattr(instance, hook))
+            return middleware
+
+        return middleware_factory
+
+    def process(self, request):
+        raise NotImplementedError('`process()` must be implemented.')
+
+    async def __acall__(self, request):
+        raise NotImplementedError('`__acall__()` must be implemented.')
+
+
+class RequestTimingMiddleware(SyncAndAsyncMiddleware):
+    """Measure the SQL queries and the phases of each request (see timing module), and record them in the metrics
+    of the process (see metrics module).
+
+    It should be the first middleware, to measure the others too. The content of streaming responses (e.g. the
+    export of a project) is generated after the middleware returns, so it isn't measured.
+    """
+
+    def process(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        duration = timings.finish(request, response)
+        registry.record_request(request, response, timings, duration)
+        return response
+
+    def process_template_response(self, request, response):
+        """Measure the rendering of the response (DRF responses are rendered after this hook)."""
+
+        timings = current_timings.get()
+        if timings is not None:
+            render_token = timings.start()
+            response.add_post_render_callback(lambda rendered: timings.stop('render', render_token))
+        return response
+
+
+class RequestProfilingMiddleware(SyncAndAsyncMiddleware):
+    """Profile the requests of staff users which ask for it, and the sampled requests (see profiling module).
+
+    It should come after RequestTimingMiddleware, which records the queries of the timeline of a profile.
+    The profiler runs in the thread which starts it: with an async handler, process_view runs in the thread of the
+    sync code, where the view of a profiled request runs too (see async_views module), and where it is stopped.
+    """
+
+    def process(self, request):
+        request.profile_capture = None
+        response = self.get_response(request)
+        self.finish_capture(request, response)
+        return response
+
+    async def __acall__(self, request):
+        request.profile_capture = None
+        response = await self.get_response(request)
+        if request.profile_capture is not None:
+            await sync_to_async(self.finish_capture)(request, response)
+        return response
+
+    def finish_capture(self, request, response):
+        capture = request.profile_capture
+        if capture is None:
+            return
+        capture.stop()
+        name = capture.save(request, response)
+        if not capture.sampled:
+            response['X-Profile-Id'] = name
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Start the profiler right before the view, once the URL is resolved (for the sampling rate)."""
+
+        view_name = request.resolver_match.view_name
+        requested = is_profile_requested(request) and is_staff_request(request)
+        if requested or is_sampled(view_name):
+            request.profile_capture = ProfileCapture(request, view_name, sampled=not requested)
+        return None
+
+
+class ReplicaRoutingMiddleware(SyncAndAsyncMiddleware):
+    """Send the reads of the GET requests to a replica of the database, and keep the reads of a user who has just
+    written on the primary (see replicas module). It does nothing unless DATABASE_REPLICAS is set.
+    """
+
+    def process(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        user_pk = get_token_user_pk(request)
+        token = current_routing.set(choose_read_database(request, user_pk))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        self.finish(request, user_pk)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        user_pk = get_token_user_pk(request)
+        routing = await run_in_worker(choose_read_database, request, user_pk)
+        token = current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        await run_in_worker(self.finish, request, user_pk)
+        return response
+
+    def finish(self, request, user_pk):
+        if request.method not in SAFE_METHODS and user_pk is not None:
+            pin_to_primary(user_pk)
+
+
+request_timing_middleware = RequestTimingMiddleware.as_middleware()
+request_profiling_middleware = RequestProfilingMiddleware.as_middleware()
+replica_routing_middleware = ReplicaRoutingMiddleware.as_middleware()
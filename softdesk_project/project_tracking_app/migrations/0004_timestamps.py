@@ -0,0 +1,46 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """First step of the replacement of created_time TimeFields by DateTimeFields (see 0005 and 0006):
+    the old columns are renamed and the new ones are added as nullable (no rewrite of existing rows here).
+    """
+
+    dependencies = [
+        ('project_tracking_app', '0003_auto_20210611_0939'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='issue',
+            old_name='created_time',
+            new_name='legacy_created_time',
+        ),
+        migrations.RenameField(
+            model_name='comment',
+            old_name='created_time',
+            new_name='legacy_created_time',
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='created_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='updated_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='created_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_time',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def legacy_datetime(today, now, legacy_time):
+    """Return the date of the migration combined with the time of day of an old TimeField (in TIME_ZONE, where
+    auto_now_add wrote it), the day before if this time is still to come today.
+    """
+
+    created = timezone.make_aware(datetime.combine(today, legacy_time))
+    return created - timedelta(days=1) if created > now else created
+
+
+def backfill(apps, schema_editor):
+    """Fill created_time/updated_time of existing issues and comments, batch by batch.
+
+    The old TimeFields (kept until 0006) have no date: existing rows get the date of the migration with the
+    time of day of their old created_time (see legacy_datetime), so that they keep their order.
+    Each batch is updated in its own short transaction (the migration isn't atomic), so the tables are never
+    locked for long, and the migration can be resumed: only the rows still without created_time are updated.
+    """
+
+    now = timezone.now()
+    today = timezone.localdate(now)
+    db_alias = schema_editor.connection.alias
+    for model_name in ('Issue', 'Comment'):
+        model = apps.get_model('project_tracking_app', model_name)
+        rows = model.objects.using(db_alias).filter(created_time__isnull=True)
+        last_pk = 0
+        while True:
+            batch = list(
+                rows.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'legacy_created_time')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            instances = []
+            for pk, legacy_time in batch:
+                created = legacy_datetime(today, now, legacy_time) if legacy_time is not None else now
+                instances.append(model(pk=pk, created_time=created, updated_time=created))
+            with transaction.atomic(using=db_alias):
+                model.objects.using(db_alias).bulk_update(instances, ['created_time', 'updated_time'])
+            last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('project_tracking_app', '0004_timestamps'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+def create_search_tables(apps, schema_editor):
+    """Create the FTS5 table of the full-text search (see search module) and index the existing rows.
+    Only SQLite has FTS5: nothing is created for other databases.
+    """
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE project_tracking_app_search USING fts5("
+        "project, issue_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "CREATE TABLE project_tracking_app_search_state (key varchar(64) NOT NULL PRIMARY KEY, value text NOT NULL)"
+    )
+    schema_editor.execute(
+        "INSERT INTO project_tracking_app_search (rowid, project, issue_id, title, body) "
+        "SELECT 2 * id, 'p' || project_id, id, title, description FROM project_tracking_app_issue"
+    )
+    schema_editor.execute(
+        "INSERT INTO project_tracking_app_search (rowid, project, issue_id, title, body) "
+        "SELECT 2 * comment.id + 1, 'p' || issue.project_id, comment.issue_id, '', comment.description "
+        "FROM project_tracking_app_comment AS comment "
+        "INNER JOIN project_tracking_app_issue AS issue ON issue.id = comment.issue_id"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE project_tracking_app_search")
+    schema_editor.execute("DROP TABLE project_tracking_app_search_state")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_tracking_app', '0006_timestamps_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
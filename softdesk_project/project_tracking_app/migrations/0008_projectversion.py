@@ -0,0 +1,31 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_project_versions(apps, schema_editor):
+    Project = apps.get_model('project_tracking_app', 'Project')
+    ProjectVersion = apps.get_model('project_tracking_app', 'ProjectVersion')
+    project_pks = Project.objects.values_list('pk', flat=True)
+    ProjectVersion.objects.bulk_create(ProjectVersion(project_id=pk) for pk in project_pks.iterator())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_tracking_app', '0007_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectVersion',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True,
+                                                 related_name='version', serialize=False,
+                                                 to='project_tracking_app.project')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_project_versions, migrations.RunPython.noop),
+    ]
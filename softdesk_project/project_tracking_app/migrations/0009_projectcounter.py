@@ -0,0 +1,55 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def create_project_counters(apps, schema_editor):
+    """Count the existing issues and comments (as counters.rebuild_counters does)."""
+
+    Issue = apps.get_model('project_tracking_app', 'Issue')
+    Comment = apps.get_model('project_tracking_app', 'Comment')
+    ProjectCounter = apps.get_model('project_tracking_app', 'ProjectCounter')
+
+    rows = [
+        (project_pk, 'issues', '', count)
+        for project_pk, count in Issue.objects.values_list('project').annotate(count=Count('pk')).order_by()
+    ]
+    dimensions = {'status': 'status', 'priority': 'priority', 'tag': 'tag', 'assignee': 'assignee_user_id'}
+    for dimension, attr in dimensions.items():
+        counts = Issue.objects.values_list('project', attr).annotate(count=Count('pk')).order_by()
+        rows += [(project_pk, dimension, str(value or ''), count) for project_pk, value, count in counts]
+    rows += [
+        (project_pk, 'comments', '', count)
+        for project_pk, count in Comment.objects.values_list('issue__project').annotate(count=Count('pk')).order_by()
+    ]
+    ProjectCounter.objects.bulk_create(
+        ProjectCounter(project_id=project_pk, dimension=dimension, value=value, count=count)
+        for project_pk, dimension, value, count in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_tracking_app', '0008_projectversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=16)),
+                ('value', models.CharField(blank=True, max_length=32)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters',
+                                              to='project_tracking_app.project')),
+            ],
+            options={
+                'unique_together': {('project', 'dimension', 'value')},
+            },
+        ),
+        migrations.RunPython(create_project_counters, migrations.RunPython.noop),
+    ]
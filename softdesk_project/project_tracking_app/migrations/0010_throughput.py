@@ -0,0 +1,70 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_creation_events(apps, schema_editor):
+    """Record the creation of the existing issues (their status changes weren't recorded: a completed issue
+    is counted as completed on its creation day).
+    """
+
+    Issue = apps.get_model('project_tracking_app', 'Issue')
+    IssueStatusEvent = apps.get_model('project_tracking_app', 'IssueStatusEvent')
+    issues = Issue.objects.order_by('pk').values_list('pk', 'project_id', 'status', 'priority', 'created_time')
+    IssueStatusEvent.objects.bulk_create(
+        (
+            IssueStatusEvent(issue_id=pk, project_id=project_pk, to_status=status, priority=priority, time=time)
+            for pk, project_pk, status, priority, time in issues.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_tracking_app', '0009_projectcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IssueStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=16)),
+                ('to_status', models.CharField(blank=True, max_length=16)),
+                ('priority', models.CharField(blank=True, max_length=16)),
+                ('time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('issue', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                            related_name='status_events', to='project_tracking_app.issue')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='status_events', to='project_tracking_app.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectDailyThroughput',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('priority', models.CharField(blank=True, max_length=16)),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('reopened', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='daily_throughputs', to='project_tracking_app.project')),
+            ],
+            options={
+                'unique_together': {('project', 'day', 'priority')},
+            },
+        ),
+        migrations.RunPython(create_creation_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_tracking_app', '0010_throughput'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('source', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('records', models.BigIntegerField(default=0)),
+                ('state', models.JSONField(default=dict)),
+                ('done', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
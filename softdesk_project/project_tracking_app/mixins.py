@@ -0,0 +1,160 @@
+"""Mixins shared by the viewsets of project tracking app."""
+
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.response import Response
+
+from .metrics import registry
+from .permissions import UserRole
+from .profiling import is_profiled
+from .responses import response_cache
+from .timing import current_timings, measure
+from .versions import make_etag
+
+PERMISSION_FAILURES = (AuthenticationFailed, NotAuthenticated, PermissionDenied, Http404)
+
+
+class RelatedFieldsMixin:
+    """Load the relations needed by the serializer of a viewset together with its queryset.
+
+    A viewset declares the relations which its (nested) serializer reads:
+    - select_related_fields: foreign keys followed with a JOIN in the same query.
+    - prefetch_related_fields: many-to-many (or reverse) relations loaded with one extra query per relation.
+    Without them, each nested object of each row of a list is fetched with its own query (N+1 queries).
+    They are applied in filter_queryset, which is called by list, retrieve, update and destroy
+    actions on the result of get_queryset.
+    """
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def filter_queryset(self, queryset):
+        """Override filter_queryset method to join/prefetch the declared relations."""
+
+        queryset = super().filter_queryset(queryset)
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
+
+
+class ConditionalGetMixin:
+    """Answer 304 Not Modified to list and retrieve requests whose If-None-Match header holds the current ETag,
+    and optionally serve these requests from a cache of rendered responses.
+
+    A viewset implements get_etag_versions, which returns the versions of the projects which its responses depend
+    on (see versions module), or None when the request mustn't be answered from the client's copy (e.g. the user
+    isn't a contributor: the request is then processed as usual and fails). The ETag is derived from the versions,
+    the user and the full URL (filters, ordering and cursor included), and it is checked before get_queryset
+    runs, so a 304 response costs the permission checks and the query of the versions only.
+
+    A viewset which sets cache_responses also keeps its successful responses in the response cache
+    (see responses module), keyed by the versions, the role of the user (get_response_role) and the URL.
+    Profiled requests (see profiling module) bypass it.
+    """
+
+    cache_responses = False
+    response_cache_key = None  # Key under which the response of the current request is cached once rendered.
+
+    def get_etag_versions(self, request):
+        raise NotImplementedError('`get_etag_versions()` must be implemented.')
+
+    def get_response_role(self, request):
+        """Return the role of the user in the project of the endpoint."""
+
+        return UserRole().get_endpoint_role(request, self)
+
+    def get_cached_response(self, request, versions):
+        key = response_cache.make_key(
+            versions, self.get_response_role(request), request.build_absolute_uri(), request.accepted_media_type
+        )
+        response = response_cache.get(key)
+        if response is None:
+            self.response_cache_key = key
+        return response
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        versions = self.get_etag_versions(request)
+        if versions is None:
+            return handler(request, *args, **kwargs)
+        etag = make_etag(versions, request.user.pk, request.get_full_path(), request.accepted_media_type)
+        response = get_conditional_response(request, etag=etag)
+        if response is None and self.cache_responses and not is_profiled(request):
+            response = self.get_cached_response(request, versions)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Override finalize_response method to cache the response once it is rendered."""
+
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = self.response_cache_key
+        if key is not None and isinstance(response, Response) and response.status_code == 200:
+            response.add_post_render_callback(lambda rendered: response_cache.set(key, rendered))
+        return response
+
+
+class TimingMixin:
+    """Measure the phases of the requests of a view (see timing module): its permission checks, and its handler
+    ("serialize"), which runs between initial (authentication, permissions, throttling) and finalize_response.
+    The failures of the authentication and of the permission checks (including the Http404 of the permission
+    classes, which hide the projects of the other users) are counted in the metrics (see metrics module).
+    """
+
+    serialize_token = None
+
+    def count_permission_failure(self, request, check, error):
+        registry.inc('softdesk_permission_failures_total', route=request.resolver_match.view_name, check=check,
+                     reason=type(error).__name__)
+
+    def perform_authentication(self, request):
+        try:
+            super().perform_authentication(request)
+        except AuthenticationFailed as error:
+            self.count_permission_failure(request, 'authentication', error)
+            raise
+
+    def check_permissions(self, request):
+        with measure('permissions'):
+            try:
+                super().check_permissions(request)
+            except PERMISSION_FAILURES as error:
+                self.count_permission_failure(request, 'view', error)
+                raise
+
+    def check_object_permissions(self, request, obj):
+        with measure('permissions'):
+            try:
+                super().check_object_permissions(request, obj)
+            except PERMISSION_FAILURES as error:
+                self.count_permission_failure(request, 'object', error)
+                raise
+
+    def initial(self, request, *args, **kwargs):
+        """Override initial method to start measuring the handler."""
+
+        super().initial(request, *args, **kwargs)
+        timings = current_timings.get()
+        if timings is not None:
+            self.serialize_token = timings.start()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Override finalize_response method to stop measuring the handler."""
+
+        timings = current_timings.get()
+        if timings is not None and self.serialize_token is not None:
+            timings.stop('serialize', self.serialize_token)
+            self.serialize_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
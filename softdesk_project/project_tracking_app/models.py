@@ -4,13 +4,37 @@ Models contain:
 - Project model is used tc connect its contributors with its issues.
 - Contributor model describes the role (via a permission role) for an user of a project.
 - Issue model describes an issue come from a project.
+- Comment model describes a comment for an issue.
+- ProjectVersion, ProjectCounter, IssueStatusEvent, ProjectDailyThroughput, RollupCheckpoint and ImportCheckpoint
+models hold data derived from the others (versions of projects, counters and throughput of issues) and the
+progress of background jobs.
 """
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 User = get_user_model()
 
+# Attribute of an instance whose auto_now/auto_now_add timestamps are given (see TimestampField).
+EXPLICIT_TIMESTAMPS_ATTRIBUTE = 'explicit_timestamps'
+
+
+class TimestampField(models.DateTimeField):
+    """DateTimeField whose auto_now/auto_now_add value isn't replaced by now when its instance has a true
+    EXPLICIT_TIMESTAMPS_ATTRIBUTE, so that e.g. the imported rows are inserted with their timestamps (see importer
+    module). Its column is the one of DateTimeField: it is deconstructed as a DateTimeField (no migration).
+    """
+
+    def pre_save(self, model_instance, add):
+        if getattr(model_instance, EXPLICIT_TIMESTAMPS_ATTRIBUTE, False):
+            return getattr(model_instance, self.attname)
+        return super().pre_save(model_instance, add)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.DateTimeField', args, kwargs
+
 
 class Project(models.Model):
     """Project model connects contributors of a project with its issues for tracking purpose."""
@@ -24,6 +48,35 @@ class Project(models.Model):
         return f'id = {self.id}, Project title: {self.title}, type: {self.type}'
 
 
+class ProjectVersion(models.Model):
+    """ProjectVersion model counts the changes of a project, its contributors, issues and comments (see versions module).
+    It is kept apart from Project so that saving a project loaded before a change doesn't overwrite the counter.
+    """
+
+    project = models.OneToOneField(Project, related_name='version', primary_key=True, on_delete=models.CASCADE)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'Project id = {self.project_id}, version: {self.version}'
+
+
+class ProjectCounter(models.Model):
+    """ProjectCounter model counts the issues of a project by a dimension and value (e.g. status "TODO"),
+    and its issues and comments (see counters module).
+    """
+
+    project = models.ForeignKey(Project, related_name='counters', on_delete=models.CASCADE)
+    dimension = models.CharField(max_length=16)  # issues, comments, status, priority, tag or assignee
+    value = models.CharField(max_length=32, blank=True)  # e.g. the status, or the id of the assignee user
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('project', 'dimension', 'value',)
+
+    def __str__(self):
+        return f'Project id = {self.project_id}, {self.dimension} {self.value}: {self.count}'
+
+
 class Contributor(models.Model):
     """Contributor model describes the permission role of a user associated to a project."""
 
@@ -76,11 +129,31 @@ class Issue(models.Model):
     assignee_user = models.ForeignKey(User, related_name='assignee_issues', default=author,
                                       on_delete=models.CASCADE)
     project = models.ForeignKey(Project, related_name='issues', on_delete=models.CASCADE)
-    created_time = models.TimeField(auto_now_add=True)
+    created_time = TimestampField(auto_now_add=True)
+    updated_time = TimestampField(auto_now=True)
+
+    class Meta:
+        # Indexes follow the filters of the list of issues of a project (ordered by id: SQLite indexes end with
+        # the rowid, which is the id), the issues assigned to a user, and the incremental synchronization.
+        indexes = [
+            models.Index(fields=['project', 'status'], name='issue_project_status_idx'),
+            models.Index(fields=['project', 'priority'], name='issue_project_priority_idx'),
+            models.Index(fields=['project', 'created_time'], name='issue_project_created_idx'),
+            models.Index(fields=['assignee_user', 'status'], name='issue_assignee_status_idx'),
+            models.Index(fields=['updated_time'], name='issue_updated_idx'),
+        ]
 
     def __str__(self):
         return f'Issue: {self.title}, project is {self.project}, Author is {self.author}'
 
+    def save(self, *args, **kwargs):
+        """Override save method to update the counters of the project in the transaction of the issue (see
+        counters module).
+        """
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Comment model describes a comment for an issue."""
@@ -88,7 +161,73 @@ class Comment(models.Model):
     description = models.TextField(max_length=2048, blank=True)
     author = models.ForeignKey(User, related_name='comments', on_delete=models.CASCADE)
     issue = models.ForeignKey(Issue, related_name='comments', on_delete=models.CASCADE)
-    created_time = models.TimeField(auto_now_add=True)
+    created_time = TimestampField(auto_now_add=True)
+    updated_time = TimestampField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_time'], name='comment_issue_created_idx'),
+            models.Index(fields=['updated_time'], name='comment_updated_idx'),
+        ]
 
     def __str__(self):
         return f'Comment: {self.description} of issue {self.issue} by author {self.author}'
+
+
+class IssueStatusEvent(models.Model):
+    """IssueStatusEvent model records the creation of an issue and the changes of its status (see throughput module).
+    Events are kept when the issue is deleted, they are rolled up into ProjectDailyThroughput rows.
+    """
+
+    project = models.ForeignKey(Project, related_name='status_events', on_delete=models.CASCADE)
+    issue = models.ForeignKey(Issue, related_name='status_events', null=True, on_delete=models.SET_NULL)
+    from_status = models.CharField(max_length=16, blank=True)  # Empty for the creation of the issue
+    to_status = models.CharField(max_length=16, blank=True)
+    priority = models.CharField(max_length=16, blank=True)  # Priority of the issue at the time of the event
+    time = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'Issue id = {self.issue_id}, status: {self.from_status} -> {self.to_status} at {self.time}'
+
+
+class ProjectDailyThroughput(models.Model):
+    """ProjectDailyThroughput model counts the issues of a project created, completed and reopened in a day,
+    by priority (see throughput module).
+    """
+
+    project = models.ForeignKey(Project, related_name='daily_throughputs', on_delete=models.CASCADE)
+    day = models.DateField()
+    priority = models.CharField(max_length=16, blank=True)
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    reopened = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('project', 'day', 'priority',)
+
+    def __str__(self):
+        return f'Project id = {self.project_id}, {self.day} {self.priority}: +{self.created} -{self.completed}'
+
+
+class RollupCheckpoint(models.Model):
+    """RollupCheckpoint model stores the id of the last event processed by an incremental aggregation job."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+
+class ImportCheckpoint(models.Model):
+    """ImportCheckpoint model stores the progress of an import (see importer module): the number of input records
+    already imported, and the state needed to resume it (id offsets, current project).
+    """
+
+    source = models.CharField(max_length=255, primary_key=True)
+    records = models.BigIntegerField(default=0)
+    state = models.JSONField(default=dict)
+    done = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f'{self.source}: {self.records} records'
@@ -0,0 +1,30 @@
+"""Pagination classes for the list endpoints of project tracking app.
+
+Cursor (keyset) pagination is used instead of page numbers: a page is fetched with
+"WHERE id < last_seen_id ORDER BY id DESC LIMIT n", which walks the index on the primary key.
+So a deep page costs the same as the first one (no OFFSET scan) and the pages stay stable
+when new issues/comments are added in the meantime.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class IssueCursorPagination(CursorPagination):
+    """Paginate issues of a project from the newest to the oldest one.
+    The ordering key is the primary key: it is unique, never updated and indexed together with
+    the project (foreign key index), so it is a stable key for the cursor.
+    """
+
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class CommentCursorPagination(CursorPagination):
+    """Paginate comments of an issue in the chronological order (the order of a discussion)."""
+
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
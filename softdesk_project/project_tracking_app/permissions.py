@@ -3,67 +3,50 @@
 + read all/detail of issues/a issue, comments/a comment associated with this project.
 + add a new contributor, issue, comment for the project
 - Only author role of an entity (project, issue, comment) can update and delete this entity.
+The role of the user is read from his access token or from the roles cache if possible (see roles module),
+otherwise from the request-scoped context of the endpoint (see context module), which is shared with the viewsets.
 """
 
-from django.shortcuts import get_object_or_404
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from .models import User, Project, Contributor, Comment, Issue
-from rest_framework.exceptions import APIException
+from .models import User, Project, Comment, Issue
+from .context import get_project_context
+from .roles import role_cache, get_token_role, get_request_role, MISSING
 
 
 class UserRole:
     """Class to determine if a user is a contributor (here: author, manager or creator) or an author of a project. """
 
+    def get_endpoint_role(self, request, view):
+        """Get the role of a user in the project determined from an endpoint (token or cached role first)."""
+
+        project_pk = view.kwargs['project_pk']
+        role = get_token_role(request, project_pk)
+        if role is MISSING:
+            role = role_cache.get(request.user.pk, project_pk)
+        if role is MISSING:
+            role = get_project_context(request, view).role  # The context also caches the role.
+        return role
+
     def is_contributor(self, request, view):
         """Verify if a user is a contributor of a given project determined from an endpoint."""
 
-        project_pk = view.kwargs['project_pk']
-        project = get_object_or_404(Project, pk=project_pk)
-        return request.user in project.users.all()
+        return self.get_endpoint_role(request, view) is not None
 
     def is_author(self, request, view, obj):
         """Verify if a user is an author of a given project determined from an endpoint."""
 
         if type(obj) is Project:
-            contributor = get_object_or_404(Contributor, user=request.user, project=obj)
-            return contributor.permission == "AUTHOR"
+            return get_request_role(request, obj.pk) == "AUTHOR"
         if type(obj) is User:
-            project_pk = view.kwargs['project_pk']
-            project = get_object_or_404(Project, pk=project_pk)
-            contributor = get_object_or_404(Contributor, user=request.user, project=project)
-            return contributor.permission == "AUTHOR"
+            return self.get_endpoint_role(request, view) == "AUTHOR"
 
         if type(obj) in [Issue, Comment]:
             return request.user == obj.author
 
 
-class EndpointNestedRelation:
-    """Class to verify nested relationship in an endpoint (for any two levels).
-    For example:
-    From left to right, an endpoint contains: klass1_names/str_pk1/klass2_names/str_pk2
-    Where:
-    - An instance of klass1 has many instances of klass2
-    - An instance of klass2 contains an instance of klass1
-    (one to many relation)
-    This class serves to verify if the endpoint has a sense in respecting the above nested relationship.
-    """
-
-    def is_belong_to(self, request, view, klass1=None, str_pk1=None, klass2=None, str_pk2=None, *args, **kwargs):
-        """Verify if an object of klass2 belongs to an object of klass1 determined via an endpoint."""
-
-        pk1 = view.kwargs[str_pk1]
-        pk2 = view.kwargs[str_pk2]
-        obj1 = get_object_or_404(klass1, pk=pk1)
-        obj2 = get_object_or_404(klass2, pk=pk2)
-        klass1_name_lower = klass1.__name__.lower()
-        attr1_name = klass1_name_lower
-        object_type_klass1_from_obj2 = getattr(obj2, attr1_name)
-        if not object_type_klass1_from_obj2:
-            raise APIException("Nested relationship in the endpoint is not correct.")
-
-        return obj1 == object_type_klass1_from_obj2
-
-
 class IsAuthorOrReadPostOnlyProject(BasePermission):
     message = 'You have no permission for this request.'
 
@@ -104,16 +87,18 @@ class IssuePermission(BasePermission, UserRole):
     - get_queryset method already checks permission for GET method.
     - "POST" method is needed to check permission for the nested relationship in the endpoint.
     - PUT/DELETE methods are needed to check permission because only author of an issue can do these actions.
+    - Bulk actions (/projects/{id}/issues/bulk/) are restricted to contributors, the view checks the author of each
+    updated issue.
     """
 
     message = 'Editing/Deleting issue is restricted to the author only.'
 
     def has_permission(self, request, view):
         """
-        Override has_permission method to treat the POST method.
+        Override has_permission method to treat the POST method and the bulk actions.
         Return `True` if permission is granted, `False` otherwise.
         """
-        if request.method == "POST":
+        if request.method == "POST" or getattr(view, 'action', None) == "bulk":
             self.message = "Only contributor of the project can post an issue."
             return UserRole().is_contributor(request, view)
         return True
@@ -142,10 +127,7 @@ class CommentPermission(BasePermission, UserRole):
     def check_endpoint_for_post_method(self, request, view):
         """Check nested relationship in the endpoint."""
 
-        str_project_pk = "project_pk"
-        str_issue_pk = "issue_pk"
-        return EndpointNestedRelation().is_belong_to(request, view, klass1=Project, str_pk1=str_project_pk,
-                                                     klass2=Issue, str_pk2=str_issue_pk)
+        return get_project_context(request, view).issue_in_project
 
     def has_permission(self, request, view):
         """
@@ -154,11 +136,13 @@ class CommentPermission(BasePermission, UserRole):
         """
 
         if request.method == "POST":
-            if not self.check_endpoint_for_post_method(request, view):
+            is_belong_to = self.check_endpoint_for_post_method(request, view)
+            is_contributor = UserRole().is_contributor(request, view)
+            if not is_belong_to:
                 self.message = "Project hasn't this issue."
-            if not UserRole().is_contributor(request, view):
+            if not is_contributor:
                 self.message = "Only contributor of the project can post a comment."
-            return self.check_endpoint_for_post_method(request, view) and UserRole().is_contributor(request, view)
+            return is_belong_to and is_contributor
 
         return True
 
@@ -171,3 +155,17 @@ class CommentPermission(BasePermission, UserRole):
         if request.method in SAFE_METHODS:
             return True
         return UserRole().is_author(request, view, obj)
+
+
+class HasMetricsToken(BasePermission):
+    """The metrics endpoint requires the header "Authorization: Bearer <METRICS_TOKEN>" (e.g. bearer_token of the
+    Prometheus scrape configuration). Without METRICS_TOKEN setting, it is open in DEBUG mode only.
+    """
+
+    message = 'A valid metrics token is required.'
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        if not token:
+            return settings.DEBUG
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
@@ -0,0 +1,138 @@
+"""Profiles of single requests (see RequestProfilingMiddleware).
+
+A request is run under cProfile, from its view to the rendering of its response, when:
+- it asks for it, with the X-Profile header or the PROFILE_QUERY_PARAM query parameter, and its access token is
+  the one of an active staff user (the view authenticates the request later: the user is read from the token, and
+  his state from the cache of ClaimsJWTAuthentication). The response then gives the name of the profile in its
+  X-Profile-Id header. The requests of the other users are processed as usual.
+- or it is sampled: a request whose URL name (e.g. "comments-list") has the rate N in PROFILE_SAMPLE_RATES setting
+  ("*" for the other URLs) is profiled with a probability of 1 / N.
+
+A profiled request bypasses the response cache (see ConditionalGetMixin), so that its view runs. Each profile is
+saved in PROFILE_DIR as two files: NAME.prof, the pstats of the request (e.g. for snakeviz, or flameprof which
+draws flame graphs), and NAME.json, the request, its most expensive functions and the timeline of its SQL queries
+(see timing module). Only the PROFILE_RING_SIZE latest profiles are kept: the oldest are deleted.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+
+from django.conf import settings
+
+from users.authentication import get_user_state
+
+from .replicas import get_token_user_pk
+from .timing import current_timings
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+TOP_FUNCTIONS = 30
+TIMELINE_SQL_LENGTH = 500
+
+
+def is_profile_requested(request):
+    return bool(request.META.get(PROFILE_HEADER)) or settings.PROFILE_QUERY_PARAM in request.GET
+
+
+def is_staff_request(request):
+    """Return whether the access token of a request is the one of an active staff user."""
+
+    user_pk = get_token_user_pk(request)
+    state = get_user_state(user_pk) if user_pk is not None else None
+    return bool(state and state['is_active'] and not state['is_deleted'] and state['is_staff'])
+
+
+def is_sampled(view_name):
+    rates = settings.PROFILE_SAMPLE_RATES
+    rate = rates.get(view_name, rates.get('*'))
+    return bool(rate) and random.random() * rate < 1
+
+
+def is_profiled(request):
+    return getattr(request, 'profile_capture', None) is not None
+
+
+class ProfileCapture:
+    """Profile of a request, from its start to its save."""
+
+    def __init__(self, request, view_name, sampled):
+        self.view_name = view_name
+        self.sampled = sampled
+        self.timings = current_timings.get()
+        if self.timings is not None:
+            self.timings.timeline = []
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+
+    def get_top_functions(self, stats):
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        return [
+            {
+                'function': pstats.func_std_string(function),
+                'calls': calls,
+                'own_ms': round(own_time * 1000, 3),
+                'cumulative_ms': round(cumulative_time * 1000, 3),
+            }
+            for function, (primitive_calls, calls, own_time, cumulative_time, callers) in functions
+        ]
+
+    def get_timeline(self):
+        if self.timings is None:
+            return None
+        return [
+            {'start_ms': round(start * 1000, 3), 'duration_ms': round(duration * 1000, 3),
+             'sql': sql[:TIMELINE_SQL_LENGTH]}
+            for start, duration, sql in self.timings.timeline
+        ]
+
+    def save(self, request, response):
+        """Write the files of the profile, delete the oldest profiles of the ring. Return the name of the profile."""
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', self.view_name).strip('-') or 'unknown'
+        name = f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{slug}"
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+
+        self.profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+        stats = pstats.Stats(self.profiler)
+        user = getattr(request, 'user', None)
+        details = {
+            'name': name,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view_name': self.view_name,
+            'user_id': getattr(user, 'pk', None),
+            'status': response.status_code,
+            'sampled': self.sampled,
+            'profiled_ms': round(self.duration * 1000, 3),
+            'top_functions': self.get_top_functions(stats),
+            'queries': self.get_timeline(),
+        }
+        with open(os.path.join(directory, f'{name}.json'), 'w') as file:
+            json.dump(details, file, indent=2)
+            file.write('\n')
+        trim_ring(directory, settings.PROFILE_RING_SIZE)
+        return name
+
+
+def trim_ring(directory, size):
+    """Delete the oldest profiles of directory beyond size (their names start with their time)."""
+
+    names = sorted({os.path.splitext(filename)[0] for filename in os.listdir(directory)
+                    if filename.endswith(('.prof', '.json'))})
+    for name in names[:max(0, len(names) - size)]:
+        for extension in ('.prof', '.json'):
+            try:
+                os.remove(os.path.join(directory, f'{name}{extension}'))
+            except FileNotFoundError:  # Deleted by another process
+                pass
@@ -0,0 +1,201 @@
+"""Read replicas of the database (see DATABASE_REPLICAS setting, ReplicaRouter and ReplicaRoutingMiddleware).
+
+The middleware chooses the database of the reads of each request, kept in current_routing (a context variable,
+which sync_to_async passes to the threads of async requests):
+- the GET, HEAD and OPTIONS requests read from one replica (the same for all the queries of a request, so that
+  the versions of the ETags match the content, see versions module), chosen at random among the replicas which
+  were synced less than REPLICA_MAX_LAG_SECONDS ago; the primary database if none is.
+- the other requests, and all the requests outside the middleware (commands, shell), read from the primary.
+- read-your-own-writes: after a write request (any other method) of an authenticated user, the reads of this
+  user stay on the primary for REPLICA_PIN_SECONDS, which must exceed the lag of the replicas. The user is read
+  from the access token of the request. The pins are kept in a cache (see REPLICA_PIN_CACHE_ALIAS): with several
+  workers, use a shared backend.
+Writes always go to the primary (the "default" database), which is the only one migrated.
+
+A replica lags behind the primary: the caches which outlive a request must not be filled from a replica (see
+RoleCache.set), and the state of an authenticated user is read from the primary (see users/authentication.py).
+
+SQLite replicas are local copies of the primary file, made by sync_replica (see sync_replicas command): the online
+backup API of SQLite copies a consistent snapshot to a temporary file, which then replaces the replica atomically
+(the requests which read the previous copy go on reading it, a persistent connection to a previous copy is closed
+by the router). The time of the start of the copy is kept as the modification time of the replica, which gives
+its lag.
+The copy is made in steps of REPLICA_SYNC_PAGES pages, with a pause of REPLICA_SYNC_SLEEP_SECONDS between steps:
+the primary is read-locked during a step only (with the default rollback journal, a write waits for the end of
+the step), instead of during the whole copy. A write to the primary between two steps restarts the copy: under a
+steady stream of writes, a sync takes longer (fewer pages per step: shorter locks, more restarts), and a replica
+whose sync doesn't finish is no longer used once it lags more than REPLICA_MAX_LAG_SECONDS. In WAL journal mode
+the reads of a copy don't block the writes of the primary at all, but its restarts are the same.
+Other backends are replicated by the database server: their lag is unknown, they are always used.
+"""
+
+import os
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+class ReadRouting:
+    """Database of the reads of a request: a replica alias, or None for the primary database, and the id of the
+    copy of a SQLite replica (None for other databases).
+    """
+
+    def __init__(self, alias=None, file_id=None):
+        self.alias = alias
+        self.file_id = file_id
+
+
+def reads_from_replica():
+    routing = current_routing.get()
+    return routing is not None and routing.alias is not None
+
+
+class ReplicaRouter:
+    """Database router (see DATABASE_ROUTERS setting): reads go to the database chosen for the current request,
+    writes and migrations to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if routing is None or routing.alias is None:
+            return DEFAULT_DB_ALIAS
+        connection = connections[routing.alias]
+        if connection.connection is not None and getattr(connection, 'replica_file_id', None) != routing.file_id:
+            connection.close()  # A persistent connection to a previous copy of the replica.
+        return routing.alias
+
+    def db_for_write(self, model, **hints):
+        # Explicit: Django would otherwise write an instance to the database it was read from (a replica).
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def stat_replica_file(alias):
+    """Return the stat of the file of a SQLite replica, None if the replica isn't a file (another backend or an
+    in-memory test database). Raise FileNotFoundError if the replica doesn't exist yet.
+    """
+
+    connection = connections[alias]
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        return None
+    return os.stat(connection.settings_dict['NAME'])
+
+
+def get_file_id(stat):
+    return (stat.st_dev, stat.st_ino) if stat is not None else None
+
+
+def get_fresh_replicas():
+    """Return the ReadRouting of the replicas synced less than REPLICA_MAX_LAG_SECONDS ago."""
+
+    max_lag = settings.REPLICA_MAX_LAG_SECONDS
+    fresh = []
+    for alias in settings.DATABASE_REPLICAS:
+        try:
+            stat = stat_replica_file(alias)
+        except FileNotFoundError:
+            continue
+        if stat is None or max_lag is None or time.time() - stat.st_mtime <= max_lag:
+            fresh.append(ReadRouting(alias, get_file_id(stat)))
+    return fresh
+
+
+def record_replica_file(sender, connection, **kwargs):
+    """Receiver of connection_created signal: keep the id of the copy of a SQLite replica which a connection reads
+    (see ReplicaRouter.db_for_read).
+    """
+
+    if connection.alias in settings.DATABASE_REPLICAS:
+        try:
+            connection.replica_file_id = get_file_id(stat_replica_file(connection.alias))
+        except FileNotFoundError:
+            connection.replica_file_id = None
+
+
+def get_pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_key(user_pk):
+    return f'replicas:pin:{user_pk}'
+
+
+def pin_to_primary(user_pk):
+    """Send the reads of a user to the primary for REPLICA_PIN_SECONDS (he has just written)."""
+
+    get_pin_cache().set(pin_key(user_pk), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_pk):
+    return get_pin_cache().get(pin_key(user_pk), False)
+
+
+def get_token_user_pk(request):
+    """Return the id of the user of the access token of a request, None if the request has no valid token.
+    The view authenticates the request anyway: the user is needed only to route its reads.
+    """
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None
+
+
+def choose_read_database(request, user_pk):
+    """Return the ReadRouting of a request: a replica for its reads, or the primary."""
+
+    if request.method not in SAFE_METHODS or not settings.DATABASE_REPLICAS:
+        return ReadRouting()
+    if user_pk is not None and is_pinned_to_primary(user_pk):
+        return ReadRouting()
+    fresh = get_fresh_replicas()
+    return random.choice(fresh) if fresh else ReadRouting()
+
+
+def copy_database(source_path, target_path):
+    """Copy a SQLite database file by steps with the online backup API (see module docstring)."""
+
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=settings.REPLICA_SYNC_PAGES, sleep=settings.REPLICA_SYNC_SLEEP_SECONDS)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def sync_replica(alias):
+    """Copy the primary SQLite database to a replica (see module docstring). Return the duration of the copy."""
+
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    replica = str(connections[alias].settings_dict['NAME'])
+    temporary = f'{replica}.sync'
+    started = time.time()
+    copy_database(primary, temporary)
+    os.utime(temporary, (started, started))
+    os.replace(temporary, replica)
+    return time.time() - started
@@ -0,0 +1,63 @@
+"""Cache of the rendered responses of the list and retrieve actions (see ConditionalGetMixin), shared between requests.
+
+Rendering nested serializers is the main cost of the GET requests. A viewset which sets cache_responses keeps
+its rendered responses in a Django cache (see "responses" alias in CACHES setting), keyed by the URL (query string
+included), the media type, the role of the user and the versions of the projects of the response
+(see versions module). Any write to a project bumps its version, and so does a change of the users which its
+responses embed (their names and emails), so the entries of its previous versions are never read again: they are
+evicted by the backend (least recently used entries first with the local-memory backend), or they expire after its
+TIMEOUT.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+
+class ResponseCache:
+    """Cache of rendered responses, with hit/miss and saved bytes counters (for the current process)."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, *parts):
+        digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+        return f'response:{digest}'
+
+    def get(self, key):
+        """Return a new HttpResponse with the cached content, or None if the response isn't cached."""
+
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        content, content_type = entry
+        self.bytes_saved += len(content)
+        return HttpResponse(content, content_type=content_type)
+
+    def set(self, key, response):
+        """Cache the content of a rendered response."""
+
+        self.cache.set(key, (response.content, response['Content-Type']))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_ALIAS)
@@ -0,0 +1,192 @@
+"""Cache of the roles (Contributor.permission) of users in projects, shared between requests.
+
+The role of a user in a project is read on every request to a nested endpoint (/projects/{pk}/...),
+whereas the membership of a project rarely changes. So roles are kept in a Django cache (see "roles" alias
+in CACHES setting), keyed by (user_id, project_id):
+- the local-memory backend (default) keeps one cache per process,
+- a file-based or database (SQLite) backend shares the cache between several workers.
+Entries are invalidated by the signals of Contributor and Project models (see signals module), and they expire
+after the TIMEOUT of the cache anyway (this bounds the staleness of the local-memory caches of other workers).
+The roles read from a replica of the database aren't cached (see replicas module).
+
+Roles can also be embedded in JWT access tokens (see users/tokens.py): a "roles" claim maps project ids to roles,
+and a "roles_version" claim holds the version of the roles of the user when the token was issued. Any change of
+the roles of a user bumps his version, so the roles of a token are trusted only while its version is current.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import Contributor
+from .replicas import reads_from_replica
+
+MISSING = object()  # Returned by RoleCache.get when the role isn't cached.
+NOT_CONTRIBUTOR = ''  # Value cached for a user who isn't a contributor of a project.
+
+ROLES_CLAIM = 'roles'
+ROLES_VERSION_CLAIM = 'roles_version'
+ROLE_CODES = {role: role[0] for role, _ in Contributor.ROLE_CHOICES}  # e.g. 'AUTHOR': 'A'
+ROLES_FROM_CODES = {code: role for role, code in ROLE_CODES.items()}
+
+
+class RoleCache:
+    """Cache of roles keyed by (user_id, project_id), with hit/miss counters (for the current process).
+
+    Each project has a generation number which is part of the keys of its roles:
+    invalidating all roles of a project only increments this number.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation(self, project_pk):
+        return self.cache.get(f'project:{project_pk}:generation', 0)
+
+    def _key(self, user_pk, project_pk):
+        return f'role:{project_pk}:{self._generation(project_pk)}:{user_pk}'
+
+    def get(self, user_pk, project_pk):
+        """Return the cached role, None if the user isn't a contributor, MISSING if the role isn't cached."""
+
+        try:
+            project_pk = int(project_pk)
+        except (TypeError, ValueError):
+            return MISSING
+
+        role = self.cache.get(self._key(user_pk, project_pk), MISSING)
+        if role is MISSING:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return role or None
+
+    def set(self, user_pk, project_pk, role):
+        if reads_from_replica():  # The role may be outdated: the replica lags behind the invalidations.
+            return
+        self.cache.set(self._key(user_pk, int(project_pk)), role or NOT_CONTRIBUTOR)
+
+    def invalidate(self, user_pk, project_pk):
+        """Forget the role of a user in a project."""
+
+        self.cache.delete(self._key(user_pk, project_pk))
+
+    def role_changed(self, user_pk, project_pk):
+        """The role of a user in a project has changed: forget the cached role and outdate the roles of his tokens."""
+
+        self.invalidate(user_pk, project_pk)
+        self.new_roles_version(user_pk)
+
+    def invalidate_project(self, project_pk):
+        """Forget the roles of all users in a project."""
+
+        key = f'project:{project_pk}:generation'
+        try:
+            self.cache.incr(key)
+        except ValueError:  # no generation yet
+            self.cache.set(key, 1, timeout=None)
+
+    def get_roles_version(self, user_pk):
+        """Return the current version of the roles of a user, None if it is unknown."""
+
+        return self.cache.get(f'user:{user_pk}:roles_version')
+
+    def new_roles_version(self, user_pk):
+        """Set a new version of the roles of a user and return it.
+        A version is unique in time (and not a counter), so a version lost by the cache is never reused.
+        It must outlive the access tokens which embed it.
+        """
+
+        version = time.time_ns()
+        timeout = jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        self.cache.set(f'user:{user_pk}:roles_version', version, timeout=timeout)
+        return version
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+        }
+
+
+role_cache = RoleCache(settings.ROLE_CACHE_ALIAS)
+
+
+def get_role(user, project_pk):
+    """Return the role of a user in a project (None if the user isn't a contributor).
+    The role is read from the cache, otherwise from the database and then cached.
+    """
+
+    role = role_cache.get(user.pk, project_pk)
+    if role is MISSING:
+        role = load_role(user.pk, project_pk)
+    return role
+
+
+def load_role(user_pk, project_pk):
+    """Return the role of a user in a project read from the database, and cache it."""
+
+    role = Contributor.objects.filter(user=user_pk, project=project_pk).values_list('permission', flat=True).first()
+    role_cache.set(user_pk, project_pk, role)
+    return role
+
+
+def get_roles_claims(user_pk):
+    """Return the claims about the roles of a user to embed in an access token.
+    Return no roles if the user contributes to more than PROJECT_ROLES_CLAIM_MAX_PROJECTS projects
+    (the roles are then read from the cache or the database).
+    """
+
+    max_projects = settings.PROJECT_ROLES_CLAIM_MAX_PROJECTS
+    contributors = Contributor.objects.filter(user=user_pk).values_list('project_id', 'permission')
+    contributors = contributors[:max_projects + 1]
+    if len(contributors) > max_projects:
+        return {}
+
+    version = role_cache.get_roles_version(user_pk) or role_cache.new_roles_version(user_pk)
+    return {
+        ROLES_CLAIM: {str(project_pk): ROLE_CODES[role] for project_pk, role in contributors},
+        ROLES_VERSION_CLAIM: version,
+    }
+
+
+def get_claims_role(token, user_pk, project_pk):
+    """Return the role of a user in a project read from his access token (None if he isn't a contributor),
+    or MISSING if the token has no roles or if they are outdated.
+    """
+
+    if token is None or ROLES_CLAIM not in token:
+        return MISSING
+    if token[ROLES_VERSION_CLAIM] != role_cache.get_roles_version(user_pk):
+        return MISSING
+    code = token[ROLES_CLAIM].get(str(project_pk))
+    return ROLES_FROM_CODES[code] if code else None
+
+
+def get_token_role(request, project_pk):
+    """Return the role of the authenticated user in a project read from the access token of the request
+    (see get_claims_role).
+    """
+
+    return get_claims_role(request.auth, request.user.pk, project_pk)
+
+
+def get_request_role(request, project_pk):
+    """Return the role of the authenticated user in a project (None if he isn't a contributor),
+    read from his access token, otherwise from the cache or the database.
+    """
+
+    role = get_token_role(request, project_pk)
+    if role is MISSING:
+        role = get_role(request.user, project_pk)
+    return role
@@ -0,0 +1,181 @@
+"""Full-text search over issues and comments, backed by a SQLite FTS5 virtual table.
+
+The table (created by migration 0007, columns: project, issue_id, title, body) has a row per issue
+(title, description) and per comment (description).
+Its rowid is derived from the id of the object (2 * id for an issue, 2 * id + 1 for a comment), so a row is
+replaced or deleted directly when the object changes (see signals module). The project of a row is stored as an
+indexed token ("p<id>"): a search in a project intersects the posting lists of this token and of the terms,
+instead of filtering all the matches of the corpus.
+
+Other databases have no FTS5: the search is then not available and the index isn't maintained.
+"""
+
+import re
+
+from django.db import connection, transaction
+
+from .models import Issue, Comment
+
+SEARCH_TABLE = 'project_tracking_app_search'
+SEARCH_STATE_TABLE = 'project_tracking_app_search_state'
+
+TERM_PATTERN = re.compile(r'(\w+)(\*?)')
+
+
+def is_search_available():
+    return connection.vendor == 'sqlite'
+
+
+def issue_rowid(issue_pk):
+    return 2 * issue_pk
+
+
+def comment_rowid(comment_pk):
+    return 2 * comment_pk + 1
+
+
+def project_token(project_pk):
+    return f'p{project_pk}'
+
+
+def index_rows(rows):
+    """Insert or replace rows (rowid, project_pk, issue_pk, title, body) in the index."""
+
+    if not is_search_available():
+        return
+    sql = (
+        f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, project, issue_id, title, body) '
+        'VALUES (%s, %s, %s, %s, %s)'
+    )
+    rows = [
+        (rowid, project_token(project_pk), issue_pk, title, body)
+        for rowid, project_pk, issue_pk, title, body in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def issue_row(issue_pk, project_pk, title, description):
+    return issue_rowid(issue_pk), project_pk, issue_pk, title, description
+
+
+def comment_row(comment_pk, project_pk, issue_pk, description):
+    return comment_rowid(comment_pk), project_pk, issue_pk, '', description
+
+
+def index_issues(issues):
+    index_rows([issue_row(issue.pk, issue.project_id, issue.title, issue.description) for issue in issues])
+
+
+def index_comments(comments):
+    index_rows([
+        comment_row(comment.pk, comment.issue.project_id, comment.issue_id, comment.description)
+        for comment in comments
+    ])
+
+
+def remove_rows(rowids):
+    if not is_search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(rowid,) for rowid in rowids])
+
+
+def build_match_query(query):
+    """Build a FTS5 query from a user query: all its words must match (a word ending with * matches a prefix).
+    Words are quoted, so the FTS5 syntax (operators, columns, quotes) of the user query is never interpreted.
+    Return None if the query has no word.
+    """
+
+    terms = [f'"{word}"{star}' for word, star in TERM_PATTERN.findall(query)]
+    if not terms:
+        return None
+    return ' AND '.join(terms)
+
+
+def search_project(project_pk, query, limit, offset=0):
+    """Search the issues and comments of a project, ranked by relevance (bm25).
+    Return a list of dicts (type, id, issue_id, title, snippet, rank).
+    """
+
+    match_query = build_match_query(query)
+    if match_query is None:
+        return []
+    match_query = f'{{project}}: "{project_token(project_pk)}" AND {{title body}}: ({match_query})'
+    sql = (
+        f'SELECT rowid, issue_id, title, snippet({SEARCH_TABLE}, 3, \'[\', \']\', \'...\', 16), rank '
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match_query, limit, offset])
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'type': 'comment' if rowid % 2 else 'issue',
+            'id': rowid // 2,
+            'issue_id': issue_pk,
+            'title': title,
+            'snippet': snippet,
+            'rank': rank,
+        }
+        for rowid, issue_pk, title, snippet, rank in rows
+    ]
+
+
+def get_last_reindex_time():
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT value FROM {SEARCH_STATE_TABLE} WHERE key = 'last_reindex_time'")
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def set_last_reindex_time(value):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SEARCH_STATE_TABLE} (key, value) VALUES ('last_reindex_time', %s)", [value]
+        )
+
+
+def reindex(since=None, batch_size=2000):
+    """Index the issues and comments updated since a datetime (all of them if since is None, after emptying
+    the index). Rows are read with server-side iterators and written by batches, each batch in a transaction.
+    Return the number of indexed (issues, comments).
+    """
+
+    issues = Issue.objects.all()
+    comments = Comment.objects.all()
+    if since is None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    else:
+        issues = issues.filter(updated_time__gte=since)
+        comments = comments.filter(updated_time__gte=since)
+
+    issue_rows = (
+        issue_row(*values)
+        for values in issues.values_list('id', 'project_id', 'title', 'description').iterator(chunk_size=batch_size)
+    )
+    comment_rows = (
+        comment_row(*values)
+        for values in comments.values_list('id', 'issue__project_id', 'issue_id', 'description').iterator(
+            chunk_size=batch_size)
+    )
+    return index_by_batches(issue_rows, batch_size), index_by_batches(comment_rows, batch_size)
+
+
+def index_by_batches(rows, batch_size):
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            with transaction.atomic():
+                index_rows(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            index_rows(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,167 @@
+"""Generation of a synthetic dataset (see seed_tracker command), e.g. to measure the API at scale (see benchmark).
+
+Sizes follow skewed (Zipf-like) distributions, as real trackers do: the weight of the project (or issue, or user)
+of rank r is 1 / r ** skew, so a few projects have most of the issues, a few issues most of the comments, and a
+few users contribute to many projects. Rows are inserted with bulk_create by batches, with explicit ids (the
+greatest id of the table plus a counter, see importer module; the sequences are reset at the end), and bulk_saved
+signals keep the derived data (search index, counters, versions, status events) up to date.
+All the users have the same password, hashed once.
+"""
+
+import random
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .models import Project, Contributor, Issue, Comment
+from .signals import bulk_saved
+
+User = get_user_model()
+
+PROJECT_TYPES = ('back-end', 'front-end', 'iOS', 'Android')
+WORDS = (
+    'login', 'crash', 'timeout', 'network', 'database', 'cache', 'page', 'button', 'export', 'import', 'search',
+    'slow', 'error', 'user', 'project', 'issue', 'comment', 'token', 'layout', 'mobile', 'api', 'report',
+)
+STATUS_WEIGHTS = {'TODO': 4, 'IN_PR': 2, 'COMPLETED': 4}
+
+
+def zipf_cum_weights(count, skew):
+    """Return the cumulative weights (for random.choices) of count items ranked by a Zipf-like distribution."""
+
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def next_pk(model):
+    return (model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+
+
+class DatasetSeeder:
+    """Generator of a dataset, reproducible for a given random seed (on an empty database)."""
+
+    def __init__(self, users=1000, projects=100, contributors=10, issues=10000, comments=50000, skew=1.1,
+                 seed=0, password='seed-password', batch_size=5000, log=print):
+        self.counts = {
+            'users': users, 'projects': projects, 'contributors': min(contributors, users),
+            'issues': issues, 'comments': comments,
+        }
+        self.skew = skew
+        self.random = random.Random(seed)
+        self.password = password
+        self.batch_size = batch_size
+        self.log = log
+
+    def sentence(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def insert(self, model, instances):
+        """Insert instances by batches, each batch in a transaction."""
+
+        for start in range(0, len(instances), self.batch_size):
+            batch = instances[start:start + self.batch_size]
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+                bulk_saved.send(sender=model, instances=batch, created=True)
+
+    def seed_users(self):
+        first_pk = next_pk(User)
+        password = make_password(self.password)
+        users = [
+            User(id=pk, email=f'user{pk}@seed.example', first_name='Seed', last_name=f'User{pk}', password=password)
+            for pk in range(first_pk, first_pk + self.counts['users'])
+        ]
+        self.insert(User, users)
+        return [user.pk for user in users]
+
+    def seed_projects(self, user_pks):
+        """Insert the projects and their contributors (the first one is the author).
+        Return the list of (project_pk, contributor user pks).
+        """
+
+        first_pk = next_pk(Project)
+        projects = [
+            Project(id=pk, title=f'Project {pk}: {self.sentence(3)}', type=self.random.choice(PROJECT_TYPES),
+                    description=self.sentence(12))
+            for pk in range(first_pk, first_pk + self.counts['projects'])
+        ]
+        self.insert(Project, projects)
+
+        user_weights = zipf_cum_weights(len(user_pks), self.skew)
+        projects_users = []
+        contributors = []
+        for project in projects:
+            members = set()
+            while len(members) < self.counts['contributors']:
+                members.update(self.random.choices(user_pks, cum_weights=user_weights, k=self.counts['contributors']))
+            members = list(members)[:self.counts['contributors']]
+            self.random.shuffle(members)
+            contributors += [
+                Contributor(project=project, user_id=user_pk,
+                            permission='AUTHOR' if rank == 0 else self.random.choice(('MANAGER', 'CREATOR')))
+                for rank, user_pk in enumerate(members)
+            ]
+            projects_users.append((project.pk, members))
+        self.insert(Contributor, contributors)
+        return projects_users
+
+    def seed_issues(self, projects_users):
+        """Insert the issues, spread over the projects with a skewed distribution.
+        Return the list of (issue_pk, contributor user pks of its project).
+        """
+
+        if not projects_users:
+            return []
+        first_pk = next_pk(Issue)
+        choices = self.random.choices(
+            projects_users, cum_weights=zipf_cum_weights(len(projects_users), self.skew), k=self.counts['issues']
+        )
+        issues = []
+        issues_users = []
+        for pk, (project_pk, members) in enumerate(choices, start=first_pk):
+            issues.append(Issue(
+                id=pk, project_id=project_pk, title=self.sentence(4), description=self.sentence(16),
+                tag=self.random.choice(Issue.TAG_CHOICES)[0], priority=self.random.choice(Issue.PRIORITY_CHOICES)[0],
+                status=self.random.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0],
+                author_id=self.random.choice(members), assignee_user_id=self.random.choice(members),
+            ))
+            issues_users.append((pk, members))
+        self.insert(Issue, issues)
+        return issues_users
+
+    def seed_comments(self, issues_users):
+        """Insert the comments, spread over the issues with a skewed distribution."""
+
+        if not issues_users:
+            return
+        first_pk = next_pk(Comment)
+        choices = self.random.choices(
+            issues_users, cum_weights=zipf_cum_weights(len(issues_users), self.skew), k=self.counts['comments']
+        )
+        comments = [
+            Comment(id=pk, issue_id=issue_pk, author_id=self.random.choice(members), description=self.sentence(20))
+            for pk, (issue_pk, members) in enumerate(choices, start=first_pk)
+        ]
+        self.insert(Comment, comments)
+
+    def reset_sequences(self):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User, Project, Issue, Comment]):
+                cursor.execute(sql)
+
+    def run(self):
+        """Insert the dataset. Return the counts of inserted rows."""
+
+        user_pks = self.seed_users()
+        self.log(f"{len(user_pks)} users.")
+        projects_users = self.seed_projects(user_pks)
+        self.log(f"{len(projects_users)} projects, {self.counts['contributors']} contributors per project.")
+        issues_users = self.seed_issues(projects_users)
+        self.log(f"{len(issues_users)} issues.")
+        self.seed_comments(issues_users)
+        self.log(f"{self.counts['comments']} comments.")
+        self.reset_sequences()
+        return self.counts
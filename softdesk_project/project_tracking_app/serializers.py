@@ -1,13 +1,23 @@
 """Serializers for model in project tracking app ."""
 
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max, Q, prefetch_related_objects
+from django.db.models.functions import Lower
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import (
     Project,
     Contributor,
     Issue,
     Comment,
 )
+from .signals import bulk_saved
+from . import counters
 
 from django.contrib.auth import get_user_model
 
@@ -65,6 +75,232 @@ class ContributorSerializer(serializers.ModelSerializer):
         return super().save(**kwargs)
 
 
+class ContributorListSerializer(serializers.ListSerializer):
+    """Serializer is used for a batch of contributors to add to a project.
+
+    - The users of all items are found with one query (on the emails, case-insensitively, and the uid column).
+    - The users who are already contributors of the project are skipped (found with one query).
+    - The new contributors are inserted with bulk_create inside a transaction.
+    """
+
+    def to_internal_value(self, data):
+        """Override to_internal_value method to replace the email/uid of each item by the user."""
+
+        validated_data = super().to_internal_value(data)
+        emails = {attrs['email'].lower() for attrs in validated_data if 'email' in attrs}
+        uids = [attrs['uid'] for attrs in validated_data if 'uid' in attrs]
+        users = list(User.objects.annotate(email_lower=Lower('email')).filter(
+            Q(email_lower__in=emails) | Q(uid__in=uids)
+        ))
+        users_by_email = {}
+        for user in users:
+            users_by_email.setdefault(user.email_lower, []).append(user)
+        users_by_uid = {user.uid: user for user in users}
+
+        errors = [{} for _ in validated_data]
+        for attrs, item_errors in zip(validated_data, errors):
+            if 'email' in attrs:
+                matches = users_by_email.get(attrs.pop('email').lower(), [])  # Emails which differ by case only
+            else:
+                user = users_by_uid.get(attrs.pop('uid'))
+                matches = [user] if user is not None else []
+            attrs['user'] = matches[0] if len(matches) == 1 else None
+            if attrs['user'] is None:
+                item_errors['user'] = ["User not found." if not matches else "User is ambiguous."]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated_data
+
+    def create(self, validated_data):
+        """Override create method to skip the existing contributors and insert the other ones with bulk_create.
+        Return the list of new contributors (the skipped users are kept in the "skipped_users" attribute).
+        """
+
+        project = validated_data[0]['project'] if validated_data else None
+        contributors = {attrs['user'].pk: Contributor(**attrs) for attrs in validated_data}  # Last item of a user wins
+        try:
+            return self.insert_new_contributors(project, contributors)
+        except IntegrityError:  # A user was added to the project concurrently, after the check of the contributors.
+            return self.insert_new_contributors(project, contributors)
+
+    def insert_new_contributors(self, project, contributors):
+        """Insert the contributors whose users aren't contributors of the project yet. Only the inserted ones are
+        sent with bulk_saved signal (which invalidates their roles).
+        """
+
+        with transaction.atomic():
+            existing_user_pks = set(
+                Contributor.objects.filter(project=project, user__in=contributors).values_list('user_id', flat=True)
+            )
+            self.skipped_users = [contributors[user_pk].user for user_pk in existing_user_pks]
+            new_contributors = [
+                contributor for user_pk, contributor in contributors.items() if user_pk not in existing_user_pks
+            ]
+            Contributor.objects.bulk_create(new_contributors)
+            bulk_saved.send(sender=Contributor, instances=new_contributors, created=True)
+        return new_contributors
+
+
+class ContributorItemSerializer(serializers.Serializer):
+    """Serializer is used for an item of a batch of contributors: a user (given by email or uid) and a permission."""
+
+    email = serializers.EmailField(required=False, write_only=True)
+    uid = serializers.UUIDField(required=False, write_only=True)
+    permission = serializers.ChoiceField(choices=Contributor.ROLE_CHOICES)
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        list_serializer_class = ContributorListSerializer
+
+    def validate(self, attrs):
+        if ('email' in attrs) == ('uid' in attrs):
+            raise serializers.ValidationError("Give either the email or the uid of the user.")
+        return attrs
+
+
+def parse_issue_id(value):
+    """Return the id of the issue of an item of a bulk update (an integer or a string of digits), None if the id
+    is malformed.
+    """
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+class IssueListSerializer(serializers.ListSerializer):
+    """Serializer is used for a list of issues (bulk create/update of issues of a project).
+
+    - All items are validated together and errors are reported per item (an empty dict for a valid item): the errors
+    of the fields, of the assignee user and of the id of the issue to update.
+    - The assignee users of all items are found with one query.
+    - For an update, the instance is the queryset of the issues of the project whose ids are in the items,
+    an issue is updated by one item at most, and only the author of an issue can update it.
+    - Issues are written with bulk_create/bulk_update inside a single transaction. The ids of new issues are
+    allocated before bulk_create if the database doesn't return them.
+    """
+
+    def to_internal_value(self, data):
+        """Override to_internal_value method to validate the fields of all items, then resolve the assignee users
+        (and the issues to update) of the items, so that the errors of the fields and of the ids are reported together.
+        """
+
+        if not isinstance(data, list):
+            return super().to_internal_value(data)  # Raises the error of the list.
+
+        validated_data = []
+        errors = []
+        for item in data:
+            try:
+                validated_data.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                validated_data.append(None)
+                detail = exc.detail
+                if not isinstance(detail, dict):
+                    detail = {api_settings.NON_FIELD_ERRORS_KEY: detail}
+                errors.append(dict(detail))
+        self.resolve_assignee_users(validated_data, errors)
+        if self.instance is not None:
+            self.issues = self.resolve_issues(data, errors)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated_data
+
+    def resolve_assignee_users(self, validated_data, errors):
+        """Replace the data of the assignee user of each valid item by the user (like get_object_or_404 does for an
+        issue).
+        """
+
+        users_data = [attrs['assignee_user'] for attrs in validated_data if attrs and 'assignee_user' in attrs]
+        if not users_data:
+            return
+        users = list(User.objects.filter(reduce(or_, (Q(**user_data) for user_data in users_data))))
+
+        for attrs, item_errors in zip(validated_data, errors):
+            if not attrs or 'assignee_user' not in attrs:
+                continue
+            user_data = attrs['assignee_user']
+            matches = [user for user in users if all(getattr(user, key) == value for key, value in user_data.items())]
+            if len(matches) == 1:
+                attrs['assignee_user'] = matches[0]
+            else:
+                item_errors['assignee_user'] = ["User not found." if not matches else "User is ambiguous."]
+
+    def resolve_issues(self, data, errors):
+        """Return the issues to update, in the order of the items."""
+
+        issues_by_pk = {issue.pk: issue for issue in self.instance}
+        user = self.context['request'].user
+        issues = []
+        seen_pks = set()
+        for item, item_errors in zip(data, errors):
+            if not isinstance(item, dict):  # Reported by the validation of the item.
+                issues.append(None)
+                continue
+            pk = parse_issue_id(item.get('id'))
+            issue = issues_by_pk.get(pk)
+            if 'id' not in item:
+                item_errors['id'] = ["This field is required."]
+            elif pk is None:
+                item_errors['id'] = ["A valid integer is required."]
+            elif pk in seen_pks:
+                item_errors['id'] = ["Duplicate id: an issue can be updated by one item only."]
+            elif issue is None:
+                item_errors['id'] = ["Issue not found in the project."]
+            elif issue.author_id != user.pk:
+                item_errors['id'] = ["Editing issue is restricted to the author only."]
+            seen_pks.add(pk)
+            issues.append(issue)
+        return issues
+
+    def create(self, validated_data):
+        """Override create method to insert all issues with bulk_create."""
+
+        issues = [Issue(**attrs) for attrs in validated_data]
+        try:
+            self.insert_issues(issues)
+        except IntegrityError:  # Ids were taken concurrently, after their allocation.
+            self.insert_issues(issues)
+        prefetch_related_objects(issues, 'project__users')
+        return issues
+
+    def insert_issues(self, issues):
+        """Insert the issues with bulk_create. If the database (e.g. SQLite, MySQL) doesn't return the ids of the
+        inserted rows, the ids are allocated explicitly after the greatest id of the table (as the import does).
+        """
+
+        with transaction.atomic():
+            if not connection.features.can_return_rows_from_bulk_insert:
+                next_pk = (Issue.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+                for pk, issue in enumerate(issues, start=next_pk):
+                    issue.pk = pk
+            Issue.objects.bulk_create(issues)
+            bulk_saved.send(sender=Issue, instances=issues, created=True)
+
+    def update(self, instance, validated_data):
+        """Override update method to update all issues with bulk_update."""
+
+        now = timezone.now()
+        fields = {'updated_time'}  # bulk_update doesn't set auto_now fields
+        for issue, attrs in zip(self.issues, validated_data):
+            for attr, value in attrs.items():
+                setattr(issue, attr, value)
+            issue.updated_time = now
+            fields.update(attrs)
+
+        with transaction.atomic():
+            counters.lock_issues(self.issues)  # The transitions of the counters are the ones of the rows.
+            Issue.objects.bulk_update(self.issues, fields)
+            bulk_saved.send(sender=Issue, instances=self.issues, created=False)
+        prefetch_related_objects(self.issues, 'project__users')
+        return self.issues
+
+
 class IssueSerializer(serializers.ModelSerializer):
     """Serializer is used for an issue."""
 
@@ -74,8 +310,10 @@ class IssueSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Issue
-        fields = ['id', 'title', 'description', 'tag', 'priority', 'status', 'assignee_user', 'author', 'project']
-        read_only_fields = ['id']
+        fields = ['id', 'title', 'description', 'tag', 'priority', 'status', 'assignee_user', 'author', 'project',
+                  'created_time', 'updated_time']
+        read_only_fields = ['id', 'created_time', 'updated_time']
+        list_serializer_class = IssueListSerializer
 
     def create(self, validated_data):
         """Override create method."""
@@ -100,8 +338,8 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ['id', 'description', 'author', 'issue']
-        read_only_fields = ['id']
+        fields = ['id', 'description', 'author', 'issue', 'created_time', 'updated_time']
+        read_only_fields = ['id', 'created_time', 'updated_time']
         depth = 1
 
     def create(self, validated_data):
@@ -0,0 +1,179 @@
+"""Signal receivers of project tracking app (connected in ProjectTrackingAppConfig.ready).
+
+bulk_saved is sent by the code which writes rows with bulk_create/bulk_update (these methods don't send
+post_save signals), with the list of saved instances and whether they were created.
+"""
+
+from collections import Counter
+
+from django.db.models import Q
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver, Signal
+
+from .models import Project, ProjectVersion, Contributor, Issue, Comment, User
+from .roles import role_cache
+from .versions import bump_project_versions
+from . import counters, search, throughput
+
+bulk_saved = Signal()
+
+USER_SERIALIZED_FIELDS = {'first_name', 'last_name', 'email'}  # Fields of UserSerializer (besides id)
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+def invalidate_contributor_role(sender, instance, **kwargs):
+    """The role of a user in a project has changed: forget the cached role and outdate the roles of his tokens."""
+
+    role_cache.role_changed(instance.user_id, instance.project_id)
+
+
+@receiver(bulk_saved, sender=Contributor)
+def invalidate_contributor_roles(sender, instances, **kwargs):
+    for contributor in instances:
+        role_cache.role_changed(contributor.user_id, contributor.project_id)
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_project_roles(sender, instance, **kwargs):
+    """A project has changed or has been deleted: forget the cached roles of all its users."""
+
+    role_cache.invalidate_project(instance.pk)
+
+
+@receiver(post_save, sender=Issue)
+def index_issue(sender, instance, **kwargs):
+    search.index_issues([instance])
+
+
+@receiver(bulk_saved, sender=Issue)
+def index_issues(sender, instances, **kwargs):
+    search.index_issues(instances)
+
+
+@receiver(post_delete, sender=Issue)
+def remove_issue_from_index(sender, instance, **kwargs):
+    search.remove_rows([search.issue_rowid(instance.pk)])
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comments([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_index(sender, instance, **kwargs):
+    search.remove_rows([search.comment_rowid(instance.pk)])
+
+
+@receiver(post_save, sender=Project)
+def bump_project_version(sender, instance, created, **kwargs):
+    """The project has changed: outdate the responses about it (the version of a new project is created)."""
+
+    if created:
+        ProjectVersion.objects.create(project=instance)
+    else:
+        bump_project_versions(project=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+@receiver([post_save, post_delete], sender=Issue)
+def bump_project_version_of_instance(sender, instance, **kwargs):
+    bump_project_versions(project=instance.project_id)
+
+
+@receiver(bulk_saved, sender=Contributor)
+@receiver(bulk_saved, sender=Issue)
+def bump_project_versions_of_instances(sender, instances, **kwargs):
+    bump_project_versions(project__in={instance.project_id for instance in instances})
+
+
+@receiver(post_save, sender=User)
+def bump_project_versions_of_user(sender, instance, created, update_fields=None, **kwargs):
+    """The responses about projects embed their users (contributors, authors and assignees of issues, authors of
+    comments): outdate them when a user changes (not when e.g. only last_login is saved).
+    """
+
+    if created or (update_fields is not None and not USER_SERIALIZED_FIELDS & set(update_fields)):
+        return
+    embeds_user = Q(project__contributors__user=instance.pk)
+    embeds_user |= Q(project__issues__author=instance.pk) | Q(project__issues__assignee_user=instance.pk)
+    embeds_user |= Q(project__issues__comments__author=instance.pk)
+    bump_project_versions(embeds_user)
+
+
+@receiver(bulk_saved, sender=Project)
+def create_project_versions(sender, instances, created, **kwargs):
+    if created:
+        ProjectVersion.objects.bulk_create([ProjectVersion(project=project) for project in instances])
+
+
+@receiver(bulk_saved, sender=Comment)
+def comments_saved(sender, instances, created, **kwargs):
+    """Index the comments, count the new ones and bump the versions of their projects (read with one query)."""
+
+    issue_projects = dict(
+        Issue.objects.filter(pk__in={comment.issue_id for comment in instances}).values_list('pk', 'project_id')
+    )
+    search.index_rows([
+        search.comment_row(comment.pk, issue_projects[comment.issue_id], comment.issue_id, comment.description)
+        for comment in instances
+    ])
+    if created:
+        counters.apply_deltas(Counter(
+            (issue_projects[comment.issue_id], counters.COMMENTS, '') for comment in instances
+        ))
+    bump_project_versions(project__in=set(issue_projects.values()))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def bump_project_version_of_comment(sender, instance, **kwargs):
+    # Filtered through the issue, so that the project of a comment isn't loaded (e.g. when the comments of a
+    # deleted issue are deleted by cascade).
+    bump_project_versions(project__issues=instance.issue_id)
+
+
+@receiver(post_init, sender=Issue)
+def track_issue_counted_values(sender, instance, **kwargs):
+    counters.track_issue(instance)
+
+
+@receiver(pre_save, sender=Issue)
+def lock_saved_issue(sender, instance, raw=False, **kwargs):
+    """Read the counted values of the issue from its locked row (see counters module)."""
+
+    if not instance._state.adding and not raw:
+        counters.lock_issues([instance])
+
+
+@receiver(pre_delete, sender=Issue)
+def lock_deleted_issue(sender, instance, **kwargs):
+    counters.lock_issues([instance])
+
+
+@receiver(post_save, sender=Issue)
+def count_saved_issue(sender, instance, created, **kwargs):
+    count_saved_issues(sender, [instance], created)
+
+
+@receiver(bulk_saved, sender=Issue)
+def count_saved_issues(sender, instances, created, **kwargs):
+    """Record the status events of the issues, then update the counters (which record the new values)."""
+
+    throughput.record_status_events(instances, created=created)
+    counters.issues_saved(instances, created=created)
+
+
+@receiver(post_delete, sender=Issue)
+def count_deleted_issue(sender, instance, **kwargs):
+    counters.issues_saved([instance], deleted=True)
+
+
+@receiver(post_save, sender=Comment)
+def count_added_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.comment_deleted(instance)
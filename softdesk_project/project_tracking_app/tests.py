@@ -1,3 +1,950 @@
-from django.test import TestCase
+"""Query budgets of the endpoints, and behavior of the caches and endpoints of the app.
 
-# Create your tests here.
+Every endpoint of the benchmark (see benchmark module) is requested once, with cold caches, on a small and on a
+larger seeded dataset (see seeding module), and must make exactly the number of SQL queries of QUERY_BUDGETS:
+the same number at both sizes, so that an endpoint whose queries grow with the number of rows (e.g. a serializer
+without select_related/prefetch_related) fails. The failures list the queries of the endpoint.
+
+The behavior tests use a small project (see ProjectAPITestCase): its author, a manager, and a user outside it.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from softdesk_project.testing import QUERY_BUDGETS, TemporaryFilesMixin, clear_caches, format_queries
+
+from .benchmark import APIBenchmark
+from .checks import check_roles_in_token
+from .models import Project, Contributor, Issue, Comment, User
+from .replicas import (
+    ReadRouting, ReplicaRouter, copy_database, current_routing, get_pin_cache, is_pinned_to_primary, pin_key,
+)
+from .responses import response_cache
+from .roles import MISSING, get_claims_role, get_role, role_cache
+from .seeding import DatasetSeeder
+from .signals import bulk_saved
+
+PASSWORD = 'query-budget-password'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTests(TemporaryFilesMixin, TestCase):
+    dataset = {'users': 20, 'projects': 3, 'contributors': 5, 'issues': 30, 'comments': 60}
+
+    @classmethod
+    def setUpTestData(cls):
+        DatasetSeeder(password=PASSWORD, log=lambda message: None, **cls.dataset).run()
+
+    def setUp(self):
+        clear_caches()
+        self.benchmark = APIBenchmark(PASSWORD, repeat=1, log=lambda message: None)
+        self.benchmark.prepare()
+
+    def test_query_budgets(self):
+        endpoints = self.benchmark.get_endpoints()
+        self.assertEqual({endpoint.name for endpoint in endpoints}, set(QUERY_BUDGETS))
+        for endpoint in endpoints:
+            with self.subTest(endpoint=endpoint.name):
+                client = self.benchmark.clients[endpoint.client]
+                url, data = endpoint.prepare()
+                clear_caches()
+                with CaptureQueriesContext(connection) as context:
+                    response = getattr(client, endpoint.method)(url, data, format='json')
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 300, response.content if not response.streaming else '')
+                self.assertEqual(
+                    len(context.captured_queries), QUERY_BUDGETS[endpoint.name],
+                    f"{endpoint.name} made {len(context.captured_queries)} queries "
+                    f"(budget {QUERY_BUDGETS[endpoint.name]}):\n{format_queries(context.captured_queries)}",
+                )
+
+
+class LargeDatasetQueryBudgetTests(QueryBudgetTests):
+    dataset = {'users': 100, 'projects': 10, 'contributors': 20, 'issues': 600, 'comments': 1500}
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProjectAPITestCase(TemporaryFilesMixin, TestCase):
+    """A project with its author and a manager, a user outside the project, and API clients logged in as them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author@example.com', 'Ada', 'Author', PASSWORD)
+        cls.manager = User.objects.create_user('manager@example.com', 'Max', 'Manager', PASSWORD)
+        cls.outsider = User.objects.create_user('outsider@example.com', 'Otto', 'Outsider', PASSWORD)
+        cls.project = Project.objects.create(title='Tracker', type='back-end')
+        Contributor.objects.create(project=cls.project, user=cls.author, permission='AUTHOR')
+        Contributor.objects.create(project=cls.project, user=cls.manager, permission='MANAGER')
+        cls.project_url = f'/projects/{cls.project.pk}/'
+
+    def setUp(self):
+        clear_caches()
+
+    def login(self, user):
+        client = APIClient()
+        response = client.post('/login/', {'email': user.email, 'password': PASSWORD}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        client.access_token = AccessToken(response.data['access'])
+        return client
+
+    def create_issue(self, author, **fields):
+        fields = {'title': 'Issue', 'description': 'Description', 'tag': 'BUG', 'priority': 'LOW', 'status': 'TODO',
+                  'assignee_user': author, **fields}
+        return Issue.objects.create(project=self.project, author=author, **fields)
+
+    def issue_data(self, assignee, **fields):
+        return {'title': 'Issue', 'description': 'Description', 'tag': 'BUG', 'priority': 'LOW', 'status': 'TODO',
+                'assignee_user': {'email': assignee.email, 'first_name': assignee.first_name,
+                                  'last_name': assignee.last_name}, **fields}
+
+    def set_role(self, user, role):
+        contributor = Contributor.objects.get(project=self.project, user=user)
+        contributor.permission = role
+        contributor.save()
+
+
+@override_settings(PROJECT_ROLES_IN_TOKEN=True)
+class RoleInvalidationTests(ProjectAPITestCase):
+
+    def test_cached_role_is_forgotten_after_a_role_change(self):
+        self.assertEqual(get_role(self.manager, self.project.pk), 'MANAGER')
+        self.assertEqual(role_cache.get(self.manager.pk, self.project.pk), 'MANAGER')
+        self.set_role(self.manager, 'AUTHOR')
+        self.assertIs(role_cache.get(self.manager.pk, self.project.pk), MISSING)
+        self.assertEqual(get_role(self.manager, self.project.pk), 'AUTHOR')
+
+    def test_roles_of_token_are_outdated_by_a_role_change(self):
+        client = self.login(self.author)
+        self.assertEqual(get_claims_role(client.access_token, self.author.pk, self.project.pk), 'AUTHOR')
+
+        self.set_role(self.author, 'MANAGER')
+        self.assertIs(get_claims_role(client.access_token, self.author.pk, self.project.pk), MISSING)
+        response = client.put(self.project_url, {'title': 'Renamed', 'type': 'iOS'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_roles_in_token_require_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_roles_in_token(None)], ['project_tracking_app.E001'])
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'roles_cache'}
+        with override_settings(CACHES={**settings.CACHES, settings.ROLE_CACHE_ALIAS: shared}):
+            self.assertEqual(check_roles_in_token(None), [])
+
+
+class IssueBulkTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.bulk_url = f'{self.project_url}issues/bulk/'
+
+    def test_bulk_create(self):
+        items = [self.issue_data(self.author, title='First'), self.issue_data(self.manager, title='Second')]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([item['title'] for item in response.data], ['First', 'Second'])
+        issues = Issue.objects.filter(project=self.project).order_by('pk')
+        self.assertEqual([issue.pk for issue in issues], [item['id'] for item in response.data])
+        self.assertEqual([issue.assignee_user for issue in issues], [self.author, self.manager])
+
+    def test_bulk_create_returns_the_ids_of_the_new_issues(self):
+        other_project = Project.objects.create(title='Other', type='back-end')
+        latest = Issue.objects.create(project=other_project, author=self.author, assignee_user=self.author,
+                                      title='Latest', description='Description', tag='BUG', priority='LOW',
+                                      status='TODO')
+        items = [self.issue_data(self.author, title=title) for title in ('First', 'Second', 'Third')]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        for item in response.data:
+            issue = Issue.objects.get(pk=item['id'])
+            self.assertEqual((issue.title, issue.project_id), (item['title'], self.project.pk))
+            self.assertGreater(issue.pk, latest.pk)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        items = [self.issue_data(self.author), self.issue_data(self.author, status='CLOSED')]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(set(response.data[1]), {'status'})
+
+        nobody = {'email': 'nobody@example.com', 'first_name': 'No', 'last_name': 'Body'}
+        items = [{**self.issue_data(self.author), 'assignee_user': nobody}, self.issue_data(self.author),
+                 self.issue_data(self.author, priority='URGENT')]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[:2], [{'assignee_user': ["User not found."]}, {}])
+        self.assertEqual(set(response.data[2]), {'priority'})
+        self.assertFalse(Issue.objects.exists())
+
+    def test_bulk_create_is_restricted_to_contributors(self):
+        response = self.login(self.outsider).post(self.bulk_url, [self.issue_data(self.outsider)], format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_update(self):
+        first, second = self.create_issue(self.author), self.create_issue(self.author)
+        items = [{'id': first.pk, 'status': 'IN_PR'}, {'id': str(second.pk), 'status': 'COMPLETED'}]
+        response = self.client.patch(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('IN_PR', 'COMPLETED'))
+
+    def test_bulk_update_rejects_issues_of_other_authors(self):
+        own, other = self.create_issue(self.author), self.create_issue(self.manager)
+        items = [{'id': own.pk, 'status': 'IN_PR'}, {'id': other.pk, 'status': 'IN_PR'}]
+        response = self.client.patch(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{}, {'id': ["Editing issue is restricted to the author only."]}])
+        self.assertFalse(Issue.objects.filter(status='IN_PR').exists())
+
+    def test_bulk_update_reports_malformed_missing_and_duplicate_ids(self):
+        issue = self.create_issue(self.author)
+        items = [{'id': issue.pk, 'status': 'IN_PR'}, {'id': 'abc', 'status': 'IN_PR'}, {'status': 'IN_PR'},
+                 {'id': issue.pk, 'status': 'COMPLETED'}, {'id': issue.pk + 1000, 'status': 'IN_PR'},
+                 {'id': issue.pk + 1000, 'status': 'CLOSED'}]
+        response = self.client.patch(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[:5], [
+            {},
+            {'id': ["A valid integer is required."]},
+            {'id': ["This field is required."]},
+            {'id': ["Duplicate id: an issue can be updated by one item only."]},
+            {'id': ["Issue not found in the project."]},
+        ])
+        # The errors of the fields are reported with the errors of the ids.
+        self.assertEqual(set(response.data[5]), {'id', 'status'})
+        issue.refresh_from_db()
+        self.assertEqual(issue.status, 'TODO')
+
+
+class ContributorBulkTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.bulk_url = f'{self.project_url}users/bulk/'
+        self.saved = []
+        bulk_saved.connect(self.record_saved, sender=Contributor)
+        self.addCleanup(bulk_saved.disconnect, self.record_saved, sender=Contributor)
+
+    def record_saved(self, sender, instances, created, **kwargs):
+        self.saved.extend((contributor.user_id, created) for contributor in instances)
+
+    def test_emails_match_case_insensitively(self):
+        role_cache.set(self.outsider.pk, self.project.pk, None)
+        items = [{'email': 'OutSider@Example.COM', 'permission': 'CREATOR'}]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([item['user']['id'] for item in response.data['added']], [self.outsider.pk])
+        self.assertIs(role_cache.get(self.outsider.pk, self.project.pk), MISSING)
+        self.assertEqual(get_role(self.outsider, self.project.pk), 'CREATOR')
+
+    def test_users_are_found_with_indexes(self):
+        items = [{'email': 'OutSider@Example.COM', 'permission': 'CREATOR'},
+                 {'uid': str(self.manager.uid), 'permission': 'CREATOR'}]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        queries = [query['sql'] for query in context.captured_queries]
+        [users_query] = [sql for sql in queries if 'LOWER("users_user"."email")' in sql]
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {users_query}')
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            self.assertIn('users_user_email_lower_idx', plan)
+            self.assertNotIn('SCAN', plan.replace('SCAN CONSTANT ROW', ''))
+
+    def test_existing_contributors_are_skipped_without_signal(self):
+        items = [{'email': self.manager.email, 'permission': 'CREATOR'},
+                 {'uid': str(self.outsider.uid), 'permission': 'MANAGER'}]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([user['id'] for user in response.data['skipped']], [self.manager.pk])
+        self.assertEqual(self.saved, [(self.outsider.pk, True)])
+        self.assertEqual(Contributor.objects.get(project=self.project, user=self.manager).permission, 'MANAGER')
+
+    def test_unknown_users_are_reported_per_item(self):
+        items = [{'email': self.outsider.email, 'permission': 'CREATOR'},
+                 {'email': 'nobody@example.com', 'permission': 'CREATOR'}]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{}, {'user': ["User not found."]}])
+        self.assertEqual(self.saved, [])
+
+
+class IssueFilterTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.issues_url = f'{self.project_url}issues/'
+        self.todo = self.create_issue(self.author, status='TODO', priority='HIGH')
+        self.in_progress = self.create_issue(self.author, status='IN_PR', priority='LOW')
+        self.completed = self.create_issue(self.manager, status='COMPLETED', priority='LOW')
+
+    def get_ids(self, query):
+        response = self.client.get(f'{self.issues_url}?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [issue['id'] for issue in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids('status=TODO'), [self.todo.pk])
+        self.assertEqual(self.get_ids('status=TODO,IN_PR'), [self.in_progress.pk, self.todo.pk])
+        self.assertEqual(self.get_ids('status=TODO&status=COMPLETED'), [self.completed.pk, self.todo.pk])
+        self.assertEqual(self.get_ids(f'priority=LOW&author={self.manager.pk}'), [self.completed.pk])
+        self.assertEqual(self.get_ids('ordering=id'), [self.todo.pk, self.in_progress.pk, self.completed.pk])
+
+    def test_invalid_parameters_are_rejected(self):
+        invalid_queries = {
+            'status=DONE': 'status',
+            'assignee_user=abc': 'assignee_user',
+            'author=0': 'author',
+            'created_after=yesterday': 'created_after',
+            'created_after=2026-02-01T00:00Z&created_before=2026-01-01T00:00Z': 'non_field_errors',
+            'stauts=TODO': 'stauts',
+            'ordering=title': 'ordering',
+            'ordering=-updated_time': 'ordering',
+        }
+        for query, field in invalid_queries.items():
+            with self.subTest(query=query):
+                response = self.client.get(f'{self.issues_url}?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(list(response.data), [field])
+
+    def walk_pages(self, query, between_pages):
+        """Return the ids of all the pages of the list, calling between_pages after each page."""
+
+        ids, url = [], f'{self.issues_url}?{query}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [issue['id'] for issue in response.data['results']]
+            self.assertLess(len(ids), 100, 'The walk never ends.')
+            url = response.data['next']
+            between_pages()
+        return ids
+
+    def test_cursor_pages_are_stable_while_issues_change(self):
+        for number in range(5):
+            self.create_issue(self.author, title=f'Issue {number}')
+
+        def between_pages():
+            self.create_issue(self.author, title='Added')
+            for issue in Issue.objects.filter(project=self.project):
+                issue.status = 'IN_PR' if issue.status == 'TODO' else 'TODO'
+                issue.save()
+
+        for ordering in ('-id', 'created_time'):
+            with self.subTest(ordering=ordering):
+                expected = self.get_ids(f'ordering={ordering}&page_size=200')
+                ids = self.walk_pages(f'ordering={ordering}&page_size=2', between_pages)
+                # The issues added during the walk come before the first page (-id) or after the last one.
+                self.assertEqual(ids[:len(expected)], expected)
+                self.assertEqual(len(ids), len(set(ids)))
+
+
+class SearchTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.search_url = f'{self.project_url}search/'
+        self.issue = self.create_issue(self.author, title='Login fails', description='The token expires too early')
+        self.other_issue = self.create_issue(self.author, title='Slow export', description='Export takes minutes')
+        self.comment = Comment.objects.create(issue=self.other_issue, author=self.manager,
+                                              description='The login page is slow too')
+        other_project = Project.objects.create(title='Other', type='iOS')
+        Issue.objects.create(project=other_project, author=self.author, assignee_user=self.author,
+                             title='Login fails elsewhere', description='Login')
+
+    def search(self, query):
+        response = self.client.get(self.search_url, {'q': query})
+        self.assertEqual(response.status_code, 200, response.data)
+        return {(result['type'], result['id']) for result in response.data['results']}
+
+    def test_search(self):
+        self.assertEqual(self.search('login'), {('issue', self.issue.pk), ('comment', self.comment.pk)})
+        self.assertEqual(self.search('login slow'), {('comment', self.comment.pk)})
+        self.assertEqual(self.search('exp*'), {('issue', self.issue.pk), ('issue', self.other_issue.pk)})
+        self.assertEqual(self.search('missing'), set())
+
+    def test_search_is_updated_with_the_issues(self):
+        self.issue.title = 'Signup fails'
+        self.issue.description = 'Nothing'
+        self.issue.save()
+        self.assertEqual(self.search('login'), {('comment', self.comment.pk)})
+        self.other_issue.delete()
+        self.assertEqual(self.search('slow'), set())
+
+    def test_search_syntax_of_user_query_is_not_interpreted(self):
+        queries = ['login OR export', 'title: login', '"login', 'NEAR(login export)', "login'; DROP TABLE x; --",
+                   '* ^ " ( )', 'p1', '{project}: p2']
+        for query in queries:
+            with self.subTest(query=query):
+                self.search(query)
+        self.assertEqual(self.search('login OR export'), set())  # All the words must match, OR is a word
+        self.assertEqual(self.search(f'p{self.project.pk}'), set())  # The project tokens aren't searched
+        self.assertTrue(Issue.objects.filter(pk=self.issue.pk).exists())
+
+    def test_search_requires_a_query_and_a_contributor(self):
+        self.assertEqual(self.client.get(self.search_url).status_code, 400)
+        self.assertEqual(self.login(self.outsider).get(self.search_url, {'q': 'login'}).status_code, 404)
+
+
+class ConditionalGetTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.issue = self.create_issue(self.author)
+        self.issues_url = f'{self.project_url}issues/'
+
+    def assert_not_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_unchanged_resources_are_not_modified(self):
+        for url in (self.project_url, self.issues_url, f'{self.issues_url}{self.issue.pk}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assert_not_modified(url, response['ETag'])
+
+    def test_etag_depends_on_the_user_and_the_url(self):
+        etag = self.client.get(self.issues_url)['ETag']
+        self.assertNotEqual(self.client.get(f'{self.issues_url}?status=TODO')['ETag'], etag)
+        manager_client = self.login(self.manager)
+        self.assertEqual(manager_client.get(self.issues_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        writes = [
+            lambda: self.client.post(self.issues_url, self.issue_data(self.author), format='json'),
+            lambda: self.client.post(f'{self.issues_url}{self.issue.pk}/comments/', {'description': 'Comment'},
+                                     format='json'),
+            lambda: self.client.put(self.project_url, {'title': 'Renamed', 'type': 'iOS'}, format='json'),
+            lambda: self.set_role(self.manager, 'CREATOR'),
+        ]
+        for write in writes:
+            etag = self.client.get(self.issues_url)['ETag']
+            response = write()
+            self.assertLess(getattr(response, 'status_code', 200), 300)
+            response = self.client.get(self.issues_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_of_other_users_request_fails_without_access(self):
+        etag = self.client.get(self.issues_url)['ETag']
+        response = self.login(self.outsider).get(self.issues_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.issue = self.create_issue(self.author, assignee_user=self.outsider)
+        self.issue_url = f'{self.project_url}issues/{self.issue.pk}/'
+
+    def get(self, client, url):
+        hits = response_cache.hits
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), response_cache.hits > hits
+
+    def test_responses_are_cached(self):
+        client = self.login(self.author)
+        content, hit = self.get(client, self.issue_url)
+        self.assertFalse(hit)
+        self.assertEqual(self.get(client, self.issue_url), (content, True))
+
+    def test_responses_are_not_shared_across_roles(self):
+        self.get(self.login(self.author), self.issue_url)
+        _, hit = self.get(self.login(self.manager), self.issue_url)
+        self.assertFalse(hit)
+        self.assertEqual(self.login(self.outsider).get(self.issue_url).status_code, 404)
+
+    def test_responses_are_outdated_by_a_change_of_a_user(self):
+        client = self.login(self.author)
+        self.get(client, self.issue_url)
+        self.outsider.last_name = 'Renamed'
+        self.outsider.save()
+        content, hit = self.get(client, self.issue_url)
+        self.assertFalse(hit)
+        self.assertEqual(content['assignee_user']['last_name'], 'Renamed')
+
+        self.outsider.last_login = self.outsider.date_joined
+        self.outsider.save(update_fields=['last_login'])
+        self.assertEqual(self.get(client, self.issue_url), (content, True))
+
+
+class CounterTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.stats_url = f'{self.project_url}stats/'
+
+    def get_stats(self):
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counters_follow_the_writes(self):
+        issue = self.create_issue(self.author, status='TODO', priority='HIGH')
+        other = self.create_issue(self.author, status='TODO', assignee_user=self.manager)
+        Comment.objects.create(issue=issue, author=self.author, description='Comment')
+        stats = self.get_stats()
+        self.assertEqual((stats['issues'], stats['comments']), (2, 1))
+        self.assertEqual(stats['status'], {'TODO': 2, 'IN_PR': 0, 'COMPLETED': 0})
+        self.assertEqual(stats['assignee'], {str(self.author.pk): 1, str(self.manager.pk): 1})
+
+        issue.status = 'COMPLETED'
+        issue.save()
+        response = self.client.patch(f'{self.project_url}issues/bulk/', [{'id': other.pk, 'status': 'IN_PR'}],
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_stats()['status'], {'TODO': 0, 'IN_PR': 1, 'COMPLETED': 1})
+
+        issue.delete()
+        stats = self.get_stats()
+        self.assertEqual((stats['issues'], stats['comments']), (1, 0))
+        self.assertEqual(stats['status'], {'TODO': 0, 'IN_PR': 1, 'COMPLETED': 0})
+        self.assertEqual(stats['priority'], {'LOW': 1, 'MEDIUM': 0, 'HIGH': 0})
+
+    def test_concurrent_updates_are_counted_once(self):
+        issue = self.create_issue(self.author, status='TODO')
+        first, second = Issue.objects.get(pk=issue.pk), Issue.objects.get(pk=issue.pk)
+        for loaded in (first, second):  # Two requests complete the same issue
+            loaded.status = 'COMPLETED'
+            loaded.save()
+        self.assertEqual(self.get_stats()['status'], {'TODO': 0, 'IN_PR': 0, 'COMPLETED': 1})
+
+        first.delete()
+        second.delete()
+        stats = self.get_stats()
+        self.assertEqual((stats['issues'], stats['status']['COMPLETED']), (0, 0))
+
+    def test_counters_are_written_in_the_transaction_of_the_issue(self):
+        issue = self.create_issue(self.author, status='TODO')
+
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError('The write of the issue fails.')
+
+        post_save.connect(fail, sender=Issue)
+        self.addCleanup(post_save.disconnect, fail, sender=Issue)
+        issue.status = 'COMPLETED'
+        with self.assertRaises(RuntimeError):
+            issue.save()
+        self.assertEqual(Issue.objects.get(pk=issue.pk).status, 'TODO')
+        self.assertEqual(self.get_stats()['status'], {'TODO': 1, 'IN_PR': 0, 'COMPLETED': 0})
+
+
+class ThroughputTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.throughput_url = f'{self.project_url}throughput/'
+        self.today = timezone.localdate().isoformat()
+
+    def get_today(self, **params):
+        response = self.client.get(self.throughput_url, {'since': self.today, 'until': self.today, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return {key: value for key, value in response.json()['days'][0].items() if key != 'day'}
+
+    def test_throughput_after_status_changes(self):
+        issue = self.create_issue(self.author, status='TODO', priority='HIGH')
+        self.create_issue(self.author, status='TODO', priority='LOW')
+        for status in ('IN_PR', 'COMPLETED', 'TODO', 'COMPLETED'):
+            issue.status = status
+            issue.save()
+        issue.title = 'Renamed'  # Not a status change
+        issue.save()
+        self.assertEqual(self.get_today(), {'created': 0, 'completed': 0, 'reopened': 0})
+
+        call_command('rollup_throughput', stdout=StringIO())
+        self.assertEqual(self.get_today(), {'created': 2, 'completed': 2, 'reopened': 1})
+        self.assertEqual(self.get_today(priority='LOW'), {'created': 1, 'completed': 0, 'reopened': 0})
+
+        call_command('rollup_throughput', stdout=StringIO())  # Events are aggregated once
+        self.assertEqual(self.get_today(), {'created': 2, 'completed': 2, 'reopened': 1})
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(self.throughput_url, {'since': '2026-02-01', 'until': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.throughput_url, {'since': '2020-01-01', 'until': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportImportTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.login(self.author)
+        self.export_url = f'{self.project_url}export/'
+        self.issue = self.create_issue(self.author, title='Exported', status='IN_PR', assignee_user=self.manager)
+        Comment.objects.create(issue=self.issue, author=self.manager, description='First')
+        Comment.objects.create(issue=self.issue, author=self.author, description='Second')
+
+    def export(self, **headers):
+        response = self.client.get(self.export_url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return content
+
+    def write_export(self, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'export.ndjson')
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def test_export_ignores_the_accept_header(self):
+        content = self.export()
+        self.assertEqual(self.export(HTTP_ACCEPT='application/json'), content)
+        self.assertEqual(self.export(HTTP_ACCEPT_ENCODING='gzip'), content)
+        response = self.login(self.outsider).get(self.export_url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_import_round_trip(self):
+        content = self.export()
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record['record'] for record in records],
+                         ['project', 'contributor', 'contributor', 'issue', 'comment', 'comment'])
+
+        path = self.write_export(content)
+        call_command('import_tracker', path, stdout=StringIO())
+        imported = Project.objects.exclude(pk=self.project.pk).get()
+        self.assertEqual((imported.title, imported.type), (self.project.title, self.project.type))
+        self.assertEqual(
+            set(Contributor.objects.filter(project=imported).values_list('user', 'permission')),
+            {(self.author.pk, 'AUTHOR'), (self.manager.pk, 'MANAGER')},
+        )
+        issue = Issue.objects.get(project=imported)
+        fields = ('title', 'status', 'author_id', 'assignee_user_id', 'created_time', 'updated_time')
+        self.assertEqual([getattr(issue, field) for field in fields], [getattr(self.issue, field) for field in fields])
+        self.assertEqual(
+            list(Comment.objects.filter(issue=issue).order_by('pk').values_list('description', 'author')),
+            [('First', self.manager.pk), ('Second', self.author.pk)],
+        )
+        self.assertEqual(get_role(self.manager, imported.pk), 'MANAGER')
+
+        stdout = StringIO()
+        call_command('import_tracker', path, stdout=stdout)  # The same file isn't imported twice
+        self.assertIn('already imported', stdout.getvalue())
+        self.assertEqual(Project.objects.count(), 2)
+
+    def test_import_keeps_the_timestamps(self):
+        lines = [
+            {'record': 'project', 'id': 1, 'title': 'Imported', 'type': 'iOS'},
+            {'record': 'issue', 'id': 1, 'title': 'Old', 'author': self.author.email, 'status': 'COMPLETED',
+             'created_time': '2020-01-02T03:04:05.678901Z', 'updated_time': '2020-02-03T04:05:06Z'},
+            {'record': 'comment', 'id': 1, 'issue_id': 1, 'description': 'Old', 'author': self.author.email,
+             'created_time': '2020-01-03T00:00:00Z', 'updated_time': '2020-01-03T00:00:00Z'},
+        ]
+        path = self.write_export(b''.join(json.dumps(line).encode() + b'\n' for line in lines))
+        with CaptureQueriesContext(connection) as context:
+            call_command('import_tracker', path, stdout=StringIO())
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertFalse([sql for sql in updates if '_time' in sql], 'The timestamps are written in the INSERT')
+        issue = Issue.objects.get(title='Old')
+        self.assertEqual(issue.created_time.isoformat(), '2020-01-02T03:04:05.678901+00:00')
+        self.assertEqual(issue.updated_time.isoformat(), '2020-02-03T04:05:06+00:00')
+        self.assertEqual(Comment.objects.get(issue=issue).created_time.isoformat(), '2020-01-03T00:00:00+00:00')
+
+        issue.title = 'Updated'  # The auto_now fields of the models still work after an import
+        issue.save()
+        self.assertGreater(issue.updated_time, timezone.now() - timedelta(minutes=1))
+        self.assertGreater(self.create_issue(self.author).created_time, issue.created_time)
+
+    def test_import_requires_known_users(self):
+        content = self.export().replace(self.manager.email.encode(), b'unknown@example.com')
+        with self.assertRaisesMessage(CommandError, '1 unknown users'):
+            call_command('import_tracker', self.write_export(content), stdout=StringIO())
+        self.assertEqual(Project.objects.count(), 1)
+
+
+class ProfilingTests(ProjectAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.issues_url = f'{self.project_url}issues/'
+        shutil.rmtree(settings.PROFILE_DIR, ignore_errors=True)
+
+    def list_profiles(self):
+        directory = settings.PROFILE_DIR
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def test_profile_requested_by_a_staff_user(self):
+        self.manager.is_staff = True
+        self.manager.save()
+        response = self.login(self.manager).get(self.issues_url, {'profile': 1})
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile-Id']
+        self.assertEqual(self.list_profiles(), [f'{name}.json', f'{name}.prof'])
+        with open(os.path.join(settings.PROFILE_DIR, f'{name}.json')) as file:
+            details = json.load(file)
+        self.assertEqual((details['user_id'], details['sampled']), (self.manager.pk, False))
+
+    def test_profile_requested_by_other_users_is_ignored(self):
+        client = self.login(self.author)
+        client.get(self.issues_url)
+        hits = response_cache.hits
+        for response in (client.get(self.issues_url, HTTP_X_PROFILE='1'),
+                         client.get(self.issues_url, {'profile': 1}),
+                         client.get(self.issues_url, {'profile': 1}),
+                         self.client.get(self.issues_url, {'profile': 1})):
+            self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(response_cache.hits, hits + 2)  # The requests of the author are served by the cache
+        self.assertEqual(self.list_profiles(), [])
+
+    @override_settings(PROFILE_SAMPLE_RATES={'issues-list': 1})
+    def test_sampled_requests_are_profiled(self):
+        client = self.login(self.author)
+        response = client.get(self.issues_url)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(len(self.list_profiles()), 2)
+        client.get(self.project_url)
+        self.assertEqual(len(self.list_profiles()), 2)
+
+
+class MetricsTests(ProjectAPITestCase):
+
+    def get_metrics(self, **headers):
+        return self.client.get('/metrics', **headers)
+
+    @override_settings(METRICS_TOKEN='metrics-secret')
+    def test_metrics_require_the_token(self):
+        self.login(self.author).get(self.project_url)
+        response = self.get_metrics(HTTP_AUTHORIZATION='Bearer metrics-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'softdesk_http_requests_total{', response.content)
+        self.assertEqual(self.get_metrics().status_code, 403)
+        self.assertEqual(self.get_metrics(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        access = self.login(self.author).access_token
+        self.assertEqual(self.get_metrics(HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 403)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_without_token_are_open_in_debug_mode_only(self):
+        self.assertEqual(self.get_metrics().status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.get_metrics().status_code, 200)
+
+
+@override_settings(ROOT_URLCONF='softdesk_project.async_urls',
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncReadTests(TemporaryFilesMixin, TransactionTestCase):
+    """The async views run the view in the threads of the executor, whose database connections don't see the
+    transaction of a TestCase: the rows are committed.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.author = User.objects.create_user('author@example.com', 'Ada', 'Author', PASSWORD)
+        self.outsider = User.objects.create_user('outsider@example.com', 'Otto', 'Outsider', PASSWORD)
+        self.project = Project.objects.create(title='Tracker', type='back-end')
+        Contributor.objects.create(project=self.project, user=self.author, permission='AUTHOR')
+        self.issue = Issue.objects.create(project=self.project, author=self.author, assignee_user=self.author,
+                                          title='Issue', description='Description', tag='BUG', priority='LOW',
+                                          status='TODO')
+        self.issues_url = f'/projects/{self.project.pk}/issues/'
+
+    def get_token(self, user):
+        response = APIClient().post('/login/', {'email': user.email, 'password': PASSWORD}, format='json')
+        return response.data['access']
+
+    def sync_get(self, url, **headers):
+        with override_settings(ROOT_URLCONF='softdesk_project.urls'):
+            return APIClient().get(url, **headers)
+
+    def test_read_endpoints_are_async(self):
+        issue_url = f'{self.issues_url}{self.issue.pk}/'
+        project_url = f'/projects/{self.project.pk}/'
+        for url in ('/projects/', project_url, self.issues_url, issue_url, f'{issue_url}comments/'):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func), url)
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(f'{project_url}users/').func))
+
+    @override_settings(ROOT_URLCONF='softdesk_project.urls')
+    def test_asgi_application_resolves_with_async_urlconf(self):
+        from softdesk_project.asgi import application
+
+        scope = {'type': 'http', 'method': 'GET', 'path': self.issues_url, 'query_string': b'', 'headers': []}
+        request, error_response = application.create_request(scope, BytesIO())
+        self.assertIsNone(error_response)
+        self.assertEqual(request.urlconf, settings.ASGI_URLCONF)
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(self.issues_url, urlconf=request.urlconf).func))
+
+    async def test_contributor_reads_as_with_sync_views(self):
+        token = await sync_to_async(self.get_token)(self.author)
+        response = await self.async_client.get(self.issues_url, authorization=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200, response.content)
+        sync_response = await sync_to_async(self.sync_get)(self.issues_url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+
+    async def test_non_contributor_and_anonymous_requests_are_denied(self):
+        token = await sync_to_async(self.get_token)(self.outsider)
+        response = await self.async_client.get(self.issues_url, authorization=f'Bearer {token}')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+        for authorization in (None, 'Bearer invalid'):
+            headers = {'authorization': authorization} if authorization else {}
+            response = await self.async_client.get(self.issues_url, **headers)
+            sync_headers = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+            sync_response = await sync_to_async(self.sync_get)(self.issues_url, **sync_headers)
+            self.assertIn(response.status_code, (401, 404))
+            self.assertEqual(response.status_code, sync_response.status_code)
+            self.assertEqual(response.json(), sync_response.json())
+
+    async def test_writes_are_dispatched_to_sync_views(self):
+        token = await sync_to_async(self.get_token)(self.author)
+        data = {'title': 'Async', 'description': 'Description', 'tag': 'BUG', 'priority': 'LOW', 'status': 'TODO',
+                'assignee_user': {'email': self.author.email, 'first_name': 'Ada', 'last_name': 'Author'}}
+        response = await self.async_client.post(self.issues_url, json.dumps(data), content_type='application/json',
+                                                authorization=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['title'], 'Async')
+        response = await self.async_client.get(self.issues_url, authorization=f'Bearer {token}')
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+REPLICA = 'replica1'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ReplicaRoutingTests(TemporaryFilesMixin, TransactionTestCase):
+    """A replica which mirrors the in-memory test database (as "TEST": {"MIRROR": "default"} would) through its own
+    connection, so that the queries of each database are captured. The connection of the replica wouldn't see the
+    rows of the transaction of a TestCase: the rows are committed.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Registered once the test database is set up (the test runner only sets up the databases of DATABASES).
+        connections.databases[REPLICA] = dict(connections.databases[DEFAULT_DB_ALIAS])
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        clear_caches()
+        self.author = User.objects.create_user('author@example.com', 'Ada', 'Author', PASSWORD)
+        self.manager = User.objects.create_user('manager@example.com', 'Max', 'Manager', PASSWORD)
+        self.project = Project.objects.create(title='Tracker', type='back-end')
+        Contributor.objects.create(project=self.project, user=self.author, permission='AUTHOR')
+        Contributor.objects.create(project=self.project, user=self.manager, permission='MANAGER')
+        self.issues_url = f'/projects/{self.project.pk}/issues/'
+
+    def login(self, user):
+        client = APIClient()
+        response = client.post('/login/', {'email': user.email, 'password': PASSWORD}, format='json')
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def request_queries(self, client, method, url, data=None):
+        """Return the response of a request, and the SQL queries it made on the primary and on the replica."""
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                response = getattr(client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return response, primary.captured_queries, replica.captured_queries
+
+    def issue_data(self, title):
+        return {'title': title, 'description': 'Description', 'tag': 'BUG', 'priority': 'LOW', 'status': 'TODO',
+                'assignee_user': {'email': self.author.email, 'first_name': 'Ada', 'last_name': 'Author'}}
+
+    def test_reads_of_get_requests_go_to_the_replica(self):
+        client = self.login(self.author)
+        response, primary, replica = self.request_queries(client, 'get', self.issues_url)
+        self.assertTrue(any('"project_tracking_app_issue"' in query['sql'] for query in replica))
+        self.assertFalse(any('"project_tracking_app_issue"' in query['sql'] for query in primary))
+
+    def test_writes_go_to_the_primary(self):
+        client = self.login(self.author)
+        response, primary, replica = self.request_queries(client, 'post', self.issues_url, self.issue_data('New'))
+        self.assertEqual(replica, [])
+        self.assertTrue(any(query['sql'].startswith('INSERT INTO "project_tracking_app_issue"') for query in primary))
+
+    def test_user_reads_his_writes_from_the_primary(self):
+        author, manager = self.login(self.author), self.login(self.manager)
+        self.request_queries(author, 'post', self.issues_url, self.issue_data('New'))
+        self.assertTrue(is_pinned_to_primary(self.author.pk))
+        self.assertFalse(is_pinned_to_primary(self.manager.pk))
+
+        response, primary, replica = self.request_queries(author, 'get', self.issues_url)
+        self.assertEqual(replica, [])
+        self.assertEqual([issue['title'] for issue in response.data['results']], ['New'])
+        response, primary, replica = self.request_queries(manager, 'get', self.issues_url)
+        self.assertNotEqual(replica, [])
+
+        get_pin_cache().delete(pin_key(self.author.pk))  # The pin has expired (REPLICA_PIN_SECONDS).
+        response, primary, replica = self.request_queries(author, 'get', self.issues_url)
+        self.assertNotEqual(replica, [])
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Issue), DEFAULT_DB_ALIAS)
+        token = current_routing.set(ReadRouting(REPLICA))
+        try:
+            self.assertEqual(router.db_for_read(Issue), REPLICA)
+            self.assertEqual(router.db_for_write(Issue), DEFAULT_DB_ALIAS)
+        finally:
+            current_routing.reset(token)
+        self.assertFalse(router.allow_migrate(REPLICA, 'project_tracking_app'))
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'project_tracking_app'))
+
+    @override_settings(REPLICA_SYNC_PAGES=1, REPLICA_SYNC_SLEEP_SECONDS=0)
+    def test_database_is_copied_by_steps(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = os.path.join(directory, 'primary.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+            source = sqlite3.connect(primary)
+            with source:
+                source.execute('CREATE TABLE row (id INTEGER PRIMARY KEY, text TEXT)')
+                source.executemany('INSERT INTO row (text) VALUES (?)', [('x' * 100,)] * 1000)  # Many pages
+            source.close()
+            copy_database(primary, replica)
+            target = sqlite3.connect(replica)
+            try:
+                self.assertEqual(target.execute('SELECT COUNT(*) FROM row').fetchone(), (1000,))
+            finally:
+                target.close()
+
+    async def test_async_write_pins_reads_to_the_primary(self):
+        client = await sync_to_async(self.login)(self.author)
+        authorization = client._credentials['HTTP_AUTHORIZATION']
+        response = await self.async_client.post(self.issues_url, json.dumps(self.issue_data('New')),
+                                                content_type='application/json', authorization=authorization)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(await sync_to_async(is_pinned_to_primary)(self.author.pk))
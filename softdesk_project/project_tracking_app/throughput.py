@@ -0,0 +1,103 @@
+"""Throughput of projects: numbers of issues created, completed and reopened per day, by priority.
+
+- An IssueStatusEvent is recorded when an issue is created or when its status changes (see signals module; the
+  previous status is the one recorded when the issue was loaded, see counters.track_issue).
+- An incremental job (rollup_throughput command) aggregates the events recorded since its checkpoint into
+  ProjectDailyThroughput rows, and moves its checkpoint in the same transaction, so each event is counted once.
+- The throughput endpoint reads the daily rows of a date range, it never scans the issues.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .counters import get_tracked_values
+from .models import IssueStatusEvent, ProjectDailyThroughput, RollupCheckpoint
+
+COMPLETED = 'COMPLETED'
+CHECKPOINT_NAME = 'throughput'
+COUNTS = ('created', 'completed', 'reopened')
+
+
+def record_status_events(issues, created=False):
+    """Record the creation of issues (at their created_time, e.g. for imported issues), or the changes of their
+    status since they were loaded.
+    """
+
+    now = timezone.now()
+    events = []
+    for issue in issues:
+        status = issue.status or ''
+        time = now
+        if created:
+            from_status = ''
+            time = issue.created_time or now
+        else:
+            tracked = get_tracked_values(issue)
+            if tracked is None or tracked['status'] == status:
+                continue
+            from_status = tracked['status']
+        events.append(IssueStatusEvent(
+            project_id=issue.project_id, issue_id=issue.pk, from_status=from_status, to_status=status,
+            priority=issue.priority or '', time=time,
+        ))
+    if events:
+        IssueStatusEvent.objects.bulk_create(events)
+
+
+def add_to_daily_throughput(project_pk, day, priority, **counts):
+    rows = ProjectDailyThroughput.objects.filter(project=project_pk, day=day, priority=priority)
+    if not rows.update(**{name: F(name) + count for name, count in counts.items()}):
+        ProjectDailyThroughput.objects.create(project_id=project_pk, day=day, priority=priority, **counts)
+
+
+def rollup_events(batch_size=10000):
+    """Aggregate the events recorded since the checkpoint into the daily rows, by batches of events (each batch
+    and the move of the checkpoint in a transaction). Return the number of aggregated events.
+    """
+
+    count = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+            events = IssueStatusEvent.objects.filter(pk__gt=checkpoint.last_id).order_by('pk')
+            pks = list(events.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return count
+            days = (
+                events.filter(pk__lte=pks[-1])
+                .annotate(day=TruncDate('time'))
+                .values_list('project', 'day', 'priority')
+                .annotate(
+                    created=Count('pk', filter=Q(from_status='')),
+                    completed=Count('pk', filter=Q(to_status=COMPLETED) & ~Q(from_status=COMPLETED)),
+                    reopened=Count('pk', filter=Q(from_status=COMPLETED) & ~Q(to_status=COMPLETED)),
+                )
+                .order_by()
+            )
+            for project_pk, day, priority, *counts in days:
+                add_to_daily_throughput(project_pk, day, priority, **dict(zip(COUNTS, counts)))
+            checkpoint.last_id = pks[-1]
+            checkpoint.save()
+        count += len(pks)
+
+
+def get_daily_throughput(project_pk, since, until, priority=None):
+    """Return the counts of a project for each day from since to until (included), optionally of a priority."""
+
+    rows = ProjectDailyThroughput.objects.filter(project=project_pk, day__range=(since, until))
+    if priority is not None:
+        rows = rows.filter(priority=priority)
+    sums = rows.values_list('day').annotate(*(Sum(name) for name in COUNTS)).order_by()
+    counts_by_day = {day: counts for day, *counts in sums}
+
+    days = []
+    day = since
+    while day <= until:
+        counts = counts_by_day.get(day, (0,) * len(COUNTS))
+        days.append({'day': day, **dict(zip(COUNTS, counts))})
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,149 @@
+"""Timings of the requests (see RequestTimingMiddleware and TimingMixin).
+
+The middleware creates the RequestTimings of a request, available to the code which runs for it through
+current_timings (a context variable, which sync_to_async passes to the threads which run the sync code of async
+requests). The SQL queries are recorded by an execute wrapper installed on every database connection.
+The phases of a request are measured as exclusive durations: the duration of a phase excludes its queries (counted
+in "db") and the phases nested in it, so that the durations add up (to less than the total of the request):
+- db: the SQL queries (and their number, and the number of repeated statements, a sign of N+1 queries).
+- permissions: the permission checks of the view (see TimingMixin).
+- serialize: the handler of the view (querysets, serializers, pagination), see TimingMixin.
+- render: the rendering of the response (see RequestTimingMiddleware.process_template_response).
+
+The durations are sent in a Server-Timing header (if SERVER_TIMING_HEADER setting), and the requests which take
+more than SLOW_REQUEST_THRESHOLD_MS milliseconds are logged as JSON to the "project_tracking_app.requests" logger,
+with their repeated statements. Measuring costs two clock reads per query or phase and a counter per statement.
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger('project_tracking_app.requests')
+
+current_timings = ContextVar('current_timings', default=None)
+
+PHASES = ('db', 'permissions', 'serialize', 'render')
+LOGGED_STATEMENTS = 5
+LOGGED_SQL_LENGTH = 500
+
+
+class RequestTimings:
+    """Exclusive durations (in seconds) of the phases of a request, and statistics of its SQL queries."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = Counter()
+        self.measured = 0  # Sum of the durations: the time to exclude from the phase which encloses them.
+        self.queries = 0
+        self.statements = Counter()
+        self.timeline = None  # List of the (start, duration, sql) of the queries, if recorded (see profiling module)
+
+    def start(self):
+        """Return the token of a phase which starts (see stop)."""
+
+        return time.perf_counter(), self.measured
+
+    def stop(self, phase, token):
+        """Add the duration of a phase which started with token, excluding the durations measured meanwhile."""
+
+        started, measured = token
+        duration = time.perf_counter() - started - (self.measured - measured)
+        self.durations[phase] += duration
+        self.measured += duration
+
+    @contextmanager
+    def measure(self, phase):
+        token = self.start()
+        try:
+            yield
+        finally:
+            self.stop(phase, token)
+
+    def add_query(self, sql, started, duration):
+        self.durations['db'] += duration
+        self.measured += duration
+        self.queries += 1
+        self.statements[sql] += 1
+        if self.timeline is not None:
+            self.timeline.append((started - self.started, duration, sql))
+
+    def repeated_statements(self):
+        """Return the (sql, count) of the statements which ran several times, the most repeated first."""
+
+        return [(sql, count) for sql, count in self.statements.most_common() if count > 1]
+
+    def server_timing(self, total):
+        """Return the value of the Server-Timing header (durations in milliseconds)."""
+
+        repeated = sum(count - 1 for sql, count in self.repeated_statements())
+        metrics = [f'db;dur={self.durations["db"] * 1000:.1f};desc="{self.queries} queries, {repeated} repeated"']
+        metrics += [
+            f'{phase};dur={self.durations[phase] * 1000:.1f}' for phase in PHASES[1:] if phase in self.durations
+        ]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def log_record(self, request, response, total):
+        return {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            **{f'{phase}_ms': round(self.durations[phase] * 1000, 1) for phase in PHASES if phase in self.durations},
+            'queries': self.queries,
+            'repeated_statements': [
+                {'sql': sql[:LOGGED_SQL_LENGTH], 'count': count}
+                for sql, count in self.repeated_statements()[:LOGGED_STATEMENTS]
+            ],
+        }
+
+    def finish(self, request, response):
+        """Add the Server-Timing header to the response and log the request if it is slow. Return its duration."""
+
+        total = time.perf_counter() - self.started
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = self.server_timing(total)
+        threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        if threshold is not None and total * 1000 >= threshold:
+            logger.warning(json.dumps(self.log_record(request, response, total)))
+        return total
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper (see connection.execute_wrapper) recording the queries in the timings of the request."""
+
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, started, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Receiver of connection_created signal: record the queries of the connection (of any thread).
+    It is the first wrapper, so that it outlives the wrappers of the execute_wrapper context managers.
+    """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def measure(phase):
+    """Measure a phase of the current request (if its timings are recorded)."""
+
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(phase):
+        yield
@@ -5,6 +5,8 @@ from .views import (
     IssueViewSet,
     CommentViewSet,
     ProjectUserViewSet,
+    CacheStatsView,
+    MetricsView,
 )
 
 # See: https://github.com/alanjds/drf-nested-routers
@@ -29,10 +31,13 @@ issues_router.register(r'comments', CommentViewSet, basename='comments')
 projects_for_users_router = routers.NestedSimpleRouter(router, r'projects', lookup='project')
 projects_for_users_router.register(r'users', ProjectUserViewSet, basename='users')
 
+# The list and retrieve endpoints of projects, issues and comments are async in softdesk_project/async_urls.py.
 # e.g of an url: http://127.0.0.1:8000/viewset/projects/3/comments/1/issues/1/
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(projects_router.urls)),
     path('', include(issues_router.urls)),
     path('', include(projects_for_users_router.urls)),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
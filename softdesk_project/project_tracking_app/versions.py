@@ -0,0 +1,43 @@
+"""Per-project version counters, used as validators of conditional GET requests (ETag / If-None-Match).
+
+Every write which changes what the endpoints of a project return (the project, its contributors, issues and
+comments) increments the counter of the project (see signals module) with an UPDATE ... SET version = version + 1,
+so concurrent writes never lose an increment. A GET response carries an ETag derived from the versions it
+depends on: while they don't change, the client's copy is still valid and the server answers 304 Not Modified
+without running the list query nor the serializers.
+
+The versions are read before the response is built: a write which happens meanwhile may be included in a response
+tagged with the previous version, the next request then gets a new ETag and the up-to-date content.
+"""
+
+import hashlib
+
+from django.db.models import F
+
+from .models import ProjectVersion
+
+
+def bump_project_versions(*conditions, **filters):
+    """Increment the versions of the projects selected by Q objects and filters (e.g. project=pk,
+    project__issues=issue_pk).
+    """
+
+    ProjectVersion.objects.filter(*conditions, **filters).update(version=F('version') + 1)
+
+
+def get_project_version(project_pk):
+    return ProjectVersion.objects.filter(project=project_pk).values_list('version', flat=True).first() or 0
+
+
+def get_user_projects_versions(user):
+    """Return the list of (project_id, version) of the projects of which a user is a contributor."""
+
+    versions = ProjectVersion.objects.filter(project__contributors__user=user).order_by('project_id')
+    return list(versions.values_list('project_id', 'version'))
+
+
+def make_etag(*parts):
+    """Return a quoted entity tag built from the parts (versions, user, URL...)."""
+
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
@@ -1,14 +1,19 @@
 """API Views for different requests about user, project, issue and comment.
 """
 
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
 from rest_framework import viewsets, status, mixins
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+from rest_framework.views import APIView
 
 from .models import (
     User,
-    Project,
     Contributor,
     Issue,
 )
@@ -16,34 +21,81 @@ from .serializers import (
     UserSerializer,
     ProjectSerializer,
     ContributorSerializer,
+    ContributorItemSerializer,
     IssueSerializer,
     CommentSerializer,
+    parse_issue_id,
 )
 from .permissions import (
     IsAuthorOrReadPostOnlyProject,
     IsAuthorOrReadPostOnlyUser,
     IssuePermission,
     CommentPermission,
+    HasMetricsToken,
+    UserRole,
+)
+from .context import get_project_context
+from .counters import get_project_stats
+from .export import NDJSONContentNegotiation, NDJSONRenderer, export_project
+from .filters import IssueFilterBackend, StrictOrderingFilter, ThroughputQuerySerializer
+from .metrics import PrometheusRenderer, registry
+from .mixins import RelatedFieldsMixin, ConditionalGetMixin, TimingMixin
+from .responses import response_cache
+from .roles import role_cache, get_request_role
+from .search import is_search_available, search_project
+from .throughput import get_daily_throughput
+from .versions import get_project_version, get_user_projects_versions
+from .pagination import (
+    IssueCursorPagination,
+    CommentCursorPagination,
 )
 
-from .exceptions import UniqueConstraint
+from .exceptions import UniqueConstraint, SearchUnavailable
 
+AUTHOR_IS_UNIQUE = "'AUTHOR' of the project is unique. Select another permission except AUTHOR."
 
-class ProjectViewSet(viewsets.ModelViewSet):
+
+class ProjectViewSet(TimingMixin, ConditionalGetMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing project instances.
     - The type of endpoints: /projects/ or /projects/{id}
     - "GET", "POST" request's permission are satisfied via get_queryset method.
     - "DELETE", "PUT" requests are needed to check author project permission.
+    - GET responses carry an ETag, a request with a matching If-None-Match header gets 304, and rendered responses
+    are cached (see ConditionalGetMixin).
     """
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthorOrReadPostOnlyProject]
+    prefetch_related_fields = ('users',)
+    cache_responses = True
+    search_page_size = 20
+    search_max_page_size = 100
 
     def get_queryset(self):
         """Define a set of projects to which the authenticated user can access."""
 
         return self.request.user.projects.all()  # Only projects of which the authenticated user is contributor.
 
+    def get_etag_versions(self, request):
+        """The list depends on the projects of the user, a project on its own version (see ConditionalGetMixin)."""
+
+        if self.action == 'list':
+            return get_user_projects_versions(request.user)
+        try:
+            project_pk = int(self.kwargs['pk'])
+        except ValueError:
+            return None
+        if get_request_role(request, project_pk) is None:
+            return None
+        return get_project_version(project_pk)
+
+    def get_response_role(self, request):
+        """The list of projects doesn't depend on a role (see ConditionalGetMixin)."""
+
+        if self.action == 'list':
+            return None
+        return get_request_role(request, self.kwargs['pk'])
+
     def create(self, request, *args, **kwargs):
         """The authenticated user creates a new project."""
 
@@ -57,8 +109,95 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data)
 
+    def get_contributor_project_pk(self, request, pk):
+        """Return the id of the project of the endpoint, raise Http404 if the user isn't one of its contributors."""
+
+        try:
+            project_pk = int(pk)
+        except ValueError:
+            raise Http404
+        if get_request_role(request, project_pk) is None:
+            raise Http404
+        return project_pk
+
+    @action(detail=True)
+    def search(self, request, pk=None):
+        """Search the issues and comments of a project: /projects/{id}/search/?q=words&page=1&page_size=20.
+        All the words must match (a word ending with * matches a prefix), results are ranked by relevance.
+        """
+
+        project_pk = self.get_contributor_project_pk(request, pk)
+        if not is_search_available():
+            raise SearchUnavailable()
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': ['This parameter is required.']})
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', self.search_page_size))
+        except ValueError:
+            raise ValidationError({'page': ['A valid integer is required.']})
+        if page < 1 or page_size < 1:
+            raise ValidationError({'page': ['Ensure this value is greater than or equal to 1.']})
+        page_size = min(page_size, self.search_max_page_size)
+
+        # Fetch one more result to know if there is a next page.
+        results = search_project(project_pk, query, limit=page_size + 1, offset=(page - 1) * page_size)
+        url = request.build_absolute_uri()
+        next_url = replace_query_param(url, 'page', page + 1) if len(results) > page_size else None
+        if page == 1:
+            previous_url = None
+        elif page == 2:
+            previous_url = remove_query_param(url, 'page')
+        else:
+            previous_url = replace_query_param(url, 'page', page - 1)
+
+        return Response({'next': next_url, 'previous': previous_url, 'results': results[:page_size]})
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Counts of issues of a project (total, by status, priority, tag and assignee id) and of its comments:
+        /projects/{id}/stats/. They are read from the counters of the project (see counters module).
+        """
+
+        project_pk = self.get_contributor_project_pk(request, pk)
+        return Response(get_project_stats(project_pk))
+
+    @action(detail=True)
+    def throughput(self, request, pk=None):
+        """Numbers of issues of a project created, completed and reopened per day:
+        /projects/{id}/throughput/?since=2021-06-01&until=2021-06-30&priority=HIGH.
+        They are read from the daily rows computed by the rollup_throughput command (see throughput module).
+        """
+
+        project_pk = self.get_contributor_project_pk(request, pk)
+        serializer = ThroughputQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        days = get_daily_throughput(project_pk, params['since'], params['until'], params.get('priority'))
+        return Response({**params, 'days': days})
+
+    @action(detail=True, renderer_classes=[NDJSONRenderer], content_negotiation_class=NDJSONContentNegotiation)
+    def export(self, request, pk=None):
+        """Export a project with its contributors, issues and comments as NDJSON (one JSON object per line):
+        /projects/{id}/export/. The response is streamed, and compressed if the client accepts gzip encoding.
+        The Accept header is ignored: the response (including its errors) is always NDJSON.
+        """
+
+        project_pk = self.get_contributor_project_pk(request, pk)
+        compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = StreamingHttpResponse(export_project(project_pk, compress), content_type=NDJSONRenderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="project-{project_pk}.ndjson"'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
 
 class ProjectUserViewSet(
+    TimingMixin,
+    RelatedFieldsMixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -72,19 +211,22 @@ class ProjectUserViewSet(
     - "POST" request is needed to check permission.
     - "DELETE" request is needed to check author project permission.
     - "PUT" request is not allowed here (can't modify user's information).
+    - /projects/{id}/users/bulk/ adds a batch of contributors at once (POST).
     """
 
     serializer_class = UserSerializer
     permission_classes = [IsAuthorOrReadPostOnlyUser]
+    # UserSerializer has no nested relation: the list is served by a single query on users.
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    bulk_max_items = 1000
 
     def get_queryset(self):
         """Define a set of users associated with a project determined via an endpoint."""
 
-        projects = self.request.user.projects.all()
-        project_pk = self.kwargs["project_pk"]
-
-        project = get_object_or_404(projects, pk=project_pk)
-        users = project.users.all()
+        if not UserRole().is_contributor(self.request, self):
+            raise Http404
+        users = User.objects.filter(projects=self.kwargs["project_pk"])
         return users
 
     def get_object(self):
@@ -105,14 +247,14 @@ class ProjectUserViewSet(
         user_serializer.is_valid(raise_exception=True)
         user = get_object_or_404(User, **user_serializer.data)
 
-        project = Project.objects.get(pk=project_pk)
+        project = get_project_context(request, self).project
 
-        if user in users:
+        if users.filter(pk=user.pk).exists():
             raise UniqueConstraint(detail="This user is already one of contributors of the project")
 
         permission = data.get("permission")
         if permission == 'AUTHOR':
-            raise UniqueConstraint(detail="'AUTHOR' of the project is unique. Select another permission except AUTHOR.")
+            raise UniqueConstraint(detail=AUTHOR_IS_UNIQUE)
 
         serializer = ContributorSerializer(data=data)  # data has popped user data
         serializer.is_valid(raise_exception=True)
@@ -120,43 +262,89 @@ class ProjectUserViewSet(
 
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, project_pk=None, *args, **kwargs):
+        """The authenticated user adds a batch of contributors to a project.
+        Each item contains the email or the uid of a user and his permission (except AUTHOR).
+        The users who are already contributors of the project are skipped.
+        """
+
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': ["Expected a non-empty list of contributors."]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [f"At most {self.bulk_max_items} contributors per request."]})
+
+        serializer = ContributorItemSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        if any(attrs['permission'] == 'AUTHOR' for attrs in serializer.validated_data):
+            raise UniqueConstraint(detail=AUTHOR_IS_UNIQUE)
+
+        project = get_project_context(request, self).project
+        serializer.save(project=project)
+
+        response = {
+            'added': serializer.data,
+            'skipped': UserSerializer(serializer.skipped_users, many=True).data,
+        }
+        return Response(response)
+
     def destroy(self, request, project_pk=None, pk=None, *args, **kwargs):
         """The authenticated user deletes a user associated with a project (delete a contributor)."""
 
         user = self.get_object()  # This also allows to call has_object_permission, otherwise it will not be checked.
 
-        projects = user.projects.all()
-        project = get_object_or_404(projects, pk=project_pk)
-
+        project = get_project_context(request, self).project
         contributor = get_object_or_404(Contributor, user=user, project=project)
         contributor.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IssueViewSet(viewsets.ModelViewSet):
+class IssueViewSet(TimingMixin, ConditionalGetMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing issue instances.
     - The type of endpoints: /projects/{id}/issues or /projects/{id}/issues/{id}
     - get_queryset method and get_object method allow to check permission for GET, DELETE request.
     - "POST" method is needed to check permission.
     - "PUT" and 'DELETE' methods are needed to check author permission for an issue.
+    - The list of issues is paginated with a cursor (see pagination module), it can be filtered by
+    status, priority, tag, assignee_user, author, created_after/created_before, and ordered (see filters module).
+    - GET responses carry an ETag, a request with a matching If-None-Match header gets 304, and rendered responses
+    are cached (see ConditionalGetMixin).
+    - /projects/{id}/issues/bulk/ creates (POST) or partially updates (PATCH) a list of issues at once.
     """
     serializer_class = IssueSerializer
     permission_classes = [IssuePermission]
+    pagination_class = IssueCursorPagination
+    filter_backends = [IssueFilterBackend, StrictOrderingFilter]
+    # The cursor needs a (nearly) unique, not null and never updated ordering field: updated_time would move the
+    # updated issues across the pages.
+    ordering_fields = ['id', 'created_time']
+    ordering = ['-id']
+    select_related_fields = ('author', 'assignee_user', 'project')
+    cache_responses = True
+    prefetch_related_fields = ('project__users',)
+    bulk_max_items = 1000
 
     def get_queryset(self):
         """Define a set of issues associated with a project determined via an endpoint."""
 
-        projects = self.request.user.projects.all()
-        project_pk = self.kwargs["project_pk"]
-        project = get_object_or_404(projects, pk=project_pk)
-        issues = project.issues.all()
+        if not UserRole().is_contributor(self.request, self):
+            raise Http404
+        issues = Issue.objects.filter(project=self.kwargs["project_pk"])
         return issues
 
+    def get_etag_versions(self, request):
+        """Issues depend on the version of the project of the endpoint (see ConditionalGetMixin)."""
+
+        if not UserRole().is_contributor(request, self):
+            return None
+        return get_project_version(self.kwargs['project_pk'])
+
     def create(self, request, project_pk=None, *args, **kwargs):
         """The authenticated user adds a new issue to a project."""
 
-        project = get_object_or_404(Project, pk=project_pk)
+        project = get_project_context(request, self).project
         author = self.request.user
 
         serializer = IssueSerializer(data=request.data)
@@ -173,39 +361,95 @@ class IssueViewSet(viewsets.ModelViewSet):
         assignee_user = get_object_or_404(User, **assignee_user_data)
         serializer.save(assignee_user=assignee_user)
 
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request, project_pk=None, *args, **kwargs):
+        """The authenticated user creates (POST) or updates (PATCH, only his issues) a list of issues of a project.
+        Each item of a PATCH request contains the id of the issue to update and the fields to change.
+        Nothing is written if an item is not valid: the errors are reported per item.
+        """
+
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': ["Expected a non-empty list of issues."]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [f"At most {self.bulk_max_items} issues per request."]})
+
+        context = {'request': request}
+        if request.method == "POST":
+            project = get_project_context(request, self).project
+            serializer = IssueSerializer(data=items, many=True, context=context)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(project=project, author=request.user)
+        else:
+            ids = [parse_issue_id(item.get('id')) for item in items if isinstance(item, dict)]
+            issues = self.filter_queryset(self.get_queryset()).filter(pk__in=[pk for pk in ids if pk is not None])
+            serializer = IssueSerializer(issues, data=items, many=True, partial=True, context=context)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return Response(serializer.data)
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(TimingMixin, ConditionalGetMixin, RelatedFieldsMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing comment instances.
     - The type of endpoints: /projects/{id}/issues/comments/ or /projects/{id}/issues/{id}/comments/{id}
     - get_queryset method and get_object method allow to check permission for GET, DELETE request.
     - "POST" request is needed to check permission.
     - "PUT" and 'DELETE' request are needed to check author permission for a comment.
+    - The list of comments is paginated with a cursor (see pagination module).
+    - GET responses carry an ETag, a request with a matching If-None-Match header gets 304, and rendered responses
+    are cached (see ConditionalGetMixin).
     """
 
     serializer_class = CommentSerializer
     permission_classes = [CommentPermission]
+    pagination_class = CommentCursorPagination
+    select_related_fields = ('author', 'issue__author', 'issue__assignee_user', 'issue__project')
+    prefetch_related_fields = ('issue__project__users',)
+    cache_responses = True
 
     def get_queryset(self):
         """Define a set of comments associated with an issue determined via an endpoint."""
 
-        projects = self.request.user.projects.all()
-        project_pk = self.kwargs["project_pk"]
-        project = get_object_or_404(projects, pk=project_pk)
+        context = get_project_context(self.request, self)
+        if not context.is_contributor or not context.issue_in_project:
+            raise Http404
+        comments = context.issue.comments.all()
+        return comments
 
-        issues = project.issues
-        issue_pk = self.kwargs["issue_pk"]
-        issue = get_object_or_404(issues, pk=issue_pk)
+    def get_etag_versions(self, request):
+        """Comments depend on the version of the project of the endpoint (see ConditionalGetMixin)."""
 
-        comments = issue.comments.all()
-        return comments
+        if not UserRole().is_contributor(request, self):
+            return None
+        return get_project_version(self.kwargs['project_pk'])
 
     def create(self, request, project_pk=None, issue_pk=None, *args, **kwargs):
         """The authenticated user adds a new comment to an issue."""
 
-        issue = get_object_or_404(Issue, pk=issue_pk)
+        issue = get_project_context(request, self).issue
         author = self.request.user
         serializer = CommentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(author=author, issue=issue)
         return Response(serializer.data)
+
+
+class CacheStatsView(TimingMixin, APIView):
+    """Statistics of the caches of the current process (staff only), e.g. to verify that a cache carries load."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response({'roles': role_cache.stats(), 'responses': response_cache.stats()})
+
+
+class MetricsView(APIView):
+    """Metrics of all the processes in the Prometheus text format (see metrics module)."""
+
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request, format=None):
+        return Response(registry.collect())
@@ -2,6 +2,8 @@
 ASGI config for softdesk_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Its requests are resolved with the ASGI_URLCONF setting (async read views, see async_urls.py) instead of
+ROOT_URLCONF.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,8 +11,22 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'softdesk_project.settings')
 
-application = get_asgi_application()
+
+class URLConfASGIHandler(ASGIHandler):
+    """ASGI handler whose requests are resolved with the URLconf of ASGI_URLCONF setting."""
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = settings.ASGI_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)  # As get_asgi_application does
+application = URLConfASGIHandler()
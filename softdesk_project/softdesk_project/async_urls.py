@@ -0,0 +1,11 @@
+"""softdesk_project URL Configuration of the ASGI application
+
+The URLs of softdesk_project/urls.py, whose list and retrieve endpoints of projects, issues and comments are
+served by async views (see project_tracking_app/async_views.py). The requests of the ASGI application (asgi.py)
+are resolved with this module (see ASGI_URLCONF setting).
+"""
+from project_tracking_app.async_views import with_async_reads
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = with_async_reads(sync_urlpatterns)
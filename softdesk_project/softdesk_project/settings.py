@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 # import datetime
 from datetime import timedelta
@@ -47,6 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'project_tracking_app.middleware.request_timing_middleware',
+    'project_tracking_app.middleware.request_profiling_middleware',
+    'project_tracking_app.middleware.replica_routing_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +61,9 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'softdesk_project.urls'
+# URLconf of the requests of the ASGI application (asgi.py): the list and retrieve endpoints of projects, issues and
+# comments are served by async views (see project_tracking_app/async_views.py).
+ASGI_URLCONF = 'softdesk_project.async_urls'
 
 TEMPLATES = [
     {
@@ -87,6 +94,104 @@ DATABASES = {
     }
 }
 
+# Read replicas (see project_tracking_app/replicas.py): aliases of DATABASES which serve the reads of the GET
+# requests. A SQLite replica is a copy of db.sqlite3 kept up to date by "python manage.py sync_replicas --interval 1",
+# and it must mirror the primary in tests, e.g.:
+# DATABASES['replica1'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': BASE_DIR / 'db.replica1.sqlite3',
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica1']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['project_tracking_app.replicas.ReplicaRouter']
+# The reads of a user stay on the primary this long after his writes (more than the lag of the replicas).
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_CACHE_ALIAS = 'default'
+# A replica synced longer ago is not used (None: no limit).
+REPLICA_MAX_LAG_SECONDS = 30
+REPLICA_SYNC_SECONDS = 1
+# Pages copied per step of the sync of a SQLite replica (-1: all of them, the primary is read-locked during the whole
+# copy), and pause between steps: see project_tracking_app/replicas.py for the tradeoff between locks and lag.
+REPLICA_SYNC_PAGES = 1024
+REPLICA_SYNC_SLEEP_SECONDS = 0.01
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Roles of users in projects (see project_tracking_app/roles.py).
+    # Local memory is a cache per process: with several workers, use a shared backend, e.g.
+    # 'django.core.cache.backends.filebased.FileBasedCache' with 'LOCATION': BASE_DIR / 'cache' / 'roles'
+    # or 'django.core.cache.backends.db.DatabaseCache' with 'LOCATION': 'roles_cache' (run createcachetable).
+    'roles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roles',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # State of authenticated users (active, deleted, staff), see users/authentication.py. Saving a user evicts his
+    # state from the cache of the process only: with local memory, the other workers go on authenticating a
+    # deactivated user for at most TIMEOUT seconds. Keep it short, or use a shared backend (see "roles" above).
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': 5,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Rendered responses of the list and retrieve actions (see project_tracking_app/responses.py).
+    # Local memory evicts the least recently used entries beyond MAX_ENTRIES. With several workers, use a shared
+    # FileBasedCache or DatabaseCache backend (see "roles" above).
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+ROLE_CACHE_ALIAS = 'roles'
+RESPONSE_CACHE_ALIAS = 'responses'
+
+# Timings of the requests (see project_tracking_app/timing.py): Server-Timing header, and log of the requests which
+# take more than SLOW_REQUEST_THRESHOLD_MS milliseconds (None: no log).
+SERVER_TIMING_HEADER = True
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+# Profiles of requests (see project_tracking_app/profiling.py): asked for by staff users (X-Profile header or
+# PROFILE_QUERY_PARAM query parameter), or sampled: 1 request in N by URL name, e.g. {'comments-list': 1000, '*': 0}.
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_RING_SIZE = 100
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_SAMPLE_RATES = {}
+
+# Metrics of the requests, queries and caches (see project_tracking_app/metrics.py), written by each process to its
+# file of METRICS_DIR and served by /metrics, which requires "Authorization: Bearer <METRICS_TOKEN>". The token is
+# read from the SOFTDESK_METRICS_TOKEN environment variable: without it, /metrics is open only if DEBUG is on.
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_SECONDS = 1.0
+METRICS_TOKEN = os.environ.get('SOFTDESK_METRICS_TOKEN') or None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'project_tracking_app.requests': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -137,7 +242,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     )
 }
 
@@ -156,3 +261,10 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
+
+# Embed the roles of a user in his projects in access tokens (see users/tokens.py), if he contributes to at most
+# PROJECT_ROLES_CLAIM_MAX_PROJECTS projects (otherwise his roles are checked against the cache/database).
+# It requires a shared "roles" cache (see ROLE_CACHE_ALIAS): the cache holds the versions which outdate the roles of
+# tokens, so the other workers of a local-memory cache would trust outdated roles (a system check refuses it).
+PROJECT_ROLES_IN_TOKEN = False
+PROJECT_ROLES_CLAIM_MAX_PROJECTS = 100
@@ -0,0 +1,84 @@
+"""Helpers shared by the tests of the apps: query budgets of the endpoints (see project_tracking_app/tests.py and
+users/tests.py), caches and temporary files of the test cases.
+"""
+
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+QUERY_BUDGETS = {
+    # users/urls.py
+    'signup': 2,
+    'login': 2,
+    'token_obtain': 1,
+    'token_refresh': 0,
+    # projects
+    'projects_list': 4,
+    'projects_create': 7,
+    'projects_retrieve': 5,
+    'projects_update': 7,
+    'projects_destroy': 13,
+    'projects_search': 3,
+    'projects_stats': 3,
+    'projects_throughput': 3,
+    'projects_export': 6,
+    # contributors
+    'users_list': 3,
+    'users_retrieve': 3,
+    'users_create': 7,
+    'users_bulk': 8,
+    'users_destroy': 6,
+    # issues
+    'issues_list': 5,
+    'issues_list_filtered': 5,
+    'issues_create': 16,
+    'issues_retrieve': 5,
+    'issues_update': 15,
+    'issues_destroy': 16,
+    'issues_bulk_create': 17,
+    'issues_bulk_update': 13,
+    # comments
+    'comments_list': 5,
+    'comments_create': 8,
+    'comments_retrieve': 5,
+    'comments_update': 7,
+    'comments_destroy': 8,
+    # cache statistics
+    'cache_stats': 1,
+}
+
+# Queries added to the endpoints which issue tokens when the roles of the user are embedded in them (see
+# PROJECT_ROLES_IN_TOKEN setting and users/tests.py): the roles of the user and their version.
+ROLES_CLAIMS_QUERIES = {
+    'login': 1,
+    'token_obtain': 1,
+    'token_refresh': 1,
+}
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def format_queries(queries):
+    return '\n'.join(f"{number}. {query['sql']}" for number, query in enumerate(queries, start=1))
+
+
+class TemporaryFilesMixin:
+    """Write the metrics and the profiles of the requests of a test case to a temporary directory, instead of the
+    METRICS_DIR and PROFILE_DIR of the project.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        files_settings = override_settings(METRICS_DIR=Path(directory.name, 'metrics'),
+                                           PROFILE_DIR=Path(directory.name, 'profiles'))
+        files_settings.enable()
+        cls.addClassCleanup(files_settings.disable)
+        super().setUpClass()
@@ -0,0 +1,77 @@
+"""Authentication of users app."""
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User, ClaimsUser
+
+USER_STATE_FIELDS = ('is_active', 'is_deleted', 'is_staff', 'is_superuser')
+# Attribute of a Django request which is already authenticated: (user, validated token).
+CREDENTIALS_ATTRIBUTE = 'jwt_credentials'
+
+
+def get_user_state_cache():
+    """Return the cache of the state (USER_STATE_FIELDS) of users: see "users" alias in CACHES setting."""
+
+    return caches['users']
+
+
+def user_state_key(user_pk):
+    return f'user:{user_pk}:state'
+
+
+def get_user_state(user_pk):
+    """Return the state of a user as a dict of USER_STATE_FIELDS, read from the cache or the database (and then
+    cached), None if the user doesn't exist.
+    """
+
+    cache = get_user_state_cache()
+    state = cache.get(user_state_key(user_pk))
+    if state is None:
+        # Read from the primary database: a replica may not have a new user yet, and the state is cached.
+        state = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_pk).values_list(*USER_STATE_FIELDS).first()
+        if state is None:
+            return None
+        cache.set(user_state_key(user_pk), state)
+    return dict(zip(USER_STATE_FIELDS, state))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication which doesn't fetch the row of the user on every request.
+
+    The user is built from the user id claim of the token and from the state of the user (active/deleted,
+    staff/superuser flags), which is kept in a small LRU cache with a timeout. Saving or deleting a user
+    evicts his state (see users/signals.py) from the cache of the process: with a local-memory cache, the other
+    workers see the change after the timeout of the "users" cache (see CACHES setting).
+    The other fields of the user are loaded lazily (see ClaimsUser).
+    A request already authenticated (e.g. by an async view, see project_tracking_app/async_views.py) carries its
+    credentials in CREDENTIALS_ATTRIBUTE, which are returned without validating the token again.
+    """
+
+    def authenticate(self, request):
+        credentials = getattr(request, CREDENTIALS_ATTRIBUTE, None)  # DRF requests proxy it to the Django request
+        if credentials is not None:
+            return credentials
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        """Override get_user method to build the user from the token and the cached state of the user."""
+
+        try:
+            user_pk = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed(_('Token contained no recognizable user identification'))
+
+        state = get_user_state(user_pk)
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not state['is_active'] or state['is_deleted']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        values = dict(state, id=user_pk)
+        field_names = [field.attname for field in ClaimsUser._meta.concrete_fields if field.attname in values]
+        return ClaimsUser.from_db(None, field_names, [values[name] for name in field_names])
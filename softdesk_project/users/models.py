@@ -3,6 +3,7 @@
 import uuid
 
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.utils.translation import ugettext_lazy as _
@@ -46,6 +47,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'user'
         verbose_name_plural = 'users'
+        indexes = [
+            # Lookups of users by email regardless of case (e.g. the batches of contributors of a project).
+            models.Index(Lower('email'), name='users_user_email_lower_idx'),
+        ]
 
     uid = models.UUIDField(unique=True, editable=False, default=uuid.uuid4, verbose_name='Public identifier')
     email = models.EmailField(unique=True)
@@ -69,3 +74,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return f'{self.email}'
+
+
+class ClaimsUser(User):
+    """User built from the claims of an access token, without fetching its row (see users/authentication.py).
+
+    Only a few fields are loaded (id and the flags used by permissions). The other fields are deferred:
+    the first access to one of them loads all of them with a single query.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Override refresh_from_db method to load all deferred fields at once."""
+
+        if fields is not None:
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields)
@@ -4,9 +4,10 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.models import update_last_login
 
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
 from .models import User
+from .tokens import ProjectRolesRefreshToken
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -43,7 +44,7 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError("Invalid login credentials")
 
         try:
-            refresh = RefreshToken.for_user(user)
+            refresh = ProjectRolesRefreshToken.for_user(user)
             refresh_token = str(refresh)
             access_token = str(refresh.access_token)
 
@@ -58,3 +59,20 @@ class UserLoginSerializer(serializers.Serializer):
             return validation
         except User.DoesNotExist:
             raise serializers.ValidationError("Invalid login credentials")
+
+
+class ProjectRolesTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Serializer is used to obtain a pair of tokens whose access token embeds the roles of the user."""
+
+    @classmethod
+    def get_token(cls, user):
+        return ProjectRolesRefreshToken.for_user(user)
+
+
+class ProjectRolesTokenRefreshSerializer(TokenRefreshSerializer):
+    """Serializer is used to refresh an access token, with the current roles of the user."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data['access'] = str(ProjectRolesRefreshToken(attrs['refresh']).access_token)
+        return data
@@ -0,0 +1,14 @@
+"""Signal receivers of users app (connected in UsersConfig.ready)."""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import get_user_state_cache, user_state_key
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def evict_user_state(sender, instance, **kwargs):
+    """A user has changed (e.g. deactivated) or has been deleted: forget his cached state."""
+
+    get_user_state_cache().delete(user_state_key(instance.pk))
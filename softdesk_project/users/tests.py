@@ -1,3 +1,121 @@
-from django.test import TestCase
+"""Query budgets of signup and login: the roles of the user, embedded in his tokens (see users/tokens.py),
+are read with a constant number of queries whatever the number of his projects. Beyond
+PROJECT_ROLES_CLAIM_MAX_PROJECTS projects, the tokens carry no roles, which are read from the cache or the database.
+Authentication of the requests with the cached state of the users (see users/authentication.py).
+"""
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from project_tracking_app.models import Project, Contributor
+from project_tracking_app.roles import MISSING, ROLES_CLAIM, role_cache
+from softdesk_project.testing import QUERY_BUDGETS, ROLES_CLAIMS_QUERIES, TemporaryFilesMixin, clear_caches
+
+from .authentication import CREDENTIALS_ATTRIBUTE, ClaimsJWTAuthentication
+
+User = get_user_model()
+
+PASSWORD = 'query-budget-password'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], PROJECT_ROLES_IN_TOKEN=True)
+class UserQueryBudgetTests(TemporaryFilesMixin, TestCase):
+    projects = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budget@example.com', 'Budget', 'User', PASSWORD)
+        for number in range(cls.projects):
+            project = Project.objects.create(title=f'Project {number}', type='back-end')
+            Contributor.objects.create(project=project, user=cls.user, permission='AUTHOR')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+
+    def assert_query_budget(self, name, url, data):
+        clear_caches()
+        with self.assertNumQueries(QUERY_BUDGETS[name] + ROLES_CLAIMS_QUERIES.get(name, 0)):
+            response = self.client.post(url, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return response
+
+    def test_signup(self):
+        data = {'email': 'new@example.com', 'first_name': 'New', 'last_name': 'User', 'password': PASSWORD}
+        self.assert_query_budget('signup', '/signup/', data)
+
+    def test_login(self):
+        self.assert_query_budget('login', '/login/', {'email': self.user.email, 'password': PASSWORD})
+
+    def test_token_obtain_and_refresh(self):
+        credentials = {'email': self.user.email, 'password': PASSWORD}
+        response = self.assert_query_budget('token_obtain', '/token/obtain/', credentials)
+        self.assert_query_budget('token_refresh', '/token/refresh/', {'refresh': response.data['refresh']})
+
+
+class ManyProjectsUserQueryBudgetTests(UserQueryBudgetTests):
+    projects = 50
+
+
+@override_settings(PROJECT_ROLES_CLAIM_MAX_PROJECTS=10)
+class OverCapUserQueryBudgetTests(UserQueryBudgetTests):
+    projects = 11
+
+    def test_roles_are_read_from_cache_or_database(self):
+        response = self.client.post('/login/', {'email': self.user.email, 'password': PASSWORD}, format='json')
+        self.assertNotIn(ROLES_CLAIM, AccessToken(response.data['access']))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        project = Project.objects.order_by('pk').last()
+        self.assertIs(role_cache.get(self.user.pk, project.pk), MISSING)
+
+        self.assertEqual(self.client.get(f'/projects/{project.pk}/issues/').status_code, 200)
+        self.assertEqual(role_cache.get(self.user.pk, project.pk), 'AUTHOR')
+        outsider_project = Project.objects.create(title='Outside', type='back-end')
+        self.assertEqual(self.client.get(f'/projects/{outsider_project.pk}/issues/').status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ClaimsJWTAuthenticationTests(TemporaryFilesMixin, TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user('claims@example.com', 'Claims', 'User', PASSWORD)
+        self.client = APIClient()
+        response = self.client.post('/login/', {'email': self.user.email, 'password': PASSWORD}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_state_of_user_is_cached(self):
+        self.assertEqual(self.client.get('/projects/').status_code, 200)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get('/projects/').status_code, 200)
+        state_queries = [query for query in context.captured_queries if '"users_user"."is_active"' in query['sql']]
+        self.assertEqual(state_queries, [])
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get('/projects/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/projects/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_inactive')
+
+    def test_deleted_user_is_rejected(self):
+        self.assertEqual(self.client.get('/projects/').status_code, 200)
+        self.user.delete()
+        response = self.client.get('/projects/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_not_found')
+
+    def test_credentials_of_authenticated_request_are_reused(self):
+        token = AccessToken.for_user(self.user)
+        request = RequestFactory().get('/projects/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        user, validated_token = ClaimsJWTAuthentication().authenticate(request)
+        self.assertEqual(user.pk, self.user.pk)
+
+        request = RequestFactory().get('/projects/', HTTP_AUTHORIZATION='Bearer invalid')
+        setattr(request, CREDENTIALS_ATTRIBUTE, (user, validated_token))
+        self.assertEqual(ClaimsJWTAuthentication().authenticate(request), (user, validated_token))
@@ -0,0 +1,24 @@
+"""JWT tokens of users app."""
+
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from project_tracking_app.roles import get_roles_claims
+
+
+class ProjectRolesRefreshToken(RefreshToken):
+    """Refresh token whose access tokens embed the roles of the user in his projects (if PROJECT_ROLES_IN_TOKEN).
+    Permission classes then check the roles of a user against his access token instead of the database,
+    as long as the roles of the user don't change (see project_tracking_app/roles.py).
+    """
+
+    @property
+    def access_token(self):
+        """Override access_token property to add the claims about the roles of the user."""
+
+        access = super().access_token
+        if settings.PROJECT_ROLES_IN_TOKEN:
+            for claim, value in get_roles_claims(self[api_settings.USER_ID_CLAIM]).items():
+                access[claim] = value
+        return access
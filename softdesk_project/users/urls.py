@@ -1,6 +1,10 @@
 from django.urls import path
 from rest_framework_simplejwt import views as jwt_views
 
+from .serializers import (
+    ProjectRolesTokenObtainPairSerializer,
+    ProjectRolesTokenRefreshSerializer,
+)
 from .views import (
     UserRegistrationView,
     UserLoginView,
@@ -9,8 +13,12 @@ from .views import (
 app_name = "users"
 
 urlpatterns = [
-    path('token/obtain/', jwt_views.TokenObtainPairView.as_view(), name='token_create'),
-    path('token/refresh/', jwt_views.TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/obtain/',
+         jwt_views.TokenObtainPairView.as_view(serializer_class=ProjectRolesTokenObtainPairSerializer),
+         name='token_create'),
+    path('token/refresh/',
+         jwt_views.TokenRefreshView.as_view(serializer_class=ProjectRolesTokenRefreshSerializer),
+         name='token_refresh'),
     path('signup/', UserRegistrationView.as_view(), name='signup'),
     path('login/', UserLoginView.as_view(), name='login'),
 ]